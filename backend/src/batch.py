@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import math
+import time
+
+from .config.settings import (
+    ANALYSIS_WORKERS, INFERENCE_MODE, WORKING_WIDTH, BATCH_OUTPUT_DIR,
+    GRAPH_POOL_SIZE, GRAPH_IDLE_TIMEOUT
+)
+from .services.analysis_engine import AnalysisEngine
+from .services.batch_analysis import find_videos, analyze_videos
+
+async def run(args: argparse.Namespace):
+    videos = find_videos(args.path)
+    if not videos:
+        print(f"No videos found in {args.path}")
+        return
+
+    engine = AnalysisEngine(
+        workers=args.workers,
+        queue_size=2,
+        inference_mode=args.inference_mode,
+        working_width=WORKING_WIDTH,
+        # Videos sharing a worker each need graphs of their own for tracking
+        graph_pool_size=max(GRAPH_POOL_SIZE, math.ceil(args.concurrency / args.workers)),
+        graph_idle_timeout=GRAPH_IDLE_TIMEOUT
+    )
+    await engine.start()
+
+    frames = 0
+    def count_frame():
+        nonlocal frames
+        frames += 1
+
+    started = time.monotonic()
+    try:
+        outputs = await analyze_videos(
+            engine,
+            videos,
+            args.out,
+            stride=args.stride,
+            window=2 * engine.queue_size,
+            max_width=WORKING_WIDTH,
+            concurrency=args.concurrency,
+            on_frame=count_frame
+        )
+    finally:
+        engine.stop()
+
+    elapsed = time.monotonic() - started
+    for output in outputs:
+        print(f"Wrote {output}")
+    print(f"Analyzed {frames} frames from {len(videos)} video(s) in {elapsed:.1f}s ({frames / elapsed:.1f} frames/s)")
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded interview videos offline")
+    parser.add_argument("path", help="A video file or a directory of videos")
+    parser.add_argument("--out", default=BATCH_OUTPUT_DIR, help="Directory for the per-video JSONL timelines")
+    parser.add_argument("--stride", type=positive_int, default=1, help="Analyze every N-th frame")
+    parser.add_argument("--workers", type=positive_int, default=ANALYSIS_WORKERS, help="Worker processes")
+    # Each video runs on a single worker to keep its tracking state in order
+    parser.add_argument("--concurrency", type=positive_int, default=ANALYSIS_WORKERS, help="Videos analyzed at the same time")
+    parser.add_argument("--inference-mode", default=INFERENCE_MODE)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
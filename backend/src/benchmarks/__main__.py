@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+
+from . import corpus
+from .cases import CASES
+from .harness import compare, run_isolated
+
+# Iterations per case when --iterations is not given; inference cases are slow
+DEFAULT_ITERATIONS = {
+    "decode_image": 200,
+    "annotate_image": 60,
+    "feature_scoring": 2000,
+    "video_decode": 200,
+    "questions_api": 500,
+    "websocket_roundtrip": 60
+}
+INFERENCE_ITERATIONS = 60
+
+def run(args: argparse.Namespace) -> int:
+    names = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        print(f"Unknown benchmark case(s): {', '.join(unknown)}. Use 'list' to see them.")
+        return 2
+
+    frames = corpus.load_frames(args.corpus, args.frames, args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        video = corpus.write_fixture_video(os.path.join(workdir, "fixture.avi"), frames)
+        for name in names:
+            iterations = args.iterations or DEFAULT_ITERATIONS.get(name, INFERENCE_ITERATIONS)
+            result = run_isolated(CASES[name], {"frames": frames, "video": video, "iterations": iterations})
+            results[name] = result
+            print(
+                f"{name:40} {result['fps']:>9.1f}/s  p50 {result['p50_ms']:>8.2f}ms  "
+                f"p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  rss {result['peak_rss_mb']:>7.1f}MB"
+            )
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "corpus": args.corpus or f"synthetic(seed={args.seed})",
+            "corpus_digest": corpus.digest(frames),
+            "frames": len(frames)
+        },
+        "results": results
+    }
+    if args.out:
+        with open(args.out, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Wrote {args.out}")
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            return report_regressions(json.load(baseline), report, args.tolerance, args.rss_tolerance)
+    return 0
+
+def report_regressions(baseline: dict, current: dict, tolerance: float, rss_tolerance: float) -> int:
+    if baseline.get("meta", {}).get("corpus_digest") != current.get("meta", {}).get("corpus_digest"):
+        print("Warning: the baseline was measured on a different corpus")
+    if baseline.get("meta", {}).get("platform") != current.get("meta", {}).get("platform"):
+        print("Warning: the baseline was measured on a different platform")
+    regressions = compare(baseline, current, tolerance, rss_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against the baseline")
+    return 1 if regressions else 0
+
+def compare_files(args: argparse.Namespace) -> int:
+    with open(args.baseline) as baseline, open(args.results) as results:
+        return report_regressions(json.load(baseline), json.load(results), args.tolerance, args.rss_tolerance)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the frame analysis and API hot paths")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmark cases and print/write their results")
+    run_parser.add_argument("--cases", help="Comma-separated cases to run (default: all)")
+    run_parser.add_argument("--iterations", type=int, help="Timed iterations per case (default: per case)")
+    run_parser.add_argument("--corpus", help="Directory of recorded frames or a video file (default: synthetic frames)")
+    run_parser.add_argument("--frames", type=int, default=30, help="Frames in the corpus")
+    run_parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus")
+    run_parser.add_argument("--out", help="Write the results as JSON to this file")
+    run_parser.add_argument("--baseline", help="Compare against the results in this file; exits 1 on regressions")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files; exits 1 on regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+
+    for command in (run_parser, compare_parser):
+        command.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative change of throughput/latency")
+        command.add_argument("--rss-tolerance", type=float, default=0.2, help="Allowed relative growth of peak RSS")
+
+    commands.add_parser("list", help="List the benchmark cases")
+
+    args = parser.parse_args()
+    if args.command == "list":
+        print("\n".join(CASES))
+        sys.exit(0)
+    sys.exit(run(args) if args.command == "run" else compare_files(args))
+
+if __name__ == "__main__":
+    main()
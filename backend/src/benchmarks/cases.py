@@ -0,0 +1,143 @@
+import json
+import os
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List
+
+from .corpus import to_data_urls
+from .harness import measure, summarize
+
+# Each case runs in its own process (see run_isolated) and receives the corpus
+# frames as JPEG bytes, the path of the fixture video and the iteration count.
+
+def decode_image(frames: List[bytes], video: str, iterations: int) -> Dict[str, Any]:
+    from ..services.mediapipe_service import MediaPipeService
+
+    service = MediaPipeService("holistic-only")
+    urls = to_data_urls(frames)
+    return measure(lambda index: service.decode_image(urls[index % len(urls)]), iterations)
+
+def analyze_frame(
+    frames: List[bytes],
+    video: str,
+    iterations: int,
+    inference_mode: str = "full",
+    working_width: int = 640
+) -> Dict[str, Any]:
+    from ..services.mediapipe_service import MediaPipeService
+
+    service = MediaPipeService(inference_mode, working_width=working_width)
+    service.warm_up()
+    urls = to_data_urls(frames)
+    # Frames are replayed in order so the graphs can track between them
+    return measure(lambda index: service.analyze_frame(urls[index % len(urls)]), iterations)
+
+def annotate_image(frames: List[bytes], video: str, iterations: int) -> Dict[str, Any]:
+    from ..services.mediapipe_service import MediaPipeService
+
+    service = MediaPipeService("holistic-only")
+    urls = to_data_urls(frames)
+    return measure(lambda index: service.annotate_image(urls[index % len(urls)]), iterations)
+
+def _landmark_list(count: int, seed: int, center=(0.5, 0.4), spread: float = 0.1):
+    import numpy as np
+    from mediapipe.framework.formats import landmark_pb2
+
+    rng = np.random.RandomState(seed)
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in rng.normal(0, spread, (count, 3)) + (center[0], center[1], 0):
+        landmarks.landmark.add(x=float(x), y=float(y), z=float(z), visibility=0.9)
+    return landmarks
+
+def feature_scoring(frames: List[bytes], video: str, iterations: int) -> Dict[str, Any]:
+    """Landmark conversion and every scoring step of analyze_image, without inference."""
+    from ..services import landmark_features as features
+    from ..services.mediapipe_service import MediaPipeService
+
+    service = MediaPipeService("holistic-only")
+    # Deterministic landmark sets shaped like FaceMesh, Pose and hand output
+    samples = [
+        (_landmark_list(478, seed, spread=0.05), _landmark_list(33, seed + 1, (0.5, 0.6)), _landmark_list(21, seed + 2, (0.3, 0.7), 0.03))
+        for seed in range(0, 30, 3)
+    ]
+
+    def score(index: int):
+        face_landmarks, pose_landmarks, hand_landmarks = samples[index % len(samples)]
+        face = service.extract_facial_landmarks(face_landmarks)
+        pose = features.landmarks_to_array(pose_landmarks)
+        hand = features.landmarks_to_array(hand_landmarks)
+        results = {
+            "face_detected": True,
+            "facial_expression": service.analyze_expression(face),
+            "eye_contact": service.analyze_eye_contact(face),
+            "posture": service.analyze_posture(pose),
+            "hand_gestures": service.analyze_hand_gestures(hand, None)
+        }
+        results["confidence_score"] = service.calculate_confidence_score(results)
+        return results
+
+    return measure(score, iterations)
+
+def video_decode(frames: List[bytes], video: str, iterations: int) -> Dict[str, Any]:
+    """Decoding and downscaling the fixture video as offline batch analysis does."""
+    from ..services.batch_analysis import read_frames
+
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < iterations:
+        frame_started = time.perf_counter()
+        for _ in read_frames(video, max_width=640):
+            latencies.append(time.perf_counter() - frame_started)
+            if len(latencies) == iterations:
+                break
+            frame_started = time.perf_counter()
+    return summarize(latencies, time.perf_counter() - started)
+
+def _configure_app(analysis_startup: str):
+    # Settings are read when the app is imported, so this must come first
+    os.environ["MONGO_URI"] = "memory://"
+    os.environ["ANALYSIS_STARTUP"] = analysis_startup
+    os.environ.setdefault("ANALYSIS_WORKERS", "1")
+    os.environ.setdefault("QUESTION_GENERATOR", "none")
+    # Measure inference on every frame rather than reused results
+    os.environ.setdefault("CHANGE_THRESHOLD", "0")
+
+def questions_api(frames: List[bytes], video: str, iterations: int) -> Dict[str, Any]:
+    # No frames are analyzed, so the analysis workers are never started
+    _configure_app("lazy")
+    from fastapi.testclient import TestClient
+    from ..main import app
+
+    with TestClient(app) as client:
+        def request(index: int):
+            response = client.get("/questions", params={"difficulty": "intermediate", "count": 5, "user_id": f"user-{index % 50}"})
+            response.raise_for_status()
+        return measure(request, iterations)
+
+def websocket_roundtrip(frames: List[bytes], video: str, iterations: int) -> Dict[str, Any]:
+    """A frame sent the way the frontend sends it until its analysis message comes back."""
+    _configure_app("eager")
+    from fastapi.testclient import TestClient
+    from ..main import app
+
+    urls = to_data_urls(frames)
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/benchmark-user") as websocket:
+            def roundtrip(index: int):
+                websocket.send_text(json.dumps({"type": "frame", "data": urls[index % len(urls)]}))
+                while websocket.receive_json().get("type") != "analysis":
+                    pass
+            return measure(roundtrip, iterations)
+
+CASES: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "decode_image": decode_image,
+    "analyze_frame[holistic-only]": partial(analyze_frame, inference_mode="holistic-only"),
+    "analyze_frame[face+pose]": partial(analyze_frame, inference_mode="face+pose"),
+    "analyze_frame[full]": partial(analyze_frame, inference_mode="full"),
+    "analyze_frame[full,native-resolution]": partial(analyze_frame, inference_mode="full", working_width=0),
+    "annotate_image": annotate_image,
+    "feature_scoring": feature_scoring,
+    "video_decode": video_decode,
+    "questions_api": questions_api,
+    "websocket_roundtrip": websocket_roundtrip
+}
@@ -0,0 +1,104 @@
+import base64
+import hashlib
+import os
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Encoding used by the frontend when it sends frames over the WebSocket
+JPEG_QUALITY = 80
+
+def _draw_frame(index: int, width: int, height: int, rng: np.random.RandomState) -> np.ndarray:
+    """A webcam-like scene: lit background and a head-and-shoulders figure swaying slowly."""
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    background = 90 + 60 * x[None, :] + 40 * y
+    frame = np.repeat(background[:, :, None], 3, axis=2) * np.array([1.0, 0.95, 0.85], dtype=np.float32)
+    frame = frame.astype(np.uint8)
+
+    sway = np.sin(index / 8) * 0.04 * width
+    nod = np.sin(index / 5) * 0.01 * height
+    center = (int(width / 2 + sway), int(height * 0.38 + nod))
+    head = (int(width * 0.09), int(height * 0.16))
+
+    # Shoulders and torso
+    shoulders = np.array([
+        [center[0] - int(width * 0.2), height],
+        [center[0] - int(width * 0.16), int(height * 0.66)],
+        [center[0] + int(width * 0.16), int(height * 0.66)],
+        [center[0] + int(width * 0.2), height]
+    ], dtype=np.int32)
+    cv2.fillConvexPoly(frame, shoulders, (70, 60, 140))
+    cv2.rectangle(frame, (center[0] - head[0] // 3, center[1]), (center[0] + head[0] // 3, int(height * 0.68)), (120, 150, 200), -1)
+
+    # Face with eyes, brows and a mouth that opens and closes
+    cv2.ellipse(frame, center, head, 0, 0, 360, (120, 160, 215), -1)
+    for side in (-1, 1):
+        eye = (center[0] + side * head[0] // 2, center[1] - head[1] // 6)
+        cv2.ellipse(frame, eye, (head[0] // 6, head[1] // 14), 0, 0, 360, (250, 250, 250), -1)
+        cv2.circle(frame, eye, head[1] // 16, (40, 30, 30), -1)
+        cv2.line(frame, (eye[0] - head[0] // 5, eye[1] - head[1] // 6), (eye[0] + head[0] // 5, eye[1] - head[1] // 5), (50, 50, 70), 3)
+    mouth_open = 2 + int(abs(np.sin(index / 3)) * head[1] / 10)
+    cv2.ellipse(frame, (center[0], center[1] + head[1] // 2), (head[0] // 3, mouth_open), 0, 0, 360, (60, 60, 150), -1)
+
+    # Sensor noise
+    noise = rng.normal(0, 4, frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+def synthetic_frames(count: int = 30, width: int = 1280, height: int = 720, seed: int = 0) -> List[bytes]:
+    """JPEG frames of a generated scene at the frontend's default capture size; the same arguments give the same frames."""
+    rng = np.random.RandomState(seed)
+    frames = []
+    for index in range(count):
+        frame = _draw_frame(index, width, height, rng)
+        frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1].tobytes())
+    return frames
+
+def recorded_frames(path: str, count: int = 30) -> List[bytes]:
+    """Up to ``count`` JPEG frames from a directory of images or from a video file."""
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+        images = (cv2.imread(os.path.join(path, name)) for name in names[:count])
+    else:
+        from ..services.batch_analysis import read_frames
+        images = (frame for _, _, frame in read_frames(path))
+
+    frames = []
+    for image in images:
+        if image is None:
+            continue
+        frames.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1].tobytes())
+        if len(frames) == count:
+            break
+    if not frames:
+        raise ValueError(f"No frames found in {path}")
+    return frames
+
+def load_frames(path: Optional[str] = None, count: int = 30, seed: int = 0) -> List[bytes]:
+    return recorded_frames(path, count) if path else synthetic_frames(count, seed=seed)
+
+def to_data_urls(frames: List[bytes]) -> List[str]:
+    """Frames as the data URLs the frontend sends."""
+    return ["data:image/jpeg;base64," + base64.b64encode(frame).decode() for frame in frames]
+
+def write_fixture_video(path: str, frames: List[bytes], fps: float = 15) -> str:
+    """Write the frames as a Motion JPEG AVI, which OpenCV can always encode without extra codecs."""
+    first = cv2.imdecode(np.frombuffer(frames[0], np.uint8), cv2.IMREAD_COLOR)
+    height, width = first.shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    try:
+        for frame in frames:
+            writer.write(cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR))
+    finally:
+        writer.release()
+    return path
+
+def digest(frames: List[bytes]) -> str:
+    """Fingerprint of a corpus, so results are only compared when they used the same frames."""
+    sha = hashlib.sha256()
+    for frame in frames:
+        sha.update(frame)
+    return sha.hexdigest()[:16]
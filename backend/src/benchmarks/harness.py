@@ -0,0 +1,84 @@
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Metrics compared against a baseline, and whether a higher value is better
+COMPARED_METRICS = {"fps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Linear interpolation between the closest ranks."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process and of its (finished or running) children, in MB."""
+    # ru_maxrss is in kilobytes on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)
+
+def measure(operation: Callable[[int], Any], iterations: int, warmup: int = 3) -> Dict[str, Any]:
+    """Call ``operation(i)`` ``iterations`` times after ``warmup`` untimed calls and summarize the latencies."""
+    for index in range(warmup):
+        operation(index)
+    latencies = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        call_started = time.perf_counter()
+        operation(index)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "iterations": len(ordered),
+        "fps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0
+    }
+
+def _run_in_process(case: Callable[..., Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+    result = case(**options)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+def run_isolated(case: Callable[..., Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a benchmark case in a fresh process, so its peak RSS and warm caches are its own."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_run_in_process, case, options).result()
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 0.1,
+    rss_tolerance: float = 0.2,
+    cases: Optional[List[str]] = None
+) -> List[str]:
+    """Regressions of ``current`` against ``baseline`` beyond the relative tolerances, one line each."""
+    regressions = []
+    baseline_results = baseline.get("results", {})
+    for name, result in current.get("results", {}).items():
+        if cases and name not in cases:
+            continue
+        reference = baseline_results.get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = reference.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            limit = rss_tolerance if metric == "peak_rss_mb" else tolerance
+            if (change < -limit) if higher_is_better else (change > limit):
+                regressions.append(f"{name}: {metric} {before} -> {after} ({change:+.1%})")
+    return regressions
@@ -0,0 +1,379 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import websockets
+
+from . import corpus
+from .harness import percentile
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class LocalServer:
+    """The API started with uvicorn on a free port, backed by the in-memory database."""
+
+    def __init__(self, env: Optional[Dict[str, str]] = None):
+        self.port = _free_port()
+        self.env = {
+            **os.environ,
+            "MONGO_URI": "memory://",
+            "ANALYSIS_STARTUP": "eager",
+            **(env or {})
+        }
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 120):
+        backend = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(self.port), "--log-level", "warning"],
+            cwd=backend,
+            env=self.env
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f"{self.url}/ready", timeout=1) as response:
+                    if response.status == 200:
+                        return
+            except OSError:
+                pass
+            time.sleep(0.25)
+        self.stop()
+        raise RuntimeError("Server did not become ready in time")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+def process_tree(pid: int) -> List[int]:
+    """``pid`` and all of its descendants, e.g. the analysis worker processes."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The command name may contain spaces; fields after it are fixed
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+def _cpu_ticks_and_rss(pids: List[int]):
+    ticks = rss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as stat:
+                fields = stat.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{pid}/statm") as statm:
+                rss += int(statm.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+        # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+        ticks += int(fields[11]) + int(fields[12])
+    return ticks, rss
+
+class ResourceSampler:
+    """Samples CPU (percent of one core) and RSS of a server process tree every ``interval`` seconds."""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        started = time.monotonic()
+        last_ticks, _ = _cpu_ticks_and_rss(process_tree(self.pid))
+        last_time = started
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            pids = process_tree(self.pid)
+            ticks, rss = _cpu_ticks_and_rss(pids)
+            self.samples.append({
+                "time": round(now - started, 2),
+                "cpu_percent": round((ticks - last_ticks) / CLOCK_TICKS / (now - last_time) * 100, 1),
+                "rss_mb": round(rss / 2 ** 20, 1),
+                "processes": len(pids)
+            })
+            last_ticks, last_time = ticks, now
+
+    def between(self, start: float, end: float) -> List[Dict[str, float]]:
+        return [sample for sample in self.samples if start <= sample["time"] <= end]
+
+class SimulatedClient:
+    """One interview session replaying frames as ``InterviewPractice.tsx`` sends them.
+
+    Frames go out as JSON text messages with a base64 data URL at ``fps``; like
+    the frontend, the client adopts the rate the server negotiates through
+    ``capture_config`` unless ``fixed_rate`` is set. Each frame also carries a
+    sequence number so its analysis can be matched for the latency.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        user_id: str,
+        frames: List[str],
+        fps: float,
+        fixed_rate: bool = False,
+        warmup: float = 0.0
+    ):
+        self.url = url
+        self.user_id = user_id
+        self.frames = frames
+        self.fps = fps
+        self.fixed_rate = fixed_rate
+        # Frames sent in the first ``warmup`` seconds are not part of the latency figures
+        self.warmup = warmup
+        self.started = 0.0
+        self.sent: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self.analyzed = 0
+        self.errors = 0
+        self.server_dropped = 0
+        self.connected = False
+
+    async def run(self, duration: float, drain: float = 2.0):
+        try:
+            async with websockets.connect(f"{self.url}/ws/{self.user_id}", max_size=None) as websocket:
+                self.connected = True
+                receiver = asyncio.create_task(self._receive(websocket))
+                try:
+                    await self._send(websocket, duration)
+                    # Give frames still in analysis a moment to come back
+                    deadline = time.monotonic() + drain
+                    while time.monotonic() < deadline and self.analyzed + self.server_dropped < len(self.sent):
+                        await asyncio.sleep(0.05)
+                finally:
+                    receiver.cancel()
+        except (OSError, websockets.WebSocketException):
+            self.errors += 1
+
+    async def _send(self, websocket, duration: float):
+        started = self.started = time.monotonic()
+        sequence = 0
+        next_send = started
+        while time.monotonic() - started < duration:
+            now = time.monotonic()
+            if now < next_send:
+                await asyncio.sleep(next_send - now)
+            self.sent[sequence] = time.monotonic()
+            await websocket.send(json.dumps({
+                "type": "frame",
+                "data": self.frames[sequence % len(self.frames)],
+                "sequence": sequence,
+                "timestamp": time.time() * 1000
+            }))
+            sequence += 1
+            next_send += 1 / self.fps
+
+    async def _receive(self, websocket):
+        try:
+            async for raw in websocket:
+                self._handle(json.loads(raw))
+        except websockets.ConnectionClosedError:
+            self.errors += 1
+
+    def _handle(self, message: Dict[str, Any]):
+        kind = message.get("type")
+        if kind == "analysis":
+            self.analyzed += 1
+            sent_at = self.sent.get(message.get("sequence"))
+            if sent_at is not None and sent_at - self.started >= self.warmup:
+                self.latencies.append(time.monotonic() - sent_at)
+            self.server_dropped = message.get("stats", {}).get("dropped", self.server_dropped)
+        elif kind == "capture_config" and not self.fixed_rate and message.get("fps"):
+            self.fps = float(message["fps"])
+        elif kind == "error":
+            self.errors += 1
+
+async def run_stage(
+    url: str,
+    clients: int,
+    duration: float,
+    frames: List[str],
+    fps: float,
+    fixed_rate: bool,
+    stage: int,
+    warmup: float = 0.0
+) -> Dict[str, Any]:
+    simulated = [
+        SimulatedClient(url, f"load-{stage}-{index}", frames, fps, fixed_rate, warmup)
+        for index in range(clients)
+    ]
+    await asyncio.gather(*(client.run(duration) for client in simulated))
+
+    latencies = sorted(latency for client in simulated for latency in client.latencies)
+    sent = sum(len(client.sent) for client in simulated)
+    analyzed = sum(client.analyzed for client in simulated)
+    return {
+        "clients": clients,
+        "connected": sum(client.connected for client in simulated),
+        "sent": sent,
+        "analyzed": analyzed,
+        "server_dropped": sum(client.server_dropped for client in simulated),
+        "drop_rate": round(1 - analyzed / sent, 3) if sent else 0.0,
+        "errors": sum(client.errors for client in simulated),
+        "offered_fps": round(sent / duration, 2),
+        "analyzed_fps": round(analyzed / duration, 2),
+        "analyzed_fps_per_client": round(analyzed / duration / clients, 2),
+        "final_client_fps": round(sum(client.fps for client in simulated) / clients, 2),
+        "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 1)
+    }
+
+def saturation_reason(stage: Dict[str, Any], args: argparse.Namespace) -> Optional[str]:
+    if stage["errors"] or stage["connected"] < stage["clients"]:
+        return f"{stage['errors']} client error(s)"
+    if stage["latency_p95_ms"] > args.max_latency:
+        return f"p95 latency {stage['latency_p95_ms']}ms > {args.max_latency}ms"
+    if stage["drop_rate"] > args.max_drop_rate:
+        return f"drop rate {stage['drop_rate']:.1%} > {args.max_drop_rate:.1%}"
+    if stage["analyzed_fps_per_client"] < args.min_fps * args.fps:
+        return f"{stage['analyzed_fps_per_client']} analyzed frames/s per client < {args.min_fps:.0%} of {args.fps}"
+    return None
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    frames = corpus.to_data_urls(corpus.load_frames(args.corpus, args.frames, args.seed))
+    server = None
+    if args.url:
+        url, pid = args.url.rstrip("/"), args.server_pid
+    else:
+        server = LocalServer({"ANALYSIS_WORKERS": str(args.workers)} if args.workers else None)
+        print(f"Starting the app on port {server.port}")
+        server.start()
+        url, pid = server.url, server.process.pid
+    ws_url = url.replace("http://", "ws://").replace("https://", "wss://")
+
+    sampler = ResourceSampler(pid, args.sample_interval) if pid else None
+    if sampler:
+        sampler.start()
+    stages, saturation = [], None
+    started = time.monotonic()
+    try:
+        for index, clients in enumerate(int(value) for value in args.clients.split(",")):
+            stage_started = time.monotonic() - started
+            stage = await run_stage(ws_url, clients, args.duration, frames, args.fps, args.fixed_rate, index, args.warmup)
+            if sampler:
+                samples = sampler.between(stage_started, time.monotonic() - started)
+                stage["server_cpu_percent"] = max((sample["cpu_percent"] for sample in samples), default=None)
+                stage["server_rss_mb"] = max((sample["rss_mb"] for sample in samples), default=None)
+            reason = saturation_reason(stage, args)
+            stage["saturated"] = reason
+            stages.append(stage)
+            print(
+                f"{clients:>4} clients: {stage['analyzed_fps']:>7.1f} frames/s analyzed, "
+                f"p50 {stage['latency_p50_ms']:>7.1f}ms p95 {stage['latency_p95_ms']:>7.1f}ms, "
+                f"drops {stage['drop_rate']:>6.1%}, cpu {stage.get('server_cpu_percent')}%, "
+                f"rss {stage.get('server_rss_mb')}MB" + (f"  SATURATED: {reason}" if reason else "")
+            )
+            if reason and saturation is None:
+                saturation = {"clients": clients, "reason": reason}
+                if not args.keep_going:
+                    break
+    finally:
+        if sampler:
+            await sampler.stop()
+        if server:
+            server.stop()
+
+    healthy = [stage["clients"] for stage in stages if not stage["saturated"]]
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "url": url,
+            "fps": args.fps,
+            "fixed_rate": args.fixed_rate,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "corpus": args.corpus or f"synthetic(seed={args.seed})",
+            "max_latency_ms": args.max_latency,
+            "max_drop_rate": args.max_drop_rate,
+            "cpu_count": os.cpu_count()
+        },
+        "stages": stages,
+        "max_healthy_clients": max(healthy) if healthy else 0,
+        "saturation": saturation,
+        "server_resources": sampler.samples if sampler else []
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Find how many concurrent interview sessions the WebSocket API sustains")
+    parser.add_argument("--url", help="Base URL of a running app (default: start one with the in-memory database)")
+    parser.add_argument("--server-pid", type=int, help="PID of the app given by --url, for CPU/memory sampling")
+    parser.add_argument("--workers", type=int, help="ANALYSIS_WORKERS of the started app")
+    parser.add_argument("--clients", default="1,2,4,8,16,32", help="Comma-separated client counts, one stage each")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per stage")
+    parser.add_argument("--fps", type=float, default=1, help="Frames per second each client starts sending")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds at the start of each stage left out of the latencies")
+    parser.add_argument("--fixed-rate", action="store_true", help="Ignore the capture rate the server negotiates")
+    parser.add_argument("--corpus", help="Directory of recorded frames or a video to replay (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=30, help="Frames in the replayed stream")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus")
+    parser.add_argument("--max-latency", type=float, default=1000, help="p95 feedback latency (ms) above which a stage is saturated")
+    parser.add_argument("--max-drop-rate", type=float, default=0.2, help="Fraction of unanalyzed frames above which a stage is saturated")
+    parser.add_argument("--min-fps", type=float, default=0.8, help="Fraction of --fps each client must get analyzed")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between server CPU/memory samples")
+    parser.add_argument("--keep-going", action="store_true", help="Run all stages even after saturation")
+    parser.add_argument("--out", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if report["saturation"]:
+        print(f"Saturated at {report['saturation']['clients']} clients ({report['saturation']['reason']}); "
+              f"{report['max_healthy_clients']} clients were served within limits")
+    else:
+        print(f"No saturation up to {report['stages'][-1]['clients'] if report['stages'] else 0} clients")
+    if args.out:
+        with open(args.out, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
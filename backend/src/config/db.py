@@ -1,5 +1,29 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from pymongo.database import Database
+from pymongo.errors import PyMongoError
+from .memory_db import MemoryDatabase
+from ..services.metrics import registry
+from .settings import (
+    MONGO_URI, MONGO_DB_NAME, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS
+)
+
+MONGO_COMMAND_SECONDS = registry.histogram("mongo_command_seconds", "Latency of MongoDB commands", ["command"])
+MONGO_COMMAND_FAILURES = registry.counter("mongo_command_failures_total", "MongoDB commands that failed", ["command"])
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records the latency of every MongoDB command; runs on the driver's I/O threads."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.labels(event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name).inc()
 
 class MongoDB:
     client: AsyncIOMotorClient = None
@@ -8,11 +32,48 @@ class MongoDB:
 db = MongoDB()
 
 async def connect_to_mongo():
-    db.client = AsyncIOMotorClient("mongodb://localhost:27017")
-    db.db = db.client.interview_app
+    if MONGO_URI.startswith("memory://"):
+        # Data lives in this process only; for development and load tests
+        db.db = MemoryDatabase()
+        print("Using in-memory database")
+        await create_indexes()
+        return
+    
+    db.client = AsyncIOMotorClient(
+        MONGO_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        event_listeners=[CommandMetrics()]
+    )
+    # The database named in the URI, if any
+    db.db = db.client.get_default_database(MONGO_DB_NAME)
     print("Connected to MongoDB")
+    await create_indexes()
+
+async def create_indexes():
+    """Create the indexes queries rely on; existing indexes are left as they are.
+
+    Startup fails without the unique indexes on users, since signup relies on
+    them to reject duplicates in a single insert.
+    """
+    try:
+        await db.db.users.create_index("email", unique=True)
+        await db.db.users.create_index("username", unique=True)
+    except PyMongoError as e:
+        raise RuntimeError(f"Could not create the unique user indexes, so signup can't reject duplicates: {e}") from e
+    try:
+        await db.db.analysis_results.create_index([("session_id", 1), ("start", 1)])
+        await db.db.analysis_results.create_index([("user_id", 1), ("start", 1)])
+        await db.db.session_rollups.create_index([("user_id", 1), ("ended_at", -1)])
+    except PyMongoError as e:
+        # Don't keep the API from starting; these queries still work without the indexes
+        print(f"Could not create MongoDB indexes: {e}")
 
 async def close_mongo_connection():
     if db.client:
         db.client.close()
-        print("Closed MongoDB connection")
\ No newline at end of file
+        print("Closed MongoDB connection")
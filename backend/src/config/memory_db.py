@@ -0,0 +1,245 @@
+import copy
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+# In-process stand-in for the subset of the Motor API the services use, so the
+# API can run (and be load tested) without a MongoDB server: MONGO_URI=memory://
+
+_MISSING = object()
+
+def _get(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+def _set(document: Dict[str, Any], path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for operator, operand in condition.items():
+            if operator == "$in":
+                if value is _MISSING or value not in operand:
+                    return False
+            elif operator == "$nin":
+                if value is not _MISSING and value in operand:
+                    return False
+            elif operator == "$ne":
+                if value == operand:
+                    return False
+            elif operator == "$exists":
+                if (value is not _MISSING) != bool(operand):
+                    return False
+            elif operator in ("$gt", "$gte", "$lt", "$lte"):
+                if value is _MISSING or value is None:
+                    return False
+                if operator == "$gt" and not value > operand:
+                    return False
+                if operator == "$gte" and not value >= operand:
+                    return False
+                if operator == "$lt" and not value < operand:
+                    return False
+                if operator == "$lte" and not value <= operand:
+                    return False
+            else:
+                raise NotImplementedError(f"Unsupported query operator: {operator}")
+        return True
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return (None if value is _MISSING else value) == condition
+
+def _sort_key(document: Dict[str, Any], key: str):
+    # Missing and null values sort before everything else, as in MongoDB
+    value = _get(document, key)
+    return (value is not _MISSING and value is not None, value if value is not _MISSING and value is not None else 0)
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif not _matches_condition(_get(document, key), condition):
+            return False
+    return True
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    include = {key for key, value in projection.items() if value and key != "_id"}
+    if include:
+        projected = {key: document[key] for key in include if key in document}
+        if projection.get("_id", 1) and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+    for key, value in projection.items():
+        if not value:
+            document.pop(key, None)
+    return document
+
+class MemoryCursor:
+    def __init__(self, documents: List[Dict[str, Any]], projection: Optional[Dict[str, Any]] = None):
+        self.documents = documents
+        self.projection = projection
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction: int = 1) -> "MemoryCursor":
+        keys = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        # Stable sorts applied from the least to the most significant key
+        for key, key_direction in reversed(keys):
+            self.documents.sort(key=lambda document: _sort_key(document, key), reverse=key_direction < 0)
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    def _results(self) -> List[Dict[str, Any]]:
+        documents = self.documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return [project(document, self.projection) for document in documents]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._results()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        self._iterator = iter(self._results())
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        self.unique_indexes: List[Tuple[str, ...]] = []
+
+    async def create_index(self, keys, unique: bool = False, **kwargs) -> str:
+        fields = (keys,) if isinstance(keys, str) else tuple(key for key, _ in keys)
+        if unique and fields not in self.unique_indexes:
+            self.unique_indexes.append(fields)
+        return "_".join(fields)
+
+    def _check_unique(self, document: Dict[str, Any], ignore_id: Any = _MISSING):
+        if document["_id"] in self.documents and document["_id"] != ignore_id:
+            raise DuplicateKeyError("E11000 duplicate key error", 11000, {"keyPattern": {"_id": 1}})
+        for fields in self.unique_indexes:
+            values = [_get(document, field) for field in fields]
+            for other in self.documents.values():
+                if other["_id"] != ignore_id and [_get(other, field) for field in fields] == values:
+                    raise DuplicateKeyError(
+                        "E11000 duplicate key error", 11000, {"keyPattern": {field: 1 for field in fields}}
+                    )
+
+    async def insert_one(self, document: Dict[str, Any]):
+        document.setdefault("_id", ObjectId())
+        self._check_unique(document)
+        self.documents[document["_id"]] = copy.deepcopy(document)
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True):
+        inserted, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                inserted.append((await self.insert_one(document)).inserted_id)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e), "keyPattern": e.details["keyPattern"]})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return SimpleNamespace(inserted_ids=inserted, acknowledged=True)
+
+    def _find(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [document for document in self.documents.values() if matches(document, query)]
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        for document in self.documents.values():
+            if matches(document, query):
+                return project(document, projection)
+        return None
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> MemoryCursor:
+        return MemoryCursor(self._find(query), projection)
+
+    async def count_documents(self, query: Optional[Dict[str, Any]] = None) -> int:
+        return len(self._find(query))
+
+    def _apply_update(self, document: Dict[str, Any], update: Dict[str, Any], inserting: bool):
+        for operator, fields in update.items():
+            for path, value in fields.items():
+                if operator == "$set" or (operator == "$setOnInsert" and inserting):
+                    _set(document, path, copy.deepcopy(value))
+                elif operator == "$inc":
+                    current = _get(document, path)
+                    _set(document, path, (0 if current is _MISSING else current) + value)
+                elif operator == "$max":
+                    current = _get(document, path)
+                    _set(document, path, value if current is _MISSING else max(current, value))
+                elif operator == "$push":
+                    current = _get(document, path)
+                    _set(document, path, ([] if current is _MISSING else current) + [copy.deepcopy(value)])
+                elif operator != "$setOnInsert":
+                    raise NotImplementedError(f"Unsupported update operator: {operator}")
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        for document in self.documents.values():
+            if matches(document, query):
+                updated = copy.deepcopy(document)
+                self._apply_update(updated, update, inserting=False)
+                self._check_unique(updated, ignore_id=document["_id"])
+                self.documents[document["_id"]] = updated
+                return SimpleNamespace(matched_count=1, modified_count=int(updated != document), upserted_id=None)
+        if not upsert:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+        # Equality conditions of the query become fields of the new document
+        document = {
+            key: value for key, value in query.items()
+            if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value))
+        }
+        self._apply_update(document, update, inserting=True)
+        result = await self.insert_one(document)
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=result.inserted_id)
+
+    async def delete_many(self, query: Optional[Dict[str, Any]] = None):
+        matched = [document["_id"] for document in self._find(query)]
+        for document_id in matched:
+            del self.documents[document_id]
+        return SimpleNamespace(deleted_count=len(matched))
+
+class MemoryDatabase:
+    def __init__(self):
+        self.collections: Dict[str, MemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(name)
+        return self.collections[name]
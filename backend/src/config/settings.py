@@ -0,0 +1,105 @@
+import os
+
+# Frame analysis engine
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "full")
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "4"))
+# When the analysis workers load their models: "eager" holds server startup until
+# they are ready, "background" loads them while the server already serves
+# requests (see /ready), "lazy" waits for the first frame
+ANALYSIS_STARTUP = os.getenv("ANALYSIS_STARTUP", "background")
+# Run a synthetic frame through every graph before a worker reports ready
+ANALYSIS_WARM_UP = os.getenv("ANALYSIS_WARM_UP", "true").lower() in ("1", "true", "yes")
+
+# Newest frames kept per connection while analysis is busy; older ones are dropped
+FRAME_BUFFER_SIZE = int(os.getenv("FRAME_BUFFER_SIZE", "1"))
+
+# Bounds for the capture rate negotiated with each client
+CAPTURE_MIN_FPS = float(os.getenv("CAPTURE_MIN_FPS", "0.5"))
+CAPTURE_MAX_FPS = float(os.getenv("CAPTURE_MAX_FPS", "10"))
+
+# Mean grayscale thumbnail difference (0-255) below which a frame reuses the
+# previous result instead of running inference; 0 disables the change gate
+CHANGE_THRESHOLD = float(os.getenv("CHANGE_THRESHOLD", "4"))
+
+# Frames wider than this are downscaled before inference; 0 keeps full resolution
+WORKING_WIDTH = int(os.getenv("WORKING_WIDTH", "640"))
+# Crop each frame to the face/upper-body region found in the session's previous frame
+ROI_TRACKING = os.getenv("ROI_TRACKING", "true").lower() in ("1", "true", "yes")
+# MediaPipe graph sets per worker, each leased to one session so tracking keeps
+# working across frames; a session's set is released after GRAPH_IDLE_TIMEOUT
+# seconds without frames. This is the number of concurrent sessions per worker
+# with their own tracking: further sessions share one set (and lose tracking
+# accuracy) until a lease frees up. 0 shares one set between all sessions
+GRAPH_POOL_SIZE = int(os.getenv("GRAPH_POOL_SIZE", "4"))
+GRAPH_IDLE_TIMEOUT = float(os.getenv("GRAPH_IDLE_TIMEOUT", "60"))
+# Graph sets per worker built (and warmed up) at startup and never closed for idleness
+GRAPH_POOL_MIN_SIZE = int(os.getenv("GRAPH_POOL_MIN_SIZE", "1"))
+
+# Offline batch analysis: recordings are read from BATCH_INPUT_DIR and
+# per-video timelines written to BATCH_OUTPUT_DIR
+BATCH_INPUT_DIR = os.getenv("BATCH_INPUT_DIR", "recordings")
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", "analysis_output")
+
+# Messages buffered per WebSocket client, and what happens when a slow client
+# fills its buffer: "drop_oldest" or "disconnect"
+OUTBOUND_QUEUE_SIZE = int(os.getenv("OUTBOUND_QUEUE_SIZE", "64"))
+SLOW_CONSUMER_POLICY = os.getenv("SLOW_CONSUMER_POLICY", "drop_oldest")
+
+# Routing of WebSocket messages between server processes: "memory" for a single
+# process, or "local" for all processes of this host through a hub listening on
+# BACKPLANE_SOCKET
+BACKPLANE = os.getenv("BACKPLANE", "memory")
+BACKPLANE_SOCKET = os.getenv("BACKPLANE_SOCKET", "/tmp/interview-helper-backplane.sock")
+
+# bcrypt cost factor; stored hashes with a different cost are rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Password hashes computed at once, and how many more may wait before
+# authentication requests are rejected with 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+
+# Verified access tokens cached per process; entries expire with the token or
+# after TOKEN_CACHE_TTL seconds, whichever comes first
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+# Require an access token matching the user in the path on /ws/{user_id}
+# (as ?token=...) and on the per-user analytics endpoints
+WS_AUTH_REQUIRED = os.getenv("WS_AUTH_REQUIRED", "false").lower() in ("1", "true", "yes")
+
+# MongoDB connection; the database name in the URI wins over MONGO_DB_NAME
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "interview_app")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+
+# Frame analysis results are persisted in buckets spanning up to
+# RESULT_BUCKET_SECONDS per session, written RESULT_BATCH_SIZE buckets at a time
+# or every RESULT_FLUSH_INTERVAL seconds; beyond RESULT_MAX_PENDING unwritten
+# buckets sessions are slowed down and the oldest buckets dropped
+RESULT_BUCKET_SECONDS = float(os.getenv("RESULT_BUCKET_SECONDS", "30"))
+RESULT_BATCH_SIZE = int(os.getenv("RESULT_BATCH_SIZE", "50"))
+RESULT_FLUSH_INTERVAL = float(os.getenv("RESULT_FLUSH_INTERVAL", "1.0"))
+RESULT_MAX_PENDING = int(os.getenv("RESULT_MAX_PENDING", "500"))
+
+# Analytics responses are cached per process for ANALYTICS_CACHE_TTL seconds and
+# invalidated when the user finishes a session on this process
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "1024"))
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "30"))
+
+# Generated interview questions ("none" or "template", a deterministic stand-in
+# for the planned model backend) are kept pre-generated per difficulty and
+# category: refilled to QUESTION_POOL_TARGET in the background once fewer than
+# QUESTION_POOL_LOW_WATER are left, and dropped after QUESTION_POOL_TTL seconds
+QUESTION_GENERATOR = os.getenv("QUESTION_GENERATOR", "none")
+QUESTION_POOL_LOW_WATER = int(os.getenv("QUESTION_POOL_LOW_WATER", "10"))
+QUESTION_POOL_TARGET = int(os.getenv("QUESTION_POOL_TARGET", "50"))
+QUESTION_POOL_TTL = float(os.getenv("QUESTION_POOL_TTL", "3600"))
+
+# Allow starting and stopping the sampling profiler through /debug/profiler/*;
+# it exposes code paths, so only enable it where the API is not public
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
@@ -1,12 +1,49 @@
-from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Depends, HTTPException, Query, status, WebSocket, WebSocketDisconnect
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from .config.db import connect_to_mongo, close_mongo_connection
+from .config.db import db, connect_to_mongo, close_mongo_connection
+from .config.settings import (
+    INFERENCE_MODE, ANALYSIS_WORKERS, ANALYSIS_QUEUE_SIZE, ANALYSIS_STARTUP, ANALYSIS_WARM_UP,
+    FRAME_BUFFER_SIZE,
+    CAPTURE_MIN_FPS, CAPTURE_MAX_FPS, CHANGE_THRESHOLD, WORKING_WIDTH, ROI_TRACKING,
+    GRAPH_POOL_SIZE, GRAPH_IDLE_TIMEOUT, GRAPH_POOL_MIN_SIZE,
+    BATCH_INPUT_DIR, BATCH_OUTPUT_DIR, OUTBOUND_QUEUE_SIZE, SLOW_CONSUMER_POLICY,
+    BACKPLANE, BACKPLANE_SOCKET, WS_AUTH_REQUIRED,
+    RESULT_BUCKET_SECONDS, RESULT_BATCH_SIZE, RESULT_FLUSH_INTERVAL, RESULT_MAX_PENDING,
+    ANALYTICS_CACHE_SIZE, ANALYTICS_CACHE_TTL,
+    QUESTION_GENERATOR, QUESTION_POOL_LOW_WATER, QUESTION_POOL_TARGET, QUESTION_POOL_TTL,
+    PROFILER_ENABLED
+)
+from .services.analysis_engine import AnalysisEngine
+from .services.batch_analysis import BatchAnalysisService
+from .services.capture_rate import CaptureRateController
+from .services.session_aggregator import SessionAggregator
+from .services.result_writer import AnalysisResultWriter
+from .services.analytics_service import AnalyticsService
+from .services.frame_buffer import FrameBuffer, PendingFrame, RateMeter, ingestion_stats
+from .services.frame_protocol import parse_frame
+from .services.backplane import create_backplane
 from .services.webrtc_service import WebRTCService
 from .services.question_service import QuestionService
-from .services.auth_service import oauth2_scheme, create_access_token, get_password_hash, verify_password
+from .services.question_generator import create_question_generator
+from .services.metrics import registry
+from .services.profiler import sampler, collapsed
+from .services.auth_service import (
+    oauth2_scheme, create_access_token, hash_password, verify_and_update_password, password_hasher,
+    authenticate_token, get_current_user,
+    ACCESS_TOKEN_EXPIRE_MINUTES
+)
 from .models.user import UserCreate, UserResponse
-from datetime import timedelta
-from typing import List
+from .models.analysis import BatchJobCreate
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from datetime import datetime, timedelta
+from typing import List, Optional
+import asyncio
+import json
+import os
+import time
+import uuid
 
 app = FastAPI(title="Interview Practice API")
 
@@ -20,18 +57,127 @@ app.add_middleware(
 )
 
 # Initialize services
-webrtc_service = WebRTCService()
-question_service = QuestionService()
+webrtc_service = WebRTCService(
+    queue_size=OUTBOUND_QUEUE_SIZE,
+    slow_consumer_policy=SLOW_CONSUMER_POLICY,
+    backplane=create_backplane(BACKPLANE, BACKPLANE_SOCKET)
+)
+question_service = QuestionService(
+    generator=create_question_generator(QUESTION_GENERATOR),
+    pool_low_water=QUESTION_POOL_LOW_WATER,
+    pool_target=QUESTION_POOL_TARGET,
+    pool_ttl=QUESTION_POOL_TTL
+)
+analysis_engine = AnalysisEngine(
+    workers=ANALYSIS_WORKERS,
+    queue_size=ANALYSIS_QUEUE_SIZE,
+    inference_mode=INFERENCE_MODE,
+    change_threshold=CHANGE_THRESHOLD,
+    working_width=WORKING_WIDTH,
+    roi_tracking=ROI_TRACKING,
+    graph_pool_size=GRAPH_POOL_SIZE,
+    graph_idle_timeout=GRAPH_IDLE_TIMEOUT,
+    graph_pool_min_size=GRAPH_POOL_MIN_SIZE,
+    warm_up=ANALYSIS_WARM_UP,
+    lazy_start=ANALYSIS_STARTUP == "lazy"
+)
+result_writer = AnalysisResultWriter(
+    bucket_seconds=RESULT_BUCKET_SECONDS,
+    batch_size=RESULT_BATCH_SIZE,
+    flush_interval=RESULT_FLUSH_INTERVAL,
+    max_pending=RESULT_MAX_PENDING
+)
+analytics_service = AnalyticsService(cache_size=ANALYTICS_CACHE_SIZE, cache_ttl=ANALYTICS_CACHE_TTL)
+batch_service = BatchAnalysisService(analysis_engine, BATCH_INPUT_DIR, BATCH_OUTPUT_DIR, max_width=WORKING_WIDTH)
+
+# Metrics read from the services when /metrics is scraped
+registry.gauge("websocket_connections", "Open WebSocket connections on this process").set_function(
+    lambda: len(webrtc_service.active_connections)
+)
+# Per-connection queues are aggregated; a label per user would grow without bound
+registry.gauge("websocket_outbound_queue_depth", "Messages waiting to be sent, summed over clients").set_function(
+    lambda: sum(connection.queue.qsize() for connection in list(webrtc_service.active_connections.values()))
+)
+registry.gauge("websocket_outbound_queue_depth_max", "Messages waiting to be sent to the most backed-up client").set_function(
+    lambda: max((connection.queue.qsize() for connection in list(webrtc_service.active_connections.values())), default=0)
+)
+registry.gauge("analysis_queue_depth", "Frames in flight or waiting per analysis worker", ["worker"]).set_function(
+    lambda: {(str(worker.index),): worker.pending for worker in analysis_engine.workers}
+)
+registry.gauge("analysis_skip_ratio", "Share of frames answered by the change gate without inference").set_function(
+    lambda: analysis_engine.skip_ratio
+)
+registry.gauge("analysis_results_pending", "Analysis result buckets waiting to be written").set_function(
+    lambda: len(result_writer.pending)
+)
+# Graph pools live in the worker processes; /metrics asks the workers for them before rendering
+graph_sets = registry.gauge("analysis_graph_sets", "MediaPipe graph sets per analysis worker, leased or free", ["worker", "state"])
+graph_pool_events = registry.counter(
+    "analysis_graph_pool_events_total", "Graph sets built, reused or not available per analysis worker", ["worker", "event"]
+)
+GRAPH_STATS_TIMEOUT = 1.0
+
+async def collect_graph_pool_metrics():
+    """Copy each worker's graph pool counts into the registry; the last values stay while workers are too busy to answer."""
+    try:
+        pools = await asyncio.wait_for(analysis_engine.graph_stats(), timeout=GRAPH_STATS_TIMEOUT)
+    except Exception as e:
+        print(f"Could not collect graph pool stats: {e!r}")
+        return
+    for worker, stats in pools:
+        for state in ("leased", "free"):
+            graph_sets.labels(worker, state).set(stats[state])
+        for event in ("created", "reused", "overflowed"):
+            graph_pool_events.labels(worker, event).set(stats[event])
 
 # Database events
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
+    await result_writer.start(db.db.analysis_results)
+    analytics_service.start(db.db)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Persist buffered analysis results before the connection goes away
+    await result_writer.stop()
     await close_mongo_connection()
 
+@app.on_event("shutdown")
+async def shutdown_password_hasher():
+    password_hasher.shutdown()
+
+# Analysis engine events
+@app.on_event("startup")
+async def startup_analysis_engine():
+    if ANALYSIS_STARTUP == "eager":
+        await analysis_engine.start()
+    elif ANALYSIS_STARTUP == "background":
+        # Serve /users, /questions etc. right away; /ready reports when the models are warm
+        analysis_engine.start_in_background()
+
+@app.on_event("shutdown")
+async def shutdown_analysis_engine():
+    analysis_engine.stop()
+
+# WebSocket backplane events
+@app.on_event("startup")
+async def startup_webrtc_service():
+    await webrtc_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_webrtc_service():
+    await webrtc_service.stop()
+
+# Question generation events
+@app.on_event("startup")
+async def startup_question_service():
+    await question_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_question_service():
+    await question_service.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Interview Practice API is running"}
@@ -40,43 +186,331 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Ready once the analysis models are loaded; always ready when they load on the first frame."""
+    ready = analysis_engine.ready or ANALYSIS_STARTUP == "lazy"
+    body = {
+        "status": "ready" if ready else "starting",
+        "models_loaded": analysis_engine.ready,
+        "warm_up": ANALYSIS_WARM_UP,
+        "cold_start": analysis_engine.cold_start,
+        "worker_startup": analysis_engine.worker_startup,
+        "first_frame_latency": analysis_engine.first_frame_latency
+    }
+    if not ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body)
+    return body
+
+@app.get("/metrics")
+async def metrics():
+    """Metrics in the Prometheus text format."""
+    await collect_graph_pool_metrics()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def require_profiler():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+@app.post("/debug/profiler/start", dependencies=[Depends(require_profiler)])
+async def start_profiler(interval: float = Query(0.01, ge=0.001, le=1.0)):
+    """Start sampling the stacks of this process and of the analysis workers every ``interval`` seconds."""
+    sampler.start(interval)
+    await analysis_engine.start_profiler(interval)
+    return {"status": "running", "interval": interval}
+
+@app.post("/debug/profiler/stop", dependencies=[Depends(require_profiler)])
+async def stop_profiler():
+    """Stop sampling and return the collapsed stacks, for flamegraph.pl or speedscope."""
+    # Stopping joins the sampler thread, which must not block the event loop
+    stopped = await asyncio.get_running_loop().run_in_executor(None, sampler.stop)
+    samples = {f"api;{stack}": count for stack, count in stopped.items()}
+    samples.update(await analysis_engine.stop_profiler())
+    return PlainTextResponse(collapsed(samples))
+
 @app.post("/users", response_model=UserResponse)
 async def create_user(user: UserCreate):
     from .config.db import db
     
-    # Check if user exists
-    existing_user = await db.db.users.find_one({"email": user.email})
-    if existing_user:
+    # Create new user; the unique indexes on email and username reject duplicates
+    hashed_password = await hash_password(user.password)
+    now = datetime.utcnow()
+    user_data = user.dict(exclude={"password"})
+    user_data.update(hashed_password=hashed_password, created_at=now, updated_at=now, is_active=True)
+    
+    try:
+        await db.db.users.insert_one(user_data)
+    except DuplicateKeyError as e:
+        duplicate = (e.details or {}).get("keyPattern", {})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail="Username already taken" if "username" in duplicate else "Email already registered"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user.password)
-    user_data = user.dict()
-    user_data.pop("password")
-    user_data["hashed_password"] = hashed_password
+    # insert_one sets _id on the inserted document
+    return UserResponse(id=str(user_data.pop("_id")), **user_data)
+
+@app.post("/token")
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    from .config.db import db
     
-    new_user = await db.db.users.insert_one(user_data)
-    created_user = await db.db.users.find_one({"_id": new_user.inserted_id})
+    # Log in with either the email or the username
+    user = await db.db.users.find_one({"$or": [{"email": form_data.username}, {"username": form_data.username}]})
+    verified, new_hash = await verify_and_update_password(
+        form_data.password,
+        user["hashed_password"] if user else None
+    )
+    if not verified:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
     
-    return UserResponse(**created_user)
+    # Stored hash used an outdated cost factor
+    if new_hash:
+        await db.db.users.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"hashed_password": new_hash, "updated_at": datetime.utcnow()}}
+        )
+    
+    access_token = create_access_token(
+        data={"sub": str(user["_id"])},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@app.get("/users/me", response_model=UserResponse)
+async def read_current_user(current_user: dict = Depends(get_current_user)):
+    return UserResponse(**current_user)
+
+def ensure_user_access(user_id: str, current_user: dict):
+    """Analytics are only ever served to the user they belong to."""
+    if current_user["id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to access another user's analytics"
+        )
+
+@app.get("/analytics/users/{user_id}/summary")
+async def get_user_analytics(user_id: str, current_user: dict = Depends(get_current_user)):
+    ensure_user_access(user_id, current_user)
+    return await analytics_service.user_summary(user_id)
+
+@app.get("/analytics/users/{user_id}/sessions")
+async def get_user_sessions(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    ensure_user_access(user_id, current_user)
+    return await analytics_service.user_sessions(user_id, limit, before)
+
+@app.get("/analytics/sessions/{session_id}")
+async def get_session_analytics(session_id: str, current_user: dict = Depends(get_current_user)):
+    session = await analytics_service.session(session_id)
+    # Other users' sessions look like missing ones, so their ids can't be probed
+    if session is None or session["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    return session
 
 @app.get("/questions", response_model=List[dict])
-async def get_questions(difficulty: str = "beginner", count: int = 5):
-    return question_service.get_questions_by_category(difficulty, count)
+async def get_questions(
+    difficulty: str = "beginner",
+    count: int = Query(5, ge=1, le=50),
+    category: Optional[str] = None,
+    user_id: Optional[str] = None
+):
+    if difficulty not in question_service.basic_questions:
+        difficulty = "beginner"
+    return question_service.get_questions(difficulty, category, count, user_id)
+
+@app.post("/analysis/batch")
+async def create_batch_job(request: BatchJobCreate):
+    try:
+        job = batch_service.start(request.path, request.stride)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recording not found")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return job.to_dict()
+
+@app.get("/analysis/batch/{job_id}")
+async def get_batch_job(job_id: str):
+    job = batch_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/analysis/batch/{job_id}/timeline/{video_index}")
+async def get_batch_timeline(job_id: str, video_index: int):
+    """The JSON Lines timeline of one video of a job; grows while the job is running."""
+    job = batch_service.get(job_id)
+    if not job or not 0 <= video_index < len(job.videos):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Timeline not found")
+    path = batch_service.timeline_path(job, video_index)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Timeline not started yet")
+    return FileResponse(path, media_type="application/x-ndjson")
+
+async def analyze_frames(user_id: str, session_id: str, frames: FrameBuffer, aggregator: SessionAggregator):
+    """Analyze the newest pending frames of one connection and send feedback back."""
+    meter = RateMeter()
+    reused = 0
+    capture_rate = CaptureRateController(min_fps=CAPTURE_MIN_FPS, max_fps=CAPTURE_MAX_FPS)
+    await webrtc_service.send_message(user_id, {"type": "capture_config", **capture_rate.announce()})
+    while True:
+        frame = await frames.get()
+        if frame is None:
+            return
+        started = time.monotonic()
+        try:
+            result = await analysis_engine.analyze(frame.data, session_id=user_id, offset=frame.offset)
+        except ValueError as e:
+            await webrtc_service.send_message(user_id, {"type": "error", "detail": str(e)})
+            continue
+        except Exception as e:
+            # A broken worker or a MediaPipe failure on one frame must not end analysis for the session
+            print(f"Frame analysis failed for {user_id}: {e!r}")
+            await webrtc_service.send_message(user_id, {"type": "error", "detail": "Frame analysis failed"})
+            continue
+        meter.mark()
+        reused += result["reused"]
+        
+        # Tell the client to speed up or slow down based on how fast we can serve it
+        capture_config = capture_rate.observe(
+            time.monotonic() - started,
+            frames.dropped,
+            queue_depth=analysis_engine.queue_depth(user_id),
+            queue_size=analysis_engine.queue_size,
+            inferred=not result["reused"]
+        )
+        if capture_config:
+            await webrtc_service.send_message(user_id, {"type": "capture_config", **capture_config})
+        
+        # Client timestamps are in milliseconds; older clients don't send any
+        timestamp = frame.timestamp / 1000 if frame.timestamp is not None else None
+        summary = aggregator.update(result, timestamp)
+        await result_writer.add(session_id, user_id, result)
+        
+        message = {
+            "type": "analysis",
+            "feedback": result,
+            "summary": summary,
+            "stats": ingestion_stats(frames, meter, reused)
+        }
+        if frame.sequence is not None:
+            message["sequence"] = frame.sequence
+            message["timestamp"] = frame.timestamp
+        await webrtc_service.send_message(user_id, message)
 
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
+    # Browsers can't set headers on a WebSocket, so the access token comes as ?token=...
+    token = websocket.query_params.get("token")
+    token_expires_at = None
+    if token or WS_AUTH_REQUIRED:
+        user = None
+        if token:
+            try:
+                user, token_expires_at = await authenticate_token(token)
+            except HTTPException:
+                pass
+        if user is None or user["id"] != user_id:
+            # 1008: policy violation
+            await websocket.close(code=1008)
+            return
+    
     await webrtc_service.connect(websocket, user_id)
+    
+    # Frames are handed to a separate analysis task through a small buffer that
+    # keeps only the newest frames, so slow analysis drops stale frames instead
+    # of letting feedback latency grow
+    frames = FrameBuffer(FRAME_BUFFER_SIZE)
+    session_id = uuid.uuid4().hex
+    session_started_at = datetime.utcnow()
+    aggregator = SessionAggregator()
+    await webrtc_service.send_message(user_id, {"type": "session", "session_id": session_id})
+    analysis_task = asyncio.create_task(analyze_frames(user_id, session_id, frames, aggregator))
     try:
         while True:
-            data = await websocket.receive_text()
-            # Process WebRTC signaling data
-            await webrtc_service.broadcast({"message": data, "sender": user_id}, [user_id])
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            if token_expires_at is not None and time.time() >= token_expires_at:
+                await websocket.close(code=1008)
+                break
+            
+            # Binary messages carry a video frame behind a fixed header
+            if received.get("bytes") is not None:
+                frame_bytes = received["bytes"]
+                try:
+                    header, offset = parse_frame(frame_bytes)
+                except ValueError as e:
+                    await webrtc_service.send_message(user_id, {"type": "error", "detail": str(e)})
+                    continue
+                frames.put(PendingFrame(frame_bytes, offset, header.sequence, header.timestamp))
+                continue
+            
+            data = received["text"]
+            try:
+                message = json.loads(data)
+            except ValueError:
+                message = None
+            
+            # JSON frames from older clients go through the same buffer
+            if isinstance(message, dict) and message.get("type") == "frame":
+                if not isinstance(message.get("data"), str):
+                    await webrtc_service.send_message(user_id, {"type": "error", "detail": "Frame data must be a string"})
+                    continue
+                # Optional sequence and capture time (ms), echoed in the analysis as for binary frames
+                sequence, timestamp = message.get("sequence"), message.get("timestamp")
+                if not isinstance(sequence, int) or not isinstance(timestamp, (int, float)):
+                    sequence = timestamp = None
+                frames.put(PendingFrame(message["data"], 0, sequence, timestamp))
+                continue
+            
+            # Room membership for an interview session
+            if isinstance(message, dict) and message.get("type") == "join" and message.get("room"):
+                room_id = str(message["room"])
+                peers = await webrtc_service.join(user_id, room_id)
+                await webrtc_service.send_message(user_id, {"type": "joined", "room": room_id, "peers": peers})
+                continue
+            if isinstance(message, dict) and message.get("type") == "leave":
+                await webrtc_service.leave(user_id)
+                continue
+            
+            # Process WebRTC signaling data: only peers in the same room receive it,
+            # or just the addressed peer when the message names a target
+            target = message.get("target") if isinstance(message, dict) else None
+            delivered = await webrtc_service.send_to_room(
+                user_id,
+                {"message": data, "sender": user_id},
+                target=str(target) if target is not None else None
+            )
+            if not delivered:
+                await webrtc_service.send_message(user_id, {
+                    "type": "error",
+                    "detail": "Peer not in your room" if target is not None else "Join a room before signaling"
+                })
     except WebSocketDisconnect:
-        webrtc_service.disconnect(user_id)
+        pass
+    finally:
+        frames.close()
+        analysis_task.cancel()
+        result_writer.end_session(session_id)
+        await webrtc_service.disconnect(user_id, websocket)
+        if user_id not in webrtc_service.active_connections:
+            # Hand the session's graphs back to the pool unless the user already reconnected
+            try:
+                await analysis_engine.end_session(user_id)
+            except Exception as e:
+                print(f"Could not release analysis state of {user_id}: {e}")
+        try:
+            await analytics_service.record_session(user_id, session_id, aggregator, session_started_at, datetime.utcnow())
+        except PyMongoError as e:
+            print(f"Could not record session analytics: {e}")
 
 if __name__ == "__main__":
     import uvicorn
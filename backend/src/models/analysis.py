@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+
+class BatchJobCreate(BaseModel):
+    path: str
+    stride: int = Field(1, ge=1)
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "path": "2024-05-01/session-42.mp4",
+                "stride": 5
+            }
+        }
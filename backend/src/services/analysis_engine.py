@@ -0,0 +1,382 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .metrics import registry
+
+ANALYSIS_STAGE_SECONDS = registry.histogram(
+    "analysis_stage_seconds", "Time spent in each stage of frame analysis inside a worker", ["stage"]
+)
+ANALYSIS_SECONDS = registry.histogram(
+    "analysis_seconds", "Time from handing a frame to the engine until its result is back, including queueing"
+)
+FRAMES_ANALYZED = registry.counter(
+    "frames_analyzed_total", "Frames analyzed, by whether inference ran or a previous result was reused", ["result"]
+)
+
+# MediaPipe graphs are stateful and not thread-safe, so every worker process
+# builds and owns a single MediaPipeService for its whole lifetime, plus a
+# pool of graph sets leased to the sessions it serves.
+_service = None
+_graph_pool = None
+_options: Dict[str, Any] = {}
+# How long this worker took to import, build and warm up its models
+_startup: Dict[str, float] = {}
+
+# State of the sessions pinned to this worker, least recently used first
+_sessions: "OrderedDict[str, WorkerSession]" = OrderedDict()
+MAX_WORKER_SESSIONS = 256
+
+def _init_worker(options: Dict[str, Any]):
+    global _service, _graph_pool, _options
+    started = time.perf_counter()
+    # Imported here so the parent process never pays for cv2/mediapipe
+    from .graph_pool import GraphPool
+    from .mediapipe_service import MediaPipeService
+    imported = time.perf_counter()
+
+    _options = options
+    _service = MediaPipeService(options["inference_mode"], working_width=options["working_width"])
+    if options.get("graph_pool_size", 0) > 0:
+        _graph_pool = GraphPool(
+            _service.create_graphs,
+            max_size=options["graph_pool_size"],
+            idle_timeout=options["graph_idle_timeout"],
+            min_size=options.get("graph_pool_min_size", 0)
+        )
+    built = time.perf_counter()
+
+    if options.get("warm_up", True):
+        _service.warm_up()
+        if _graph_pool is not None:
+            _graph_pool.prefill(_service.warm_up)
+    _startup.update({
+        "import_seconds": round(imported - started, 3),
+        "build_seconds": round(built - imported, 3),
+        "warm_up_seconds": round(time.perf_counter() - built, 3)
+    })
+
+def _startup_info() -> Dict[str, float]:
+    return _startup
+
+class WorkerSession:
+    """Per-session state kept inside a worker process between frames."""
+
+    def __init__(self):
+        from .frame_gate import ChangeGate
+        from .roi_tracker import RoiTracker
+
+        threshold = _options.get("change_threshold", 0.0)
+        self.gate = ChangeGate(threshold=threshold) if threshold > 0 else None
+        self.roi = RoiTracker() if _options.get("roi_tracking") else None
+
+def _session(session_id: Optional[str]) -> Optional[WorkerSession]:
+    if session_id is None:
+        return None
+    session = _sessions.get(session_id)
+    if session is None:
+        session = _sessions[session_id] = WorkerSession()
+        if len(_sessions) > MAX_WORKER_SESSIONS:
+            _end_session(next(iter(_sessions)))
+    else:
+        _sessions.move_to_end(session_id)
+    return session
+
+def _end_session(session_id: str):
+    _sessions.pop(session_id, None)
+    if _graph_pool is not None:
+        _graph_pool.release(session_id)
+
+def _graph_stats() -> Dict[str, int]:
+    return _graph_pool.stats() if _graph_pool is not None else {}
+
+def _analyze(frame_data: Union[str, bytes, Any], offset: int = 0, session_id: Optional[str] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if isinstance(frame_data, bytes):
+        frame = _service.decode_bytes(frame_data, offset)
+    elif isinstance(frame_data, str):
+        frame = _service.decode_image(frame_data)
+    else:
+        # Already decoded BGR frame, e.g. from offline video analysis
+        frame = frame_data
+    decoded = time.perf_counter()
+    # Seconds per stage, taken off the result by AnalysisEngine for its metrics
+    timings = {"decode": decoded - started}
+
+    session = _session(session_id)
+    gate = session.gate if session is not None else None
+    roi = session.roi if session is not None else None
+
+    # Reuse the session's previous result when the frame has barely changed
+    if gate is not None:
+        previous = gate.reuse(frame)
+        timings["change_gate"] = time.perf_counter() - decoded
+        if previous is not None:
+            return {**previous, "reused": True, "timings": timings}
+
+    # Each session gets graphs of its own so tracking is not broken by other sessions' frames;
+    # sessions beyond the pool size share the service's graphs until a set frees up
+    graphs = _graph_pool.acquire(session_id) if session_id is not None and _graph_pool is not None else None
+    result = _service.analyze_image(frame, roi=roi, graphs=graphs, timings=timings)
+    if gate is not None:
+        gate.record(result)
+    return {**result, "reused": False, "timings": timings}
+
+def _start_profiler(interval: float):
+    from .profiler import sampler
+    sampler.start(interval)
+
+def _stop_profiler() -> Dict[str, int]:
+    from .profiler import sampler
+    return sampler.stop()
+
+class AnalysisWorker:
+    """A single worker process plus the bounded queue of frames waiting for it."""
+
+    def __init__(self, index: int, queue_size: int, options: Dict[str, Any]):
+        self.index = index
+        self.options = options
+        self.slots = asyncio.Semaphore(queue_size)
+        self.pending = 0
+        self.executor = self._create_executor()
+        self._replace_lock = threading.Lock()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # "spawn" avoids forking a process that already runs the event loop and MediaPipe threads
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.options,)
+        )
+
+    async def run(self, fn, *args):
+        self.pending += 1
+        try:
+            async with self.slots:
+                loop = asyncio.get_running_loop()
+                executor = self.executor
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    # The worker died (e.g. a native crash inside MediaPipe); replace it
+                    # so later frames are served, and let this caller see the failure.
+                    # Every call in flight fails at once, but only the first replaces it
+                    with self._replace_lock:
+                        if self.executor is executor:
+                            executor.shutdown(wait=False)
+                            self.executor = self._create_executor()
+                    raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+class AnalysisEngine:
+    """Runs frame analysis on a pool of worker processes behind an async API.
+
+    Frames from the same session always go to the same worker so MediaPipe can
+    keep its tracking state; each worker accepts at most ``queue_size`` frames
+    at a time and callers wait for a free slot beyond that. With a positive
+    ``change_threshold`` frames that barely differ from the session's last
+    analyzed frame reuse its result (see ChangeGate). Frames are downscaled to
+    ``working_width`` and, with ``roi_tracking``, cropped to the region the
+    session's subject occupied in the previous frame.
+
+    Each worker leases up to ``graph_pool_size`` MediaPipe graph sets to the
+    sessions it serves (see GraphPool), released on ``end_session`` or after
+    ``graph_idle_timeout`` seconds without frames; 0 makes all sessions share
+    one set, which breaks tracking between sessions.
+
+    Workers import and build their models on ``start``, which takes seconds;
+    with ``warm_up`` they also run a synthetic frame through every graph
+    (and through ``graph_pool_min_size`` pre-built graph sets) before they
+    report ready, so the first real frames are not slow. With ``lazy_start``
+    the first ``analyze`` call starts the workers instead.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        queue_size: int = 4,
+        inference_mode: str = "full",
+        change_threshold: float = 0.0,
+        working_width: int = 0,
+        roi_tracking: bool = False,
+        graph_pool_size: int = 0,
+        graph_idle_timeout: float = 60,
+        graph_pool_min_size: int = 0,
+        warm_up: bool = True,
+        lazy_start: bool = False
+    ):
+        self.worker_count = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.options = {
+            "inference_mode": inference_mode,
+            "change_threshold": change_threshold,
+            "working_width": working_width,
+            "roi_tracking": roi_tracking,
+            "graph_pool_size": graph_pool_size,
+            "graph_idle_timeout": graph_idle_timeout,
+            "graph_pool_min_size": graph_pool_min_size,
+            "warm_up": warm_up
+        }
+        self.lazy_start = lazy_start
+        self.workers: List[AnalysisWorker] = []
+        # Sessions assigned to a worker by pin_session instead of by hash
+        self.pinned: Dict[str, int] = {}
+        self._next_pin = 0
+        self.ready = False
+        self.stopped = False
+        self.frames_analyzed = 0
+        self.frames_reused = 0
+        # Seconds from start() until every worker is ready, per-worker import/build/warm-up
+        # times, and how long the first analyzed frame took (including a lazy start)
+        self.cold_start: Optional[float] = None
+        self.worker_startup: List[Dict[str, float]] = []
+        self.first_frame_latency: Optional[float] = None
+        self._start_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Spawn the worker processes and wait until each has built (and warmed) its models."""
+        if self.workers:
+            return
+        self.stopped = False
+        started = time.perf_counter()
+        self.workers = [
+            AnalysisWorker(index, self.queue_size, self.options)
+            for index in range(self.worker_count)
+        ]
+        try:
+            self.worker_startup = list(await asyncio.gather(*(worker.run(_startup_info) for worker in self.workers)))
+        except Exception:
+            for worker in self.workers:
+                worker.shutdown()
+            self.workers = []
+            raise
+        self.cold_start = round(time.perf_counter() - started, 3)
+        self.ready = True
+        print(f"Analysis engine ready with {self.worker_count} worker(s) in {self.cold_start:.1f}s")
+
+    def start_in_background(self):
+        """Start the workers without waiting for them; frames sent meanwhile wait for their worker."""
+        self._start_task = asyncio.create_task(self.start())
+        self._start_task.add_done_callback(self._report_start_failure)
+
+    @staticmethod
+    def _report_start_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Analysis engine failed to start: {task.exception()}")
+
+    def stop(self):
+        if self._start_task is not None and not self._start_task.done():
+            self._start_task.cancel()
+        self._start_task = None
+        for worker in self.workers:
+            worker.shutdown()
+        self.workers = []
+        self.ready = False
+        self.stopped = True
+
+    def _select_worker(self, session_id: Optional[str]) -> AnalysisWorker:
+        if session_id is None:
+            return min(self.workers, key=lambda worker: worker.pending)
+        pinned = self.pinned.get(session_id)
+        if pinned is not None:
+            return self.workers[pinned]
+        return self.workers[zlib.crc32(session_id.encode()) % len(self.workers)]
+
+    def pin_session(self, session_id: str) -> int:
+        """Serve a session on the worker with the fewest pinned sessions, round-robin among equals.
+
+        For sessions started together that should each get a worker of their
+        own, such as the videos of a batch job; hashing their ids could put
+        several on one worker and leave others idle. ``end_session`` unpins.
+        """
+        counts = [0] * self.worker_count
+        for index in self.pinned.values():
+            counts[index] += 1
+        first = self._next_pin
+        index = min(range(self.worker_count), key=lambda index: (counts[index], (index - first) % self.worker_count))
+        self._next_pin = (index + 1) % self.worker_count
+        self.pinned[session_id] = index
+        return index
+
+    async def analyze(
+        self,
+        frame_data: Union[str, bytes, Any],
+        session_id: Optional[str] = None,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """Analyze a frame in a worker process and return the MediaPipeService result.
+
+        ``frame_data`` is either a base64 (data URL) string, raw encoded image
+        bytes whose image payload starts at ``offset``, or a decoded BGR array.
+        """
+        started = time.perf_counter()
+        if not self.workers:
+            if not self.lazy_start or self.stopped:
+                raise RuntimeError("Analysis engine is not running")
+            await self.start()
+        worker = self._select_worker(session_id)
+        result = await worker.run(_analyze, frame_data, offset, session_id)
+        elapsed = time.perf_counter() - started
+        if self.first_frame_latency is None:
+            self.first_frame_latency = round(elapsed, 3)
+        ANALYSIS_SECONDS.observe(elapsed)
+        for stage, seconds in result.pop("timings").items():
+            ANALYSIS_STAGE_SECONDS.labels(stage).observe(seconds)
+        if result["reused"]:
+            self.frames_reused += 1
+            FRAMES_ANALYZED.labels("reused").inc()
+        else:
+            self.frames_analyzed += 1
+            FRAMES_ANALYZED.labels("inferred").inc()
+        return result
+
+    async def end_session(self, session_id: str):
+        """Free the worker state of a finished session, including its graphs."""
+        try:
+            if self.workers:
+                await self._select_worker(session_id).run(_end_session, session_id)
+        finally:
+            self.pinned.pop(session_id, None)
+
+    async def graph_stats(self) -> List[Tuple[int, Dict[str, int]]]:
+        """(worker index, graph pool stats) of every ready worker that has a graph pool."""
+        if not self.ready:
+            return []
+        workers = list(self.workers)
+        results = await asyncio.gather(*(worker.run(_graph_stats) for worker in workers))
+        return [(worker.index, stats) for worker, stats in zip(workers, results) if stats]
+
+    async def start_profiler(self, interval: float = 0.01):
+        """Start sampling the Python stacks of every worker (see StackSampler)."""
+        await asyncio.gather(*(worker.run(_start_profiler, interval) for worker in self.workers))
+
+    async def stop_profiler(self) -> Dict[str, int]:
+        """Stop sampling and return the workers' collapsed stacks, prefixed with the worker."""
+        samples: Dict[str, int] = {}
+        results = await asyncio.gather(*(worker.run(_stop_profiler) for worker in self.workers))
+        for worker, worker_samples in zip(self.workers, results):
+            for stack, count in worker_samples.items():
+                samples[f"analysis-worker-{worker.index};{stack}"] = count
+        return samples
+
+    def queue_depth(self, session_id: str) -> int:
+        """Frames in flight or waiting on the worker that serves ``session_id``."""
+        if not self.workers:
+            return 0
+        return self._select_worker(session_id).pending
+
+    @property
+    def skip_ratio(self) -> float:
+        total = self.frames_analyzed + self.frames_reused
+        return self.frames_reused / total if total else 0.0
@@ -0,0 +1,172 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .session_aggregator import SessionAggregator
+
+def _ratio(part: float, whole: float, digits: int = 3) -> Optional[float]:
+    return round(part / whole, digits) if whole else None
+
+def _distribution(counts: Dict[str, int]) -> Dict[str, float]:
+    total = sum(counts.values())
+    return {key: round(count / total, 3) for key, count in counts.items()} if total else {}
+
+def format_rollup(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Dashboard metrics from the additive counters of one session or of all sessions of a user."""
+    return {
+        "frames": totals.get("frames", 0),
+        "duration": round(totals.get("duration", 0.0), 2),
+        "average_confidence": _ratio(totals.get("score_total", 0.0), totals.get("frames", 0), 1),
+        "eye_contact_ratio": _ratio(totals.get("eye_contact_frames", 0), totals.get("eye_frames", 0)),
+        "eye_contact_time": round(totals.get("eye_contact_time", 0.0), 2),
+        "poor_posture_ratio": _ratio(totals.get("poor_posture_frames", 0), totals.get("posture_frames", 0)),
+        "posture_issue_counts": dict(totals.get("issue_counts", {})),
+        "expressions": _distribution(totals.get("expression_counts", {}))
+    }
+
+class ResponseCache:
+    """Small LRU cache of rendered analytics responses with a TTL, invalidated per user."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Tuple, value: Any):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        # Keys start with the user id
+        for key in [key for key in self.entries if key[0] == user_id]:
+            del self.entries[key]
+
+class AnalyticsService:
+    """Session and per-user rollups of interview analysis for the dashboard.
+
+    When a session ends its counters are stored as a session rollup and added
+    to the user's running totals with a single ``$inc`` upsert, so reads never
+    touch per-frame results: a user summary is one document and session
+    history is an indexed, keyset-paginated range. Rendered responses are
+    cached briefly and invalidated when the user finishes another session.
+    """
+
+    def __init__(self, cache_size: int = 1024, cache_ttl: float = 30):
+        self.db = None
+        self.cache = ResponseCache(cache_size, cache_ttl)
+
+    def start(self, database):
+        self.db = database
+
+    async def record_session(
+        self,
+        user_id: str,
+        session_id: str,
+        aggregator: SessionAggregator,
+        started_at: datetime,
+        ended_at: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """Store the rollup of a finished session and fold it into the user's totals."""
+        if aggregator.frames == 0:
+            return None
+        totals = aggregator.totals()
+        session = {
+            "_id": session_id,
+            "user_id": user_id,
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "longest_eye_contact": round(aggregator.longest_streak, 2),
+            **totals
+        }
+        await self.db.session_rollups.insert_one(session)
+
+        increments = {
+            "sessions": 1,
+            "frames": totals["frames"],
+            "duration": totals["duration"],
+            "score_total": totals["score_total"],
+            "eye_frames": totals["eye_frames"],
+            "eye_contact_frames": totals["eye_contact_frames"],
+            "eye_contact_time": totals["eye_contact_time"],
+            "posture_frames": totals["posture_frames"],
+            "poor_posture_frames": totals["poor_posture_frames"]
+        }
+        increments.update({f"issue_counts.{issue}": count for issue, count in totals["issue_counts"].items()})
+        increments.update({f"expression_counts.{name}": count for name, count in totals["expression_counts"].items()})
+        await self.db.user_rollups.update_one(
+            {"_id": user_id},
+            {
+                "$inc": increments,
+                "$max": {"last_session_at": ended_at, "best_confidence": totals["score_total"] / totals["frames"]},
+                "$setOnInsert": {"first_session_at": started_at}
+            },
+            upsert=True
+        )
+        self.cache.invalidate(user_id)
+        return self._format_session(session)
+
+    @staticmethod
+    def _format_session(session: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": session["_id"],
+            "started_at": session["started_at"].isoformat(),
+            "ended_at": session["ended_at"].isoformat(),
+            "longest_eye_contact": session.get("longest_eye_contact", 0.0),
+            **format_rollup(session)
+        }
+
+    async def user_summary(self, user_id: str) -> Dict[str, Any]:
+        key = (user_id, "summary")
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        rollup = await self.db.user_rollups.find_one({"_id": user_id}) or {}
+        summary = {
+            "user_id": user_id,
+            "sessions": rollup.get("sessions", 0),
+            "first_session_at": rollup["first_session_at"].isoformat() if rollup.get("first_session_at") else None,
+            "last_session_at": rollup["last_session_at"].isoformat() if rollup.get("last_session_at") else None,
+            "best_confidence": round(rollup["best_confidence"], 1) if rollup.get("best_confidence") is not None else None,
+            **format_rollup(rollup)
+        }
+        self.cache.put(key, summary)
+        return summary
+
+    async def user_sessions(self, user_id: str, limit: int = 20, before: Optional[datetime] = None) -> Dict[str, Any]:
+        """Sessions of a user, newest first; pass ``next`` back as ``before`` for the next page."""
+        key = (user_id, "sessions", limit, before)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Keyset pagination on the (user_id, ended_at) index costs the same on every page
+        query: Dict[str, Any] = {"user_id": user_id}
+        if before is not None:
+            query["ended_at"] = {"$lt": before}
+        sessions = await self.db.session_rollups.find(query).sort("ended_at", -1).limit(limit).to_list(limit)
+        page = {
+            "items": [self._format_session(session) for session in sessions],
+            "next": sessions[-1]["ended_at"].isoformat() if len(sessions) == limit else None
+        }
+        self.cache.put(key, page)
+        return page
+
+    async def session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = await self.db.session_rollups.find_one({"_id": session_id})
+        if session is None:
+            return None
+        return {"user_id": session["user_id"], **self._format_session(session)}
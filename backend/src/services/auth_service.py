@@ -1,16 +1,33 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
+from bson import ObjectId
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from ..config.db import db
+from ..config.settings import (
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
+)
 
 # Secret key and algorithm for JWT
 SECRET_KEY = "your-secret-key"  # Replace with a proper secret key in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with any other cost are flagged by needs_update and replaced on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def verify_password(plain_password, hashed_password):
@@ -19,6 +36,63 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so hashing never blocks the event loop.
+
+    At most ``workers`` hashes run at once and ``queue_size`` more may wait;
+    requests beyond that are rejected with 503 right away instead of queueing
+    up behind a burst of signups or logins.
+    """
+
+    def __init__(self, context: CryptContext, workers: int = 2, queue_size: int = 32):
+        self.context = context
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self.rejected = 0
+        self._dummy_hash: Optional[str] = None
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again shortly",
+                headers={"Retry-After": "1"}
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Verify a password and return (valid, replacement hash if the stored one is outdated).
+
+        Without a stored hash a dummy one is checked, so unknown users take as
+        long as wrong passwords.
+        """
+        if hashed_password is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hash("dummy-password")
+            await self._run(self.context.verify, password, self._dummy_hash)
+            return False, None
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -27,4 +101,83 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+class TokenCache:
+    """LRU cache of verified tokens and their users, keyed by the SHA-256 of the token.
+
+    Entries expire at the token's ``exp``, or after ``ttl`` seconds if sooner so
+    that deactivated users are noticed, and the least recently used entry is
+    evicted beyond ``max_size``.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[float, float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return the cached (user, token expiry) for a token, if still valid."""
+        key = self.key(token)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[2], entry[1]
+
+    def put(self, token: str, user: Dict[str, Any], expires_at: float):
+        key = self.key(token)
+        self.entries[key] = (min(expires_at, time.time() + self.ttl), expires_at, user)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"}
+)
+
+async def authenticate_token(token: str) -> Tuple[Dict[str, Any], float]:
+    """Return the active user a token belongs to and the token's expiry (epoch seconds).
+
+    Verified tokens are cached, so repeated requests and reconnects skip both
+    the signature check and the database lookup.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    try:
+        # Also rejects expired tokens
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    user_id = claims.get("sub")
+    if user_id is None or not ObjectId.is_valid(user_id) or "exp" not in claims:
+        raise credentials_exception
+
+    user = await db.db.users.find_one({"_id": ObjectId(user_id)}, {"hashed_password": 0})
+    if user is None or not user.get("is_active", True):
+        raise credentials_exception
+    user["id"] = str(user.pop("_id"))
+
+    expires_at = float(claims["exp"])
+    token_cache.put(token, user, expires_at)
+    return user, expires_at
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    user, _ = await authenticate_token(token)
+    return user
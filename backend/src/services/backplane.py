@@ -0,0 +1,454 @@
+import asyncio
+import fcntl
+import json
+import os
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# Called with (channel, data) for every message published to a subscribed channel
+MessageHandler = Callable[[str, str], None]
+
+BACKPLANES = ("memory", "local")
+
+# Longest line accepted on the hub socket
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+RECONNECT_DELAY = 0.5
+# How long a request waits for the hub, including a reconnect
+REQUEST_TIMEOUT = 5.0
+
+class BackplaneHub:
+    """Routing and presence state shared by all nodes of a backplane.
+
+    Clients are the connected nodes; anything a client subscribed, registered
+    or joined is dropped with it, so a node that dies leaves no stale presence.
+    """
+
+    # Operations a client may invoke
+    OPERATIONS = {"subscribe", "unsubscribe", "publish", "register", "unregister", "locate", "add_member", "remove_member", "members"}
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[Any]] = {}
+        # user -> (node, client that registered it)
+        self.presence: Dict[str, Tuple[str, Any]] = {}
+        # room -> user -> client that added it
+        self.rooms: Dict[str, Dict[str, Any]] = {}
+
+    def subscribe(self, client, channel: str):
+        self.subscribers.setdefault(channel, set()).add(client)
+
+    def unsubscribe(self, client, channel: str):
+        subscribers = self.subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(client)
+            if not subscribers:
+                del self.subscribers[channel]
+
+    def publish(self, client, channel: str, data: str):
+        for subscriber in list(self.subscribers.get(channel, ())):
+            subscriber.deliver(channel, data)
+
+    def register(self, client, user: str, node: str) -> Optional[str]:
+        """Record the node a user is connected to and return the node it was on before."""
+        previous = self.presence.get(user)
+        self.presence[user] = (node, client)
+        return previous[0] if previous else None
+
+    def unregister(self, client, user: str):
+        # Only the client that registered the user last may clear it
+        if user in self.presence and self.presence[user][1] is client:
+            del self.presence[user]
+
+    def locate(self, client, user: str) -> Optional[str]:
+        entry = self.presence.get(user)
+        return entry[0] if entry else None
+
+    def add_member(self, client, room: str, user: str):
+        self.rooms.setdefault(room, {})[user] = client
+
+    def remove_member(self, client, room: str, user: str):
+        members = self.rooms.get(room)
+        if members is not None and members.get(user) is client:
+            del members[user]
+            if not members:
+                del self.rooms[room]
+
+    def members(self, client, room: str) -> List[str]:
+        return sorted(self.rooms.get(room, ()))
+
+    def drop(self, client):
+        for channel in list(self.subscribers):
+            self.unsubscribe(client, channel)
+        for user in [user for user, (_, owner) in self.presence.items() if owner is client]:
+            del self.presence[user]
+        for room in list(self.rooms):
+            for user in [user for user, owner in self.rooms[room].items() if owner is client]:
+                self.remove_member(client, room, user)
+
+class Backplane(ABC):
+    """Routes messages and presence between the nodes (processes or hosts) serving WebSocket clients.
+
+    Nodes subscribe to named channels and every message published to a channel
+    reaches the handler of each subscribed node, including the publisher's own.
+    Presence maps users to the node they are connected to, and room membership
+    is kept across all nodes.
+    """
+
+    def __init__(self, node_id: Optional[str] = None):
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.handler: Optional[MessageHandler] = None
+
+    @abstractmethod
+    async def start(self, handler: MessageHandler):
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
+
+    @abstractmethod
+    async def subscribe(self, channel: str):
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str):
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, data: str):
+        ...
+
+    @abstractmethod
+    async def register(self, user_id: str) -> Optional[str]:
+        """Mark a user as connected to this node; returns the node it was connected to before, if any."""
+
+    @abstractmethod
+    async def unregister(self, user_id: str):
+        ...
+
+    @abstractmethod
+    async def locate(self, user_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def add_member(self, room_id: str, user_id: str):
+        ...
+
+    @abstractmethod
+    async def remove_member(self, room_id: str, user_id: str):
+        ...
+
+    @abstractmethod
+    async def members(self, room_id: str) -> List[str]:
+        ...
+
+class InMemoryBackplane(Backplane):
+    """Backplane for nodes in a single process; nodes given the same hub reach each other."""
+
+    def __init__(self, hub: Optional[BackplaneHub] = None, node_id: Optional[str] = None):
+        super().__init__(node_id)
+        self.hub = hub or BackplaneHub()
+
+    def deliver(self, channel: str, data: str):
+        if self.handler:
+            self.handler(channel, data)
+
+    async def start(self, handler: MessageHandler):
+        self.handler = handler
+
+    async def stop(self):
+        self.hub.drop(self)
+        self.handler = None
+
+    async def subscribe(self, channel: str):
+        self.hub.subscribe(self, channel)
+
+    async def unsubscribe(self, channel: str):
+        self.hub.unsubscribe(self, channel)
+
+    async def publish(self, channel: str, data: str):
+        self.hub.publish(self, channel, data)
+
+    async def register(self, user_id: str) -> Optional[str]:
+        return self.hub.register(self, user_id, self.node_id)
+
+    async def unregister(self, user_id: str):
+        self.hub.unregister(self, user_id)
+
+    async def locate(self, user_id: str) -> Optional[str]:
+        return self.hub.locate(self, user_id)
+
+    async def add_member(self, room_id: str, user_id: str):
+        self.hub.add_member(self, room_id, user_id)
+
+    async def remove_member(self, room_id: str, user_id: str):
+        self.hub.remove_member(self, room_id, user_id)
+
+    async def members(self, room_id: str) -> List[str]:
+        return self.hub.members(self, room_id)
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+class _SocketClient:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+
+    def deliver(self, channel: str, data: str):
+        self.writer.write(_encode({"channel": channel, "data": data}))
+
+class HubServer:
+    """Serves a hub on a Unix socket. Nodes send one JSON operation per line."""
+
+    def __init__(self, hub: Optional[BackplaneHub] = None):
+        self.hub = hub or BackplaneHub()
+        self.server = None
+        self.writers: Set[asyncio.StreamWriter] = set()
+
+    async def start(self, path: str):
+        self.server = await asyncio.start_unix_server(self._handle, path=path, limit=MAX_MESSAGE_SIZE)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _SocketClient(writer)
+        self.writers.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than MAX_MESSAGE_SIZE: drop it, the rest of it fails to parse below
+                    print("Backplane hub dropped an oversized message")
+                    continue
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    operation = message.pop("op")
+                    request_id = message.pop("id", None)
+                except (ValueError, TypeError, AttributeError, KeyError):
+                    continue
+                if operation not in BackplaneHub.OPERATIONS:
+                    continue
+                try:
+                    result = getattr(self.hub, operation)(client, **message)
+                except TypeError:
+                    continue
+                if request_id is not None:
+                    writer.write(_encode({"id": request_id, "result": result}))
+        except ConnectionError:
+            pass
+        finally:
+            self.writers.discard(writer)
+            self.hub.drop(client)
+            writer.close()
+
+    async def close(self):
+        self.server.close()
+        # Disconnecting the nodes makes them fail over to a new hub
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+
+class LocalBackplane(Backplane):
+    """Backplane for the processes of one host, through a hub on a Unix socket.
+
+    The first node to start hosts the hub unless one is already listening (for
+    example ``python -m src.services.backplane``). If the hub goes away, nodes
+    reconnect, one of them hosts a new hub, and each replays its subscriptions,
+    presence and room membership.
+    """
+
+    def __init__(self, path: str, node_id: Optional[str] = None):
+        super().__init__(node_id)
+        self.path = path
+        self.hub_server = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.reader_task: Optional[asyncio.Task] = None
+        self.requests: Dict[int, asyncio.Future] = {}
+        self.next_request = 0
+        self.closed = False
+        # Set while connected to a hub; requests wait for it during a reconnect
+        self.connected: Optional[asyncio.Event] = None
+        # Replayed to a new hub after reconnecting
+        self.channels: Set[str] = set()
+        self.users: Set[str] = set()
+        self.memberships: Set[Tuple[str, str]] = set()
+
+    async def start(self, handler: MessageHandler):
+        self.handler = handler
+        self.connected = asyncio.Event()
+        await self._connect()
+        self.reader_task = asyncio.create_task(self._read())
+
+    async def stop(self):
+        self.closed = True
+        if self.reader_task:
+            self.reader_task.cancel()
+        if self.writer:
+            self.writer.close()
+        if self.hub_server:
+            await self.hub_server.close()
+        self._fail_requests(ConnectionError("Backplane stopped"))
+        if self.connected:
+            # Wake requests waiting for a reconnect; they see that the node is closed
+            self.connected.set()
+
+    async def _open(self):
+        try:
+            return await asyncio.open_unix_connection(self.path, limit=MAX_MESSAGE_SIZE)
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        # No hub is listening, so host one here. The lock keeps nodes starting
+        # at the same time from replacing each other's socket.
+        with open(self.path + ".lock", "a") as lock:
+            # Waiting for the lock must not block the event loop
+            await asyncio.get_running_loop().run_in_executor(None, fcntl.flock, lock.fileno(), fcntl.LOCK_EX)
+            try:
+                return await asyncio.open_unix_connection(self.path, limit=MAX_MESSAGE_SIZE)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if os.path.exists(self.path):
+                    # Stale socket left behind by a hub that died
+                    os.unlink(self.path)
+                self.hub_server = HubServer()
+                await self.hub_server.start(self.path)
+                print(f"Backplane hub listening on {self.path}")
+            return await asyncio.open_unix_connection(self.path, limit=MAX_MESSAGE_SIZE)
+
+    async def _connect(self):
+        self.reader, self.writer = await self._open()
+        for channel in self.channels:
+            self._send({"op": "subscribe", "channel": channel})
+        for user_id in self.users:
+            self._send({"op": "register", "user": user_id, "node": self.node_id})
+        for room_id, user_id in self.memberships:
+            self._send({"op": "add_member", "room": room_id, "user": user_id})
+        self.connected.set()
+
+    async def _read(self):
+        while not self.closed:
+            try:
+                line = await self.reader.readline()
+            except ConnectionError:
+                line = b""
+            except ValueError:
+                # Longer than MAX_MESSAGE_SIZE: drop it, the rest of it fails to parse below
+                print("Backplane dropped an oversized message")
+                continue
+            if not line:
+                self.connected.clear()
+                self._fail_requests(ConnectionError("Backplane hub disconnected"))
+                if self.closed:
+                    return
+                print("Backplane hub connection lost, reconnecting")
+                await asyncio.sleep(RECONNECT_DELAY)
+                try:
+                    await self._connect()
+                except OSError as e:
+                    # Reading the dead connection again ends up back here for another attempt
+                    print(f"Backplane reconnect failed: {e}")
+                continue
+
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            if "id" in message:
+                future = self.requests.pop(message["id"], None)
+                if future and not future.done():
+                    future.set_result(message["result"])
+            elif self.handler and "channel" in message and "data" in message:
+                self.handler(message["channel"], message["data"])
+
+    def _fail_requests(self, error: Exception):
+        requests, self.requests = self.requests, {}
+        for future in requests.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _send(self, message: Dict[str, Any]):
+        # Writes are buffered in order; the hub is local, so there is no drain
+        self.writer.write(_encode(message))
+
+    async def _request(self, message: Dict[str, Any]):
+        # A request written to a dead connection would never be answered, so
+        # wait for the reconnect, and never wait on the hub without a limit
+        deadline = asyncio.get_running_loop().time() + REQUEST_TIMEOUT
+        try:
+            await asyncio.wait_for(self.connected.wait(), REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ConnectionError("Backplane hub unavailable") from None
+        if self.closed:
+            raise ConnectionError("Backplane stopped")
+
+        self.next_request += 1
+        request_id = self.next_request
+        future = asyncio.get_running_loop().create_future()
+        self.requests[request_id] = future
+        self._send({**message, "id": request_id})
+        try:
+            return await asyncio.wait_for(future, max(0.0, deadline - asyncio.get_running_loop().time()))
+        except asyncio.TimeoutError:
+            raise ConnectionError("Backplane hub did not answer") from None
+        finally:
+            self.requests.pop(request_id, None)
+
+    async def subscribe(self, channel: str):
+        self.channels.add(channel)
+        self._send({"op": "subscribe", "channel": channel})
+
+    async def unsubscribe(self, channel: str):
+        self.channels.discard(channel)
+        self._send({"op": "unsubscribe", "channel": channel})
+
+    async def publish(self, channel: str, data: str):
+        self._send({"op": "publish", "channel": channel, "data": data})
+
+    async def register(self, user_id: str) -> Optional[str]:
+        self.users.add(user_id)
+        return await self._request({"op": "register", "user": user_id, "node": self.node_id})
+
+    async def unregister(self, user_id: str):
+        self.users.discard(user_id)
+        self._send({"op": "unregister", "user": user_id})
+
+    async def locate(self, user_id: str) -> Optional[str]:
+        return await self._request({"op": "locate", "user": user_id})
+
+    async def add_member(self, room_id: str, user_id: str):
+        self.memberships.add((room_id, user_id))
+        self._send({"op": "add_member", "room": room_id, "user": user_id})
+
+    async def remove_member(self, room_id: str, user_id: str):
+        self.memberships.discard((room_id, user_id))
+        self._send({"op": "remove_member", "room": room_id, "user": user_id})
+
+    async def members(self, room_id: str) -> List[str]:
+        return await self._request({"op": "members", "room": room_id})
+
+def create_backplane(kind: str, socket_path: str) -> Backplane:
+    if kind == "memory":
+        return InMemoryBackplane()
+    if kind == "local":
+        return LocalBackplane(socket_path)
+    raise ValueError(f"Unknown backplane: {kind}. Expected one of {', '.join(BACKPLANES)}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a standalone backplane hub for the WebSocket nodes of this host")
+    parser.add_argument("path", nargs="?", default=os.getenv("BACKPLANE_SOCKET", "/tmp/interview-helper-backplane.sock"))
+    args = parser.parse_args()
+
+    async def main():
+        if os.path.exists(args.path):
+            os.unlink(args.path)
+        hub_server = HubServer()
+        await hub_server.start(args.path)
+        print(f"Backplane hub listening on {args.path}")
+        await hub_server.server.serve_forever()
+
+    asyncio.run(main())
@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from .analysis_engine import AnalysisEngine
+
+VIDEO_EXTENSIONS = {".mp4", ".webm", ".mov", ".avi", ".mkv"}
+
+def find_videos(path: str) -> List[str]:
+    """Return ``path`` if it is a video file, or the video files in a directory (sorted)."""
+    if os.path.isfile(path):
+        return [path]
+    if not os.path.isdir(path):
+        raise FileNotFoundError(path)
+    return sorted(
+        os.path.join(path, name)
+        for name in os.listdir(path)
+        if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+    )
+
+def timeline_name(video_path: str) -> str:
+    """Name of a video's timeline: the file name plus a short hash of its path,
+    so videos with the same name in different directories don't collide."""
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    digest = hashlib.sha1(os.path.abspath(video_path).encode()).hexdigest()[:8]
+    return f"{stem}-{digest}"
+
+def read_frames(video_path: str, stride: int = 1, max_width: int = 0) -> Iterator[Tuple[int, float, Any]]:
+    """Stream-decode a video, yielding (frame index, time in seconds, BGR frame) for every ``stride``-th frame.
+
+    Skipped frames are only grabbed, not decoded, and kept frames are shrunk to
+    ``max_width`` so less data crosses to the worker processes.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    try:
+        index = 0
+        while True:
+            if index % stride:
+                if not capture.grab():
+                    break
+                index += 1
+                continue
+            ok, frame = capture.read()
+            if not ok:
+                break
+            height, width = frame.shape[:2]
+            if max_width and width > max_width:
+                frame = cv2.resize(frame, (max_width, max(1, round(height * max_width / width))), interpolation=cv2.INTER_AREA)
+            yield index, index / fps, frame
+            index += 1
+    finally:
+        capture.release()
+
+async def analyze_video(
+    engine: AnalysisEngine,
+    video_path: str,
+    stride: int = 1,
+    window: int = 8,
+    max_width: int = 0
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield per-frame timeline entries of a video in order.
+
+    Up to ``window`` frames are in flight at once, which bounds memory
+    independently of the video length. The video is analyzed as its own
+    session, pinned to the least busy worker, so its frames stay on one worker
+    in order, with ROI tracking and change-gate state (and, with a graph pool,
+    MediaPipe graphs) that aren't shared with other videos.
+    """
+    loop = asyncio.get_running_loop()
+    frames = read_frames(video_path, stride, max_width)
+    pending: deque = deque()
+    session_id = f"batch-{uuid.uuid4().hex}"
+    engine.pin_session(session_id)
+    decoding: Optional[asyncio.Future] = None
+
+    async def entry(index: int, timestamp: float, future: asyncio.Future) -> Dict[str, Any]:
+        return {"frame": index, "time": round(timestamp, 3), "analysis": await future}
+
+    try:
+        while True:
+            # Decode on a thread so the event loop stays responsive. Shielded, so
+            # a cancel can't leave the thread inside the generator while it is closed
+            decoding = loop.run_in_executor(None, next, frames, None)
+            item = await asyncio.shield(decoding)
+            if item is None:
+                break
+            index, timestamp, frame = item
+            pending.append((index, timestamp, asyncio.ensure_future(engine.analyze(frame, session_id=session_id))))
+            if len(pending) >= window:
+                yield await entry(*pending.popleft())
+        while pending:
+            yield await entry(*pending.popleft())
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+        if decoding is not None and not decoding.done():
+            await asyncio.wait({decoding})
+        frames.close()
+        try:
+            await engine.end_session(session_id)
+        except Exception as e:
+            print(f"Could not release analysis state of {video_path}: {e}")
+
+async def write_timeline(
+    engine: AnalysisEngine,
+    video_path: str,
+    output_dir: str,
+    stride: int = 1,
+    window: int = 8,
+    max_width: int = 0,
+    on_frame=None
+) -> str:
+    """Analyze one video and append its timeline to ``<output_dir>/<timeline name>.jsonl`` as it progresses."""
+    os.makedirs(output_dir, exist_ok=True)
+    session = timeline_name(video_path)
+    output_path = os.path.join(output_dir, f"{session}.jsonl")
+    with open(output_path, "w") as output:
+        async for entry in analyze_video(engine, video_path, stride, window, max_width):
+            output.write(json.dumps({"session": session, **entry}) + "\n")
+            output.flush()
+            if on_frame:
+                on_frame()
+    return output_path
+
+async def analyze_videos(
+    engine: AnalysisEngine,
+    paths: List[str],
+    output_dir: str,
+    stride: int = 1,
+    window: int = 8,
+    max_width: int = 0,
+    concurrency: int = 2,
+    on_frame=None
+) -> List[str]:
+    """Analyze several videos, ``concurrency`` at a time, and return their timeline paths."""
+    if stride < 1:
+        raise ValueError("stride must be at least 1")
+    limit = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(path: str) -> str:
+        async with limit:
+            return await write_timeline(engine, path, output_dir, stride, window, max_width, on_frame)
+
+    return list(await asyncio.gather(*(run(path) for path in paths)))
+
+class BatchJob:
+    def __init__(self, path: str, videos: List[str], stride: int):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.videos = videos
+        self.stride = stride
+        self.status = "running"
+        self.frames_analyzed = 0
+        self.outputs: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "path": self.path,
+            "videos": self.videos,
+            "stride": self.stride,
+            "status": self.status,
+            "frames_analyzed": self.frames_analyzed,
+            "outputs": self.outputs,
+            "error": self.error,
+            "created_at": self.created_at.isoformat()
+        }
+
+class BatchAnalysisService:
+    """Runs offline analysis jobs over recorded videos on the shared analysis engine."""
+
+    def __init__(self, engine: AnalysisEngine, input_dir: str, output_dir: str, max_width: int = 0):
+        self.engine = engine
+        self.input_dir = os.path.abspath(input_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.max_width = max_width
+        self.jobs: Dict[str, BatchJob] = {}
+
+    def resolve(self, path: str) -> str:
+        """Resolve a request path inside the input directory, rejecting anything outside it."""
+        resolved = os.path.realpath(os.path.join(self.input_dir, path))
+        if os.path.commonpath([resolved, os.path.realpath(self.input_dir)]) != os.path.realpath(self.input_dir):
+            raise ValueError("Path must be inside the recordings directory")
+        return resolved
+
+    def start(self, path: str, stride: int = 1) -> BatchJob:
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        videos = find_videos(self.resolve(path))
+        job = BatchJob(path, videos, stride)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    async def _run(self, job: BatchJob):
+        def count_frame():
+            job.frames_analyzed += 1
+
+        try:
+            # One video per worker so the job scales with cores; two frames in
+            # flight per video keep its worker busy while leaving queue slots free
+            # for live sessions
+            job.outputs = await analyze_videos(
+                self.engine,
+                job.videos,
+                os.path.join(self.output_dir, job.id),
+                stride=job.stride,
+                window=2,
+                max_width=self.max_width,
+                concurrency=self.engine.worker_count,
+                on_frame=count_frame
+            )
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self.jobs.get(job_id)
+
+    def timeline_path(self, job: BatchJob, video_index: int) -> str:
+        return os.path.join(self.output_dir, job.id, f"{timeline_name(job.videos[video_index])}.jsonl")
@@ -0,0 +1,95 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Capture resolutions offered to clients, largest first
+RESOLUTIONS: List[Tuple[int, int]] = [(1280, 720), (960, 540), (640, 360), (480, 270), (320, 180)]
+
+class CaptureRateController:
+    """Per-session capture rate and resolution derived from analysis load.
+
+    A session is analyzed one frame at a time, so it can be served at most
+    ``1 / latency`` frames per second, where latency includes the time spent
+    queued behind other sessions on the same worker. The controller targets a
+    fraction of that, backs off multiplicatively when frames are dropped or the
+    worker queue is full, and trades resolution for rate at the extremes.
+    Frames answered by the change gate without inference don't count towards
+    the latency estimate, since they say nothing about inference capacity.
+    """
+
+    def __init__(
+        self,
+        min_fps: float = 0.5,
+        max_fps: float = 10.0,
+        initial_fps: float = 1.0,
+        utilization: float = 0.8,
+        smoothing: float = 0.3,
+        resolution_cooldown: float = 3.0
+    ):
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.utilization = utilization
+        self.smoothing = smoothing
+        self.resolution_cooldown = resolution_cooldown
+
+        self.fps = max(min_fps, min(max_fps, initial_fps))
+        self.level = 0
+        self.latency: Optional[float] = None
+        self.dropped = 0
+        self.resolution_changed_at = 0.0
+        self.sent: Optional[Dict[str, Any]] = None
+
+    def config(self) -> Dict[str, Any]:
+        width, height = RESOLUTIONS[self.level]
+        return {"fps": self.fps, "width": width, "height": height}
+
+    def announce(self) -> Dict[str, Any]:
+        """The config to send when the session starts."""
+        self.sent = self.config()
+        return self.sent
+
+    def observe(
+        self,
+        latency: float,
+        dropped: int,
+        queue_depth: int = 0,
+        queue_size: int = 1,
+        now: Optional[float] = None,
+        inferred: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Record one analyzed frame; returns a new capture config when it changed."""
+        now = time.monotonic() if now is None else now
+        if inferred:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.smoothing * (latency - self.latency)
+
+        # Until a frame has been inferred there is no estimate, so hold the current rate
+        capacity: Optional[float] = None
+        target = self.fps
+        if self.latency is not None:
+            capacity = self.utilization / self.latency if self.latency > 0 else self.max_fps
+            target = capacity
+
+        # Dropped frames or a full worker queue mean we are sending faster than we are served
+        if dropped > self.dropped or queue_depth >= queue_size:
+            target = min(target, self.fps * 0.7)
+        self.dropped = dropped
+
+        # Shrink frames when even the minimum rate is unaffordable, grow them back with ample headroom
+        if capacity is not None and now - self.resolution_changed_at >= self.resolution_cooldown:
+            if capacity < self.min_fps and self.level < len(RESOLUTIONS) - 1:
+                self.level += 1
+                self.resolution_changed_at = now
+            elif capacity > 2 * self.max_fps and self.level > 0:
+                self.level -= 1
+                self.resolution_changed_at = now
+
+        # Quantize to half-frames per second so small latency jitter doesn't cause chatter
+        self.fps = max(self.min_fps, min(self.max_fps, round(target * 2) / 2))
+
+        config = self.config()
+        if config == self.sent:
+            return None
+        self.sent = config
+        return config
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple, Optional, Union
+
+from .metrics import registry
+
+FRAMES_RECEIVED = registry.counter("frames_received_total", "Frames received from WebSocket clients")
+FRAMES_DROPPED = registry.counter(
+    "frames_dropped_total", "Frames replaced by a newer frame before they could be analyzed"
+)
+
+class PendingFrame(NamedTuple):
+    data: Union[str, bytes]
+    offset: int = 0
+    sequence: Optional[int] = None
+    timestamp: Optional[float] = None
+
+class FrameBuffer:
+    """Per-connection buffer of frames waiting for analysis.
+
+    Holds at most ``capacity`` frames; when a new frame arrives while the buffer
+    is full the oldest one is dropped, so analysis always works on the newest
+    frames and feedback never falls behind the client.
+    """
+
+    def __init__(self, capacity: int = 1):
+        self.frames: Deque[PendingFrame] = deque(maxlen=max(1, capacity))
+        self.received = 0
+        self.dropped = 0
+        self.closed = False
+        self._available = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def put(self, frame: PendingFrame):
+        self.received += 1
+        FRAMES_RECEIVED.inc()
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+            FRAMES_DROPPED.inc()
+        self.frames.append(frame)
+        self._available.set()
+
+    async def get(self) -> Optional[PendingFrame]:
+        """Wait for the next frame; returns None once the buffer is closed and drained."""
+        while not self.frames:
+            if self.closed:
+                return None
+            self._available.clear()
+            await self._available.wait()
+        return self.frames.popleft()
+
+    def close(self):
+        self.closed = True
+        self._available.set()
+
+class RateMeter:
+    """Events per second over a sliding time window."""
+
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        self.events: Deque[float] = deque()
+
+    def mark(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self.events.append(now)
+        self._expire(now)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        if len(self.events) < 2:
+            return 0.0
+        elapsed = now - self.events[0]
+        return (len(self.events) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def _expire(self, now: float):
+        while self.events and now - self.events[0] > self.window:
+            self.events.popleft()
+
+def ingestion_stats(buffer: FrameBuffer, meter: RateMeter, reused: int = 0) -> Dict[str, Any]:
+    return {
+        "received": buffer.received,
+        "dropped": buffer.dropped,
+        "reused": reused,
+        "analysis_fps": round(meter.rate(), 2)
+    }
@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+class ChangeGate:
+    """Skips landmark inference for frames that barely differ from the last analyzed one.
+
+    Each frame is reduced to a small grayscale thumbnail and compared with the
+    thumbnail of the last frame that was actually analyzed, using the mean
+    absolute pixel difference (0-255). Below ``threshold`` the previous result
+    is reused; after ``max_reuse`` consecutive reuses a frame is analyzed anyway
+    so slow drift is still picked up.
+    """
+
+    def __init__(self, threshold: float = 4.0, thumbnail_size: Tuple[int, int] = (32, 24), max_reuse: int = 30):
+        self.threshold = threshold
+        self.thumbnail_size = thumbnail_size
+        self.max_reuse = max_reuse
+
+        self.reference: Optional[np.ndarray] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.candidate: Optional[np.ndarray] = None
+        self.consecutive_reuses = 0
+        self.analyzed = 0
+        self.skipped = 0
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def difference(self, thumbnail: np.ndarray) -> float:
+        if self.reference is None:
+            return float("inf")
+        return float(cv2.absdiff(thumbnail, self.reference).mean())
+
+    def reuse(self, frame: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the previous result if ``frame`` is unchanged, otherwise None.
+
+        When None is returned the caller is expected to analyze the frame and
+        pass the result to ``record``.
+        """
+        self.candidate = self.thumbnail(frame)
+        if (
+            self.result is not None
+            and self.consecutive_reuses < self.max_reuse
+            and self.difference(self.candidate) < self.threshold
+        ):
+            self.consecutive_reuses += 1
+            self.skipped += 1
+            return self.result
+        return None
+
+    def record(self, result: Dict[str, Any]):
+        self.reference = self.candidate
+        self.result = result
+        self.consecutive_reuses = 0
+        self.analyzed += 1
+
+    @property
+    def skip_ratio(self) -> float:
+        total = self.analyzed + self.skipped
+        return self.skipped / total if total else 0.0
+
+if __name__ == "__main__":
+    # Offline evaluation on a recorded video: python -m src.services.frame_gate video.mp4 --threshold 4
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report how many frames of a recording the change gate would skip")
+    parser.add_argument("video")
+    parser.add_argument("--threshold", type=float, default=4.0)
+    parser.add_argument("--max-reuse", type=int, default=30)
+    args = parser.parse_args()
+
+    gate = ChangeGate(threshold=args.threshold, max_reuse=args.max_reuse)
+    capture = cv2.VideoCapture(args.video)
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        if gate.reuse(frame) is None:
+            gate.record({})
+    capture.release()
+
+    print(f"frames={gate.analyzed + gate.skipped} analyzed={gate.analyzed} "
+          f"skipped={gate.skipped} skip_ratio={gate.skip_ratio:.3f}")
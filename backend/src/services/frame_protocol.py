@@ -0,0 +1,43 @@
+import struct
+from typing import NamedTuple, Tuple
+
+# Binary video frames sent over the WebSocket start with a fixed 16-byte
+# header in network byte order, followed by the encoded image bytes:
+#
+#   magic      2 bytes   b"IF"
+#   version    1 byte    FRAME_VERSION
+#   format     1 byte    see FRAME_FORMATS
+#   sequence   4 bytes   unsigned, increments per captured frame
+#   timestamp  8 bytes   double, client capture time in milliseconds
+FRAME_MAGIC = b"IF"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("!2sBBId")
+FRAME_HEADER_SIZE = FRAME_HEADER.size
+
+FRAME_FORMATS = {1: "jpeg", 2: "webp"}
+FRAME_FORMAT_CODES = {name: code for code, name in FRAME_FORMATS.items()}
+
+class FrameHeader(NamedTuple):
+    sequence: int
+    timestamp: float
+    format: str
+
+def parse_frame(data: bytes) -> Tuple[FrameHeader, int]:
+    """Parse a binary frame header and return it with the offset of the image payload."""
+    if len(data) <= FRAME_HEADER_SIZE:
+        raise ValueError("Frame is too short")
+
+    magic, version, format_code, sequence, timestamp = FRAME_HEADER.unpack_from(data)
+    if magic != FRAME_MAGIC:
+        raise ValueError("Invalid frame magic")
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version: {version}")
+    if format_code not in FRAME_FORMATS:
+        raise ValueError(f"Unsupported frame format: {format_code}")
+
+    return FrameHeader(sequence, timestamp, FRAME_FORMATS[format_code]), FRAME_HEADER_SIZE
+
+def encode_frame(payload: bytes, sequence: int, timestamp: float, format: str = "jpeg") -> bytes:
+    """Build a binary frame message, e.g. for test clients and load tools."""
+    header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, FRAME_FORMAT_CODES[format], sequence, timestamp)
+    return header + payload
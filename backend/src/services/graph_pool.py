@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class GraphPool:
+    """Graph sets leased to sessions, so each session keeps MediaPipe's tracking fast path.
+
+    A session holds its graph set until it is released or has been idle for
+    ``idle_timeout`` seconds. Once ``max_size`` sets are leased, further
+    sessions get None from ``acquire`` and fall back to a shared set until a
+    lease frees up; taking over an active session's set instead would clear
+    its tracking state on every swap. Released sets are cleared and reused
+    before new ones are built; sets left unused for ``idle_timeout`` are
+    closed to give their memory back, except for the ``min_size`` kept ready
+    for new sessions.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = 4,
+        idle_timeout: float = 60,
+        min_size: int = 0
+    ):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.min_size = min(max(0, min_size), self.max_size)
+        self.idle_timeout = idle_timeout
+        # session id -> (graphs, last used), least recently used first
+        self.leases: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # (graphs, released at), most recently released last
+        self.free: List[Tuple[Any, float]] = []
+        self.created = 0
+        self.reused = 0
+        self.overflowed = 0
+
+    def __len__(self) -> int:
+        return len(self.leases) + len(self.free)
+
+    def prefill(self, warm_up: Optional[Callable[[Any], None]] = None):
+        """Build the ``min_size`` sets up front, running ``warm_up`` on each."""
+        while len(self) < self.min_size:
+            graphs = self.factory()
+            self.created += 1
+            if warm_up is not None:
+                warm_up(graphs)
+            self.free.append((graphs, time.monotonic()))
+
+    def acquire(self, session_id: str) -> Optional[Any]:
+        """The session's graph set, or None when every set is leased to another active session."""
+        now = time.monotonic()
+        self.evict_idle(now)
+        lease = self.leases.get(session_id)
+        if lease is not None:
+            self.leases[session_id] = (lease[0], now)
+            self.leases.move_to_end(session_id)
+            return lease[0]
+
+        if not self.free and len(self) >= self.max_size:
+            self.overflowed += 1
+            return None
+
+        if self.free:
+            graphs = self.free.pop()[0]
+            self.reused += 1
+        else:
+            graphs = self.factory()
+            self.created += 1
+        self.leases[session_id] = (graphs, now)
+        return graphs
+
+    def release(self, session_id: str):
+        lease = self.leases.pop(session_id, None)
+        if lease is not None:
+            lease[0].clear()
+            self.free.append((lease[0], time.monotonic()))
+
+    def evict_idle(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        for session_id, (graphs, last_used) in list(self.leases.items()):
+            if now - last_used < self.idle_timeout:
+                # Leases are ordered by last use
+                break
+            self.release(session_id)
+        while self.free and len(self) > self.min_size and now - self.free[0][1] >= self.idle_timeout:
+            self.free.pop(0)[0].close()
+
+    def close(self):
+        for graphs, _ in list(self.leases.values()) + self.free:
+            graphs.close()
+        self.leases.clear()
+        self.free = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leased": len(self.leases),
+            "free": len(self.free),
+            "created": self.created,
+            "reused": self.reused,
+            "overflowed": self.overflowed
+        }
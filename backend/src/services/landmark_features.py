@@ -0,0 +1,195 @@
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Landmark arrays are float32 of shape (N, 3) holding normalized x, y, z. All
+# feature functions also accept a leading batch dimension, (..., N, 3), so a
+# stack of frames can be scored in one call.
+
+# Face mesh landmark groups used for expression analysis
+EYEBROW_INDICES = np.array([65, 105, 107, 336, 374])
+MOUTH_INDICES = np.array([0, 17, 61, 291, 306, 375])
+EYE_INDICES = np.array([159, 145, 386, 374])
+
+# Pose landmark indices (mp.solutions.pose.PoseLandmark)
+NOSE = 0
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_HIP = 23
+RIGHT_HIP = 24
+# Everything up to the hips covers the head, arms and torso
+UPPER_BODY_INDICES = np.arange(25)
+
+# Score of every expression for each class returned by classify_expression
+EXPRESSION_PROFILES: List[Dict[str, float]] = [
+    {"neutral": 0.8, "happy": 0.0, "surprised": 0.0, "concerned": 0.0, "engaged": 0.0},
+    {"neutral": 0.2, "happy": 0.8, "surprised": 0.0, "concerned": 0.0, "engaged": 0.0},
+    {"neutral": 0.2, "happy": 0.0, "surprised": 0.7, "concerned": 0.0, "engaged": 0.0},
+    {"neutral": 0.3, "happy": 0.0, "surprised": 0.0, "concerned": 0.6, "engaged": 0.0},
+    {"neutral": 0.3, "happy": 0.0, "surprised": 0.0, "concerned": 0.0, "engaged": 0.7},
+]
+
+@lru_cache(maxsize=16)
+def _record_dtype(stride: int, field_count: int) -> np.dtype:
+    # Record header (tag, length) followed by (tag, little-endian float) per field
+    names, formats, offsets = ["tag", "length"], ["u1", "u1"], [0, 1]
+    for field in range(field_count):
+        names += [f"tag{field}", f"value{field}"]
+        formats += ["u1", "<f4"]
+        offsets += [2 + 5 * field, 3 + 5 * field]
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": stride})
+
+def _serialized_fields(landmarks, field_count: int) -> Optional[np.ndarray]:
+    """Read the first ``field_count`` float fields of every landmark from the wire format.
+
+    Each landmark is serialized as a length-delimited record (tag 0x0A, one
+    length byte) holding x, y, z, visibility, presence as tagged 4-byte floats
+    in field order. When every record has the same layout they share a fixed
+    stride and a structured view reads them all at once, which is an order of
+    magnitude faster than touching each landmark from Python. Returns None when
+    the layout doesn't match so callers can fall back to attribute access; the
+    decoded count and the first and last landmarks are checked against the
+    message so a layout change in a MediaPipe release can't misparse silently.
+    """
+    points = landmarks.landmark
+    count = len(points)
+    data = landmarks.SerializeToString()
+    if count == 0 or len(data) % count:
+        return None
+    stride = len(data) // count
+    if stride < 2 + 5 * field_count or stride - 2 >= 0x80:
+        return None
+
+    records = np.frombuffer(data, dtype=_record_dtype(stride, field_count))
+    if len(records) != count:
+        return None
+    if not ((records["tag"] == 0x0A).all() and (records["length"] == stride - 2).all()):
+        return None
+    for field in range(field_count):
+        # Field numbers start at 1, wire type 5 (fixed32)
+        if not (records[f"tag{field}"] == ((field + 1) << 3 | 5)).all():
+            return None
+
+    values = np.empty((count, field_count), dtype=np.float32)
+    for field in range(field_count):
+        values[:, field] = records[f"value{field}"]
+    for index in (0, count - 1):
+        expected = np.array(_FIELD_GETTERS[field_count](points[index]), dtype=np.float32)
+        if not np.array_equal(values[index], expected):
+            return None
+    return values
+
+# Attribute access matching the first field_count fields of the wire format
+_FIELD_GETTERS = {
+    3: lambda point: (point.x, point.y, point.z),
+    4: lambda point: (point.x, point.y, point.z, point.visibility)
+}
+
+def _attribute_coordinates(landmarks) -> np.ndarray:
+    points = landmarks.landmark
+    coordinates = np.fromiter(
+        (value for point in points for value in (point.x, point.y, point.z)),
+        dtype=np.float32,
+        count=3 * len(points)
+    )
+    return coordinates.reshape(-1, 3)
+
+def _attribute_visibility(landmarks) -> np.ndarray:
+    points = landmarks.landmark
+    return np.fromiter((point.visibility for point in points), dtype=np.float32, count=len(points))
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """Convert a MediaPipe landmark list to an (N, 3) float32 array of x, y, z."""
+    coordinates = _serialized_fields(landmarks, 3)
+    if coordinates is not None:
+        return coordinates
+    return _attribute_coordinates(landmarks)
+
+def visibility_to_array(landmarks) -> np.ndarray:
+    """Per-landmark visibility of a MediaPipe landmark list as an (N,) float32 array."""
+    fields = _serialized_fields(landmarks, 4)
+    if fields is not None:
+        return fields[:, 3].copy()
+    return _attribute_visibility(landmarks)
+
+def to_frame_coordinates(points: np.ndarray, crop: Tuple[float, float, float, float]) -> np.ndarray:
+    """Map points normalized to a crop back to normalized full-frame coordinates."""
+    offset_x, offset_y, scale_x, scale_y = crop
+    # z uses roughly the same scale as x
+    scale = np.array([scale_x, scale_y, scale_x], dtype=np.float32)
+    offset = np.array([offset_x, offset_y, 0.0], dtype=np.float32)
+    return points * scale + offset
+
+def tracking_points(
+    face: Optional[np.ndarray],
+    pose: Optional[np.ndarray],
+    pose_visibility: Optional[np.ndarray] = None
+) -> Optional[np.ndarray]:
+    """(x, y) points of the face and the visible upper body, used for ROI tracking."""
+    parts = []
+    if face is not None:
+        parts.append(face[:, :2])
+    if pose is not None:
+        upper_body = pose[UPPER_BODY_INDICES, :2]
+        if pose_visibility is not None:
+            upper_body = upper_body[pose_visibility[UPPER_BODY_INDICES] > 0.5]
+        parts.append(upper_body)
+    return np.concatenate(parts) if parts else None
+
+def expression_features(face: np.ndarray) -> np.ndarray:
+    """Eyebrow-to-eye distance and mouth openness, shape (..., 2)."""
+    y = face[..., 1]
+    eyebrow_height = y[..., EYEBROW_INDICES].mean(axis=-1)
+    eye_height = y[..., EYE_INDICES].mean(axis=-1)
+    mouth = y[..., MOUTH_INDICES]
+    mouth_openness = mouth.max(axis=-1) - mouth.min(axis=-1)
+    return np.stack([eye_height - eyebrow_height, mouth_openness], axis=-1)
+
+def classify_expression(features: np.ndarray) -> np.ndarray:
+    """Index into EXPRESSION_PROFILES for each row of ``expression_features``."""
+    eyebrow_eye_distance = features[..., 0]
+    mouth_openness = features[..., 1]
+    high_eyebrows = eyebrow_eye_distance > 0.03
+    # Apply the rules from lowest to highest priority so earlier rules win
+    # Slight eyebrow raise + moderate mouth = engaged
+    expression = np.where(
+        (eyebrow_eye_distance > 0.02) & (eyebrow_eye_distance < 0.03)
+        & (mouth_openness > 0.02) & (mouth_openness < 0.04),
+        4, 0
+    )
+    # Normal eyebrows + wide mouth = happy
+    expression = np.where((eyebrow_eye_distance < 0.03) & (mouth_openness > 0.04), 1, expression)
+    # Raised eyebrows + closed mouth = concerned/thinking
+    expression = np.where(high_eyebrows & (mouth_openness < 0.03), 3, expression)
+    # High eyebrows + open mouth = surprised
+    expression = np.where(high_eyebrows & (mouth_openness > 0.05), 2, expression)
+    # Anything else stays neutral (0)
+    return expression
+
+def eye_x_position(face: np.ndarray) -> np.ndarray:
+    """Horizontal position of the midpoint between both eyes (0.5 is the image center)."""
+    return face[..., EYE_INDICES, 0].mean(axis=-1)
+
+def posture_features(pose: np.ndarray) -> np.ndarray:
+    """Shoulder slope, spine angle from vertical (degrees) and nose offset from the shoulder midpoint.
+
+    Returns shape (..., 3).
+    """
+    xy = pose[..., :2]
+    left_shoulder, right_shoulder = xy[..., LEFT_SHOULDER, :], xy[..., RIGHT_SHOULDER, :]
+    left_hip, right_hip = xy[..., LEFT_HIP, :], xy[..., RIGHT_HIP, :]
+
+    # Shoulder slope (measure of slouching)
+    shoulder_slope = np.abs(left_shoulder[..., 1] - right_shoulder[..., 1])
+
+    # Angle between the shoulder-to-hip spine vector and the vertical
+    shoulder_midpoint = (left_shoulder + right_shoulder) / 2
+    hip_midpoint = (left_hip + right_hip) / 2
+    spine = hip_midpoint - shoulder_midpoint
+    # arctan2 stays precise near 0 and 180 degrees where arccos of a float32 cosine does not;
+    # a degenerate zero-length spine counts as perpendicular
+    spine_angle = np.degrees(np.arctan2(np.abs(spine[..., 0]), spine[..., 1]))
+    spine_angle = np.where((spine[..., 0] == 0) & (spine[..., 1] == 0), 90.0, spine_angle)
+
+    head_offset = xy[..., NOSE, 0] - shoulder_midpoint[..., 0]
+    return np.stack([shoulder_slope, spine_angle, head_offset], axis=-1)
@@ -1,47 +1,96 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional
 import base64
+import time
+from .roi_tracker import RoiTracker, FULL_FRAME
+from . import landmark_features as features
 
-class MediaPipeService:
-    def __init__(self):
-        # Initialize face mesh
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+# Inference modes trade accuracy for CPU: "holistic-only" runs a single graph
+# that yields face, pose and hand landmarks, "face+pose" runs the dedicated
+# FaceMesh and Pose graphs (no hands), and "full" runs all three.
+INFERENCE_MODES = ("holistic-only", "face+pose", "full")
+
+class GraphSet:
+    """The MediaPipe graphs of one inference mode.
+
+    Graphs run in tracking mode (``static_image_mode=False``): after a detection
+    they follow the subject from frame to frame, so a set must only ever see
+    frames of one video stream.
+    """
+    
+    def __init__(self, inference_mode: str):
+        self.face_mesh = None
+        self.pose = None
+        self.holistic = None
+        
+        if inference_mode in ("face+pose", "full"):
+            # Initialize face mesh
+            self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+            
+            # Initialize pose detection
+            self.pose = mp.solutions.pose.Pose(
+                static_image_mode=False,
+                model_complexity=1,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
         
-        # Initialize pose detection
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+        if inference_mode in ("holistic-only", "full"):
+            # Initialize holistic model for combined analysis
+            self.create_holistic()
+    
+    def create_holistic(self):
+        self.holistic = mp.solutions.holistic.Holistic(
             static_image_mode=False,
             model_complexity=1,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
+    
+    def graphs(self) -> List[Any]:
+        return [graph for graph in (self.face_mesh, self.pose, self.holistic) if graph is not None]
+    
+    def clear(self):
+        """Drop the tracked subject so the next stream starts with a fresh detection.
+        
+        A tiny blank frame makes every graph lose track; this is far cheaper
+        than restarting the graphs with ``reset()``.
+        """
+        blank = np.zeros((32, 32, 3), dtype=np.uint8)
+        for graph in self.graphs():
+            graph.process(blank)
+    
+    def close(self):
+        for graph in self.graphs():
+            graph.close()
+
+class MediaPipeService:
+    def __init__(self, inference_mode: str = "full", working_width: int = 0):
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode: {inference_mode}")
+        self.inference_mode = inference_mode
+        # Frames wider than this are downscaled before inference (0 disables)
+        self.working_width = working_width
         
-        # Initialize holistic model for combined analysis
         self.mp_holistic = mp.solutions.holistic
-        self.holistic = self.mp_holistic.Holistic(
-            static_image_mode=False,
-            model_complexity=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        
+        # Graphs for frames that don't belong to a session; sessions bring their own
+        self.graphs = self.create_graphs()
+        # Built on the first annotation request, separately from the inference graphs
+        self.annotation_holistic = None
         
         # Initialize drawing utilities
         self.mp_drawing = mp.solutions.drawing_utils
-        
-        # Key facial landmark indices for various expressions
-        self.expression_landmarks = {
-            "eyebrows": [65, 105, 107, 336, 374],  # Eyebrow landmarks
-            "mouth": [0, 17, 61, 291, 306, 375],   # Mouth landmarks
-            "eyes": [159, 145, 386, 374]           # Eye landmarks
-        }
+    
+    def create_graphs(self) -> GraphSet:
+        return GraphSet(self.inference_mode)
     
     def decode_image(self, base64_string: str) -> np.ndarray:
         """Decode base64 image string to OpenCV format."""
@@ -49,21 +98,102 @@ class MediaPipeService:
             base64_string = base64_string.split("base64,")[1]
         
         image_bytes = base64.b64decode(base64_string)
-        np_array = np.frombuffer(image_bytes, np.uint8)
+        return self.decode_bytes(image_bytes)
+    
+    def decode_bytes(self, data: bytes, offset: int = 0) -> np.ndarray:
+        """Decode an encoded JPEG/WebP image starting at ``offset`` without copying the buffer."""
+        np_array = np.frombuffer(data, np.uint8, offset=offset)
         img = cv2.imdecode(np_array, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image")
         return img
     
+    def warm_up(self, graphs: Optional[GraphSet] = None) -> None:
+        """Run a synthetic frame through every graph of the set so the first real frame is not slow."""
+        self.analyze_image(np.zeros((480, 640, 3), dtype=np.uint8), graphs=graphs)
+    
     def analyze_frame(self, frame_base64: str) -> Dict[str, Any]:
         """Process a frame from base64 string and return analysis."""
-        frame = self.decode_image(frame_base64)
+        return self.analyze_image(self.decode_image(frame_base64))
+    
+    def downscale(self, frame: np.ndarray) -> np.ndarray:
+        """Shrink a frame to the configured working width, keeping its aspect ratio."""
+        height, width = frame.shape[:2]
+        if not self.working_width or width <= self.working_width:
+            return frame
+        scaled_height = max(1, round(height * self.working_width / width))
+        return cv2.resize(frame, (self.working_width, scaled_height), interpolation=cv2.INTER_AREA)
+    
+    def analyze_image(
+        self,
+        frame: np.ndarray,
+        roi: Optional[RoiTracker] = None,
+        graphs: Optional[GraphSet] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """Process a decoded BGR frame and return analysis.
+        
+        ``graphs`` are the session's own graphs (the shared ones by default).
+        A ``timings`` dict receives the seconds spent in each stage.
+        With a ``roi`` tracker the frame is first cropped to the region the
+        subject occupied in the previous frame; landmarks are mapped back to
+        full-frame coordinates so all metrics stay relative to the whole frame.
+        """
+        graphs = graphs or self.graphs
+        clock = time.perf_counter
+        started = clock()
+        crop = FULL_FRAME
+        if roi is not None:
+            frame, crop = roi.crop(frame)
+        frame = self.downscale(frame)
+        preprocessed = clock()
         
         # Convert BGR to RGB
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Process with MediaPipe
-        face_results = self.face_mesh.process(frame_rgb)
-        pose_results = self.pose.process(frame_rgb)
-        holistic_results = self.holistic.process(frame_rgb)
+        converted = clock()
+        face_mesh_done = pose_done = converted
+        
+        # Process with MediaPipe, collecting whichever landmarks the active graphs provide
+        face_landmarks = None
+        pose_landmarks = None
+        left_hand_landmarks = None
+        right_hand_landmarks = None
+        
+        if graphs.face_mesh is not None:
+            face_results = graphs.face_mesh.process(frame_rgb)
+            if face_results.multi_face_landmarks:
+                face_landmarks = face_results.multi_face_landmarks[0]
+            face_mesh_done = pose_done = clock()
+        
+        if graphs.pose is not None:
+            pose_landmarks = graphs.pose.process(frame_rgb).pose_landmarks
+            pose_done = clock()
+        
+        holistic_done = pose_done
+        if graphs.holistic is not None:
+            holistic_results = graphs.holistic.process(frame_rgb)
+            holistic_done = clock()
+            # Dedicated graphs take precedence when both are running ("full" mode)
+            face_landmarks = face_landmarks or holistic_results.face_landmarks
+            pose_landmarks = pose_landmarks or holistic_results.pose_landmarks
+            left_hand_landmarks = holistic_results.left_hand_landmarks
+            right_hand_landmarks = holistic_results.right_hand_landmarks
+        
+        # Work on (N, 3) arrays from here on
+        face = self.extract_facial_landmarks(face_landmarks) if face_landmarks else None
+        pose = features.landmarks_to_array(pose_landmarks) if pose_landmarks else None
+        pose_visibility = features.visibility_to_array(pose_landmarks) if pose_landmarks else None
+        left_hand = features.landmarks_to_array(left_hand_landmarks) if left_hand_landmarks else None
+        right_hand = features.landmarks_to_array(right_hand_landmarks) if right_hand_landmarks else None
+        
+        # Landmarks are normalized to the crop; map them back to the full frame
+        if crop != FULL_FRAME:
+            face, pose, left_hand, right_hand = (
+                features.to_frame_coordinates(points, crop) if points is not None else None
+                for points in (face, pose, left_hand, right_hand)
+            )
+        if roi is not None:
+            roi.update(features.tracking_points(face, pose, pose_visibility))
         
         # Initialize results
         results = {
@@ -76,85 +206,42 @@ class MediaPipeService:
         }
         
         # Analyze facial expression if face detected
-        if face_results.multi_face_landmarks:
+        if face is not None:
             results["face_detected"] = True
-            facial_landmarks = self.extract_facial_landmarks(face_results.multi_face_landmarks[0])
-            results["facial_expression"] = self.analyze_expression(facial_landmarks)
-            results["eye_contact"] = self.analyze_eye_contact(facial_landmarks)
+            results["facial_expression"] = self.analyze_expression(face)
+            results["eye_contact"] = self.analyze_eye_contact(face)
         
         # Analyze posture if pose detected
-        if pose_results.pose_landmarks:
-            results["posture"] = self.analyze_posture(pose_results.pose_landmarks)
+        if pose is not None:
+            results["posture"] = self.analyze_posture(pose)
         
         # Analyze hand gestures if detected
-        if holistic_results.left_hand_landmarks or holistic_results.right_hand_landmarks:
-            results["hand_gestures"] = self.analyze_hand_gestures(
-                holistic_results.left_hand_landmarks, 
-                holistic_results.right_hand_landmarks
-            )
+        if left_hand is not None or right_hand is not None:
+            results["hand_gestures"] = self.analyze_hand_gestures(left_hand, right_hand)
         
         # Calculate overall confidence score
         results["confidence_score"] = self.calculate_confidence_score(results)
         
+        if timings is not None:
+            timings["preprocess"] = preprocessed - started
+            timings["color_convert"] = converted - preprocessed
+            if graphs.face_mesh is not None:
+                timings["face_mesh"] = face_mesh_done - converted
+            if graphs.pose is not None:
+                timings["pose"] = pose_done - face_mesh_done
+            if graphs.holistic is not None:
+                timings["holistic"] = holistic_done - pose_done
+            timings["features"] = clock() - holistic_done
         return results
     
-    def extract_facial_landmarks(self, landmarks) -> Dict[str, List[Tuple[float, float]]]:
-        """Extract key facial landmarks for expression analysis."""
-        facial_landmarks = {}
-        
-        for region, indices in self.expression_landmarks.items():
-            facial_landmarks[region] = []
-            for idx in indices:
-                landmark = landmarks.landmark[idx]
-                facial_landmarks[region].append((landmark.x, landmark.y))
-        
-        return facial_landmarks
+    def extract_facial_landmarks(self, landmarks) -> np.ndarray:
+        """Convert face mesh landmarks to an (N, 3) array for expression analysis."""
+        return features.landmarks_to_array(landmarks)
     
-    def analyze_expression(self, landmarks: Dict[str, List[Tuple[float, float]]]) -> Dict[str, Any]:
-        """Analyze facial expression based on landmarks."""
-        # Calculate eyebrow position relative to eyes
-        eyebrow_heights = [landmark[1] for landmark in landmarks["eyebrows"]]
-        eye_heights = [landmark[1] for landmark in landmarks["eyes"]]
-        
-        avg_eyebrow_height = sum(eyebrow_heights) / len(eyebrow_heights)
-        avg_eye_height = sum(eye_heights) / len(eye_heights)
-        
-        eyebrow_eye_distance = avg_eye_height - avg_eyebrow_height
-        
-        # Calculate mouth openness
-        mouth_top = min([landmark[1] for landmark in landmarks["mouth"]])
-        mouth_bottom = max([landmark[1] for landmark in landmarks["mouth"]])
-        mouth_openness = mouth_bottom - mouth_top
-        
-        # Simplified expression classification
-        expressions = {
-            "neutral": 0.5,
-            "happy": 0.0,
-            "surprised": 0.0,
-            "concerned": 0.0,
-            "engaged": 0.0
-        }
-        
-        # Adjust based on features
-        # High eyebrows + open mouth = surprised
-        if eyebrow_eye_distance > 0.03 and mouth_openness > 0.05:
-            expressions["surprised"] = 0.7
-            expressions["neutral"] = 0.2
-        # Raised eyebrows + closed mouth = concerned/thinking
-        elif eyebrow_eye_distance > 0.03 and mouth_openness < 0.03:
-            expressions["concerned"] = 0.6
-            expressions["neutral"] = 0.3
-        # Normal eyebrows + wide mouth = happy
-        elif eyebrow_eye_distance < 0.03 and mouth_openness > 0.04:
-            expressions["happy"] = 0.8
-            expressions["neutral"] = 0.2
-        # Slight eyebrow raise + moderate mouth = engaged
-        elif 0.02 < eyebrow_eye_distance < 0.03 and 0.02 < mouth_openness < 0.04:
-            expressions["engaged"] = 0.7
-            expressions["neutral"] = 0.3
-        # Default is more neutral
-        else:
-            expressions["neutral"] = 0.8
+    def analyze_expression(self, face: np.ndarray) -> Dict[str, Any]:
+        """Analyze facial expression based on face landmarks."""
+        expression_class = int(features.classify_expression(features.expression_features(face)))
+        expressions = dict(features.EXPRESSION_PROFILES[expression_class])
         
         # Find the dominant expression
         dominant_expression = max(expressions.items(), key=lambda x: x[1])
@@ -165,20 +252,10 @@ class MediaPipeService:
             "all_expressions": expressions
         }
     
-    def analyze_eye_contact(self, landmarks: Dict[str, List[Tuple[float, float]]]) -> Dict[str, Any]:
+    def analyze_eye_contact(self, face: np.ndarray) -> Dict[str, Any]:
         """Analyze eye contact based on eye landmarks."""
-        # Calculate eye positions
-        left_eye = landmarks["eyes"][0:2]
-        right_eye = landmarks["eyes"][2:4]
-        
-        # Calculate center position of both eyes
-        left_eye_center = (sum(p[0] for p in left_eye) / len(left_eye), 
-                          sum(p[1] for p in left_eye) / len(left_eye))
-        right_eye_center = (sum(p[0] for p in right_eye) / len(right_eye), 
-                           sum(p[1] for p in right_eye) / len(right_eye))
-        
         # Horizontal eye position (0.5 is center of image)
-        eye_x_position = (left_eye_center[0] + right_eye_center[0]) / 2
+        eye_x_position = float(features.eye_x_position(face))
         
         # Determine if looking at camera (simplified)
         looking_at_camera = 0.4 < eye_x_position < 0.6
@@ -187,52 +264,12 @@ class MediaPipeService:
             "looking_at_camera": looking_at_camera,
             "confidence": 0.7 if looking_at_camera else 0.6,
             "position": "center" if looking_at_camera else ("left" if eye_x_position <= 0.4 else "right"),
-            "duration": None  # This would be tracked over time in a real implementation
+            "duration": None  # Filled in with the current streak by SessionAggregator
         }
     
-    def analyze_posture(self, pose_landmarks) -> Dict[str, Any]:
+    def analyze_posture(self, pose: np.ndarray) -> Dict[str, Any]:
         """Analyze posture based on body landmarks."""
-        # Extract shoulder landmarks
-        left_shoulder = (pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                        pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y)
-        right_shoulder = (pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                         pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y)
-        
-        # Extract hip landmarks
-        left_hip = (pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                   pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP.value].y)
-        right_hip = (pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                    pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y)
-        
-        # Extract nose landmark for head position
-        nose = (pose_landmarks.landmark[self.mp_pose.PoseLandmark.NOSE.value].x,
-               pose_landmarks.landmark[self.mp_pose.PoseLandmark.NOSE.value].y)
-        
-        # Calculate shoulder slope (measure of slouching)
-        shoulder_slope = abs(left_shoulder[1] - right_shoulder[1])
-        
-        # Calculate spine angle
-        # First get midpoints of shoulders and hips
-        shoulder_midpoint = ((left_shoulder[0] + right_shoulder[0]) / 2,
-                            (left_shoulder[1] + right_shoulder[1]) / 2)
-        hip_midpoint = ((left_hip[0] + right_hip[0]) / 2,
-                       (left_hip[1] + right_hip[1]) / 2)
-        
-        # Calculate spine angle with vertical
-        spine_vector = (hip_midpoint[0] - shoulder_midpoint[0], 
-                       hip_midpoint[1] - shoulder_midpoint[1])
-        vertical_vector = (0, 1)
-        
-        # Normalize vectors
-        spine_magnitude = np.sqrt(spine_vector[0]**2 + spine_vector[1]**2)
-        if spine_magnitude == 0:
-            spine_vector = (0, 0)
-        else:
-            spine_vector = (spine_vector[0]/spine_magnitude, spine_vector[1]/spine_magnitude)
-        
-        # Calculate angle (dot product)
-        dot_product = spine_vector[0] * vertical_vector[0] + spine_vector[1] * vertical_vector[1]
-        angle = np.arccos(np.clip(dot_product, -1.0, 1.0)) * 180 / np.pi
+        shoulder_slope, angle, head_offset = (float(value) for value in features.posture_features(pose))
         
         # Analyze posture based on these metrics
         posture_quality = "good"
@@ -250,7 +287,7 @@ class MediaPipeService:
             confidence = 0.8
         
         # Check if head is too far forward
-        head_forward = nose[0] < shoulder_midpoint[0] - 0.05
+        head_forward = head_offset < -0.05
         if head_forward:
             posture_quality = "poor"
             issues.append("head forward")
@@ -261,8 +298,8 @@ class MediaPipeService:
             "confidence": confidence,
             "issues": issues,
             "metrics": {
-                "shoulder_slope": float(shoulder_slope),
-                "spine_angle": float(angle)
+                "shoulder_slope": shoulder_slope,
+                "spine_angle": angle
             }
         }
     
@@ -391,8 +428,16 @@ class MediaPipeService:
         # Convert BGR to RGB
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
-        # Process with holistic model to get all landmarks
-        holistic_results = self.holistic.process(frame_rgb)
+        # Process with holistic model to get all landmarks. It is not one of the
+        # inference graphs, so annotating never changes what analyze_image runs
+        # and doesn't disturb the shared graphs' tracking
+        if self.annotation_holistic is None:
+            self.annotation_holistic = self.mp_holistic.Holistic(
+                static_image_mode=True,
+                model_complexity=1,
+                min_detection_confidence=0.5
+            )
+        holistic_results = self.annotation_holistic.process(frame_rgb)
         
         # Convert back to BGR for OpenCV
         annotated_frame = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
@@ -0,0 +1,61 @@
+import sys
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+class StackSampler:
+    """Statistical profiler sampling the Python stacks of all threads of this process.
+
+    A background thread records every thread's stack each ``interval`` seconds
+    while running, so the cost is bounded by the sampling rate and zero when
+    stopped. Results are in the collapsed format ("frame;frame;frame count")
+    that flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self):
+        self.samples: Counter = Counter()
+        self.interval = 0.01
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float = 0.01):
+        if self.running:
+            return
+        self.interval = interval
+        self.samples = Counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return dict(self.samples)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+def collapsed(samples: Dict[str, int]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(samples.items(), key=lambda item: -item[1]))
+
+sampler = StackSampler()
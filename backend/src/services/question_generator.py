@@ -0,0 +1,202 @@
+import asyncio
+import itertools
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+QUESTION_GENERATORS = ("none", "template")
+
+class QuestionGenerator(ABC):
+    """Produces new interview questions, e.g. from a language model."""
+
+    @abstractmethod
+    async def generate(self, difficulty: str, category: Optional[str], count: int) -> List[str]:
+        ...
+
+class TemplateQuestionGenerator(QuestionGenerator):
+    """Deterministic generator filling question templates; for development and tests.
+
+    The same (difficulty, category) always yields the same sequence of questions.
+    """
+
+    TEMPLATES = {
+        "behavioral": [
+            "Tell me about a time you {situation}.",
+            "Describe a situation where you {situation}. What did you learn?"
+        ],
+        "teamwork": [
+            "How did you work with others when you {situation}?",
+            "Tell me about a team that {situation}. What was your role?"
+        ],
+        "leadership": [
+            "How did you lead when your team {situation}?",
+            "Describe how you made a decision after your team {situation}."
+        ],
+        "problem-solving": [
+            "Walk me through how you approached a project that {situation}.",
+            "What would you do differently in a project that {situation}?"
+        ]
+    }
+    SITUATIONS = {
+        "beginner": ["had to learn something new quickly", "received critical feedback", "missed a deadline"],
+        "intermediate": ["disagreed with a colleague", "had to juggle competing priorities", "was short on resources"],
+        "advanced": ["had to deliver bad news to stakeholders", "inherited a failing project", "had to change direction late"]
+    }
+
+    def __init__(self):
+        self.sequences: Dict[Tuple[str, Optional[str]], itertools.cycle] = {}
+
+    async def generate(self, difficulty: str, category: Optional[str], count: int) -> List[str]:
+        key = (difficulty, category)
+        if key not in self.sequences:
+            categories = [category] if category in self.TEMPLATES else sorted(self.TEMPLATES)
+            situations = self.SITUATIONS.get(difficulty, self.SITUATIONS["beginner"])
+            self.sequences[key] = itertools.cycle([
+                template.format(situation=situation)
+                for name in categories
+                for template in self.TEMPLATES[name]
+                for situation in situations
+            ])
+        return [next(self.sequences[key]) for _ in range(count)]
+
+def create_question_generator(name: str) -> Optional[QuestionGenerator]:
+    if name == "none":
+        return None
+    if name == "template":
+        return TemplateQuestionGenerator()
+    raise ValueError(f"Unknown question generator: {name}. Expected one of {', '.join(QUESTION_GENERATORS)}")
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class QuestionPool:
+    """Pre-generated questions per (difficulty, category), served from memory.
+
+    ``take`` never waits for the generator: it hands out what is pooled and, when
+    a pool drops below ``low_water``, wakes a background task that tops it up to
+    ``target``. Generated questions are dropped if they duplicate a pooled or
+    recently served question or one that ``exists`` reports, and expire after
+    ``ttl`` seconds in the pool.
+    """
+
+    def __init__(
+        self,
+        generator: QuestionGenerator,
+        low_water: int = 10,
+        target: int = 50,
+        ttl: float = 3600,
+        exists: Optional[Callable[[str], bool]] = None,
+        recent_size: int = 10000
+    ):
+        self.generator = generator
+        self.low_water = low_water
+        self.target = target
+        self.ttl = ttl
+        self.exists = exists
+        self.recent_size = recent_size
+        # key -> (expiry, question text) in the order they were generated
+        self.pools: Dict[Tuple[str, Optional[str]], Deque[Tuple[float, str]]] = {}
+        self.pooled = set()
+        self.served: "OrderedDict[str, None]" = OrderedDict()
+        self.generated = 0
+        self.duplicates = 0
+        self.expired = 0
+        self._refill_needed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self, keys: List[Tuple[str, Optional[str]]]):
+        """Fill the pools of ``keys`` and start the background refill."""
+        for key in keys:
+            self.pools.setdefault(key, deque())
+        self._refill_needed = asyncio.Event()
+        await self._refill()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            # The flag covers a cancellation swallowed by wait_for
+            self._stopping = True
+            self._refill_needed.set()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def take(self, difficulty: str, category: Optional[str], count: int) -> List[str]:
+        """Up to ``count`` pooled questions; fewer (or none) while the pool is being refilled."""
+        key = (difficulty, category)
+        pool = self.pools.setdefault(key, deque())
+        now = time.time()
+        questions = []
+        while pool and len(questions) < count:
+            expires_at, text = pool.popleft()
+            normalized = _normalize(text)
+            self.pooled.discard(normalized)
+            if expires_at <= now:
+                self.expired += 1
+                continue
+            questions.append(text)
+            self._remember_served(normalized)
+        if len(pool) < self.low_water and self._refill_needed is not None:
+            self._refill_needed.set()
+        return questions
+
+    def _remember_served(self, normalized: str):
+        self.served[normalized] = None
+        self.served.move_to_end(normalized)
+        if len(self.served) > self.recent_size:
+            self.served.popitem(last=False)
+
+    def _evict_expired(self):
+        now = time.time()
+        for pool in self.pools.values():
+            while pool and pool[0][0] <= now:
+                self.pooled.discard(_normalize(pool.popleft()[1]))
+                self.expired += 1
+
+    async def _fill(self, key: Tuple[str, Optional[str]]):
+        pool = self.pools[key]
+        missing = self.target - len(pool)
+        if missing <= 0:
+            return
+        difficulty, category = key
+        expires_at = time.time() + self.ttl
+        for text in await self.generator.generate(difficulty, category, missing):
+            normalized = _normalize(text)
+            if normalized in self.pooled or normalized in self.served or (self.exists and self.exists(text)):
+                self.duplicates += 1
+                continue
+            pool.append((expires_at, text))
+            self.pooled.add(normalized)
+            self.generated += 1
+
+    async def _refill(self):
+        self._evict_expired()
+        for key, pool in list(self.pools.items()):
+            if len(pool) < self.low_water:
+                try:
+                    await self._fill(key)
+                except Exception as e:
+                    print(f"Question generation failed for {key}: {e}")
+
+    async def _run(self):
+        while not self._stopping:
+            # Also wake up periodically so expired questions are evicted and replaced
+            try:
+                await asyncio.wait_for(self._refill_needed.wait(), timeout=max(1.0, self.ttl / 10))
+            except asyncio.TimeoutError:
+                pass
+            self._refill_needed.clear()
+            await self._refill()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pooled": sum(len(pool) for pool in self.pools.values()),
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "expired": self.expired
+        }
@@ -1,8 +1,35 @@
-from typing import List, Dict, Any
-import random
+from typing import List, Dict, Any, Optional
+from .question_store import QuestionStore
+from .question_generator import QuestionGenerator, QuestionPool
+
+# Categories of the basic questions, by question text
+BASIC_QUESTION_TAGS = {
+    "Tell me about yourself.": ("background",),
+    "What are your strengths and weaknesses?": ("self-assessment",),
+    "Why do you want to work for this company?": ("motivation",),
+    "Where do you see yourself in 5 years?": ("career",),
+    "Describe a challenging situation you faced at work and how you handled it.": ("behavioral", "problem-solving"),
+    "Tell me about a time when you had to work with a difficult team member.": ("behavioral", "teamwork"),
+    "How do you handle stress and pressure?": ("self-assessment",),
+    "What are your salary expectations?": ("compensation",),
+    "Why should we hire you?": ("motivation",),
+    "What is your leadership style?": ("leadership",),
+    "Describe a situation where you had to make an unpopular decision.": ("behavioral", "leadership"),
+    "How do you stay motivated in your work?": ("motivation",),
+    "Tell me about a time when you failed and what you learned from it.": ("behavioral", "self-assessment"),
+    "How do you prioritize your work when dealing with multiple deadlines?": ("problem-solving",),
+    "What questions do you have for me about the role or company?": ("closing",)
+}
 
 class QuestionService:
-    def __init__(self):
+    def __init__(
+        self,
+        recent_window: int = 50,
+        generator: Optional[QuestionGenerator] = None,
+        pool_low_water: int = 10,
+        pool_target: int = 50,
+        pool_ttl: float = 3600
+    ):
         # Basic questions to start with before implementing LLAMA
         self.basic_questions = {
             "beginner": [
@@ -27,25 +54,65 @@ class QuestionService:
                 "What questions do you have for me about the role or company?"
             ]
         }
+        self.store = QuestionStore(recent_window=recent_window)
+        for difficulty, questions in self.basic_questions.items():
+            for question in questions:
+                self.store.add(question, difficulty, BASIC_QUESTION_TAGS.get(question, ()))
+        
+        # Generated questions are pre-generated in the background and served before the basic ones
+        self.pool = None
+        if generator is not None:
+            self.pool = QuestionPool(
+                generator,
+                low_water=pool_low_water,
+                target=pool_target,
+                ttl=pool_ttl,
+                exists=self.store.__contains__
+            )
+    
+    async def start(self):
+        if self.pool is not None:
+            await self.pool.start([(difficulty, None) for difficulty in self.basic_questions])
     
-    def get_random_question(self, difficulty: str = "beginner") -> Dict[str, Any]:
+    async def stop(self):
+        if self.pool is not None:
+            await self.pool.stop()
+    
+    def get_random_question(self, difficulty: str = "beginner", user_id: Optional[str] = None) -> Dict[str, Any]:
         """Get a random question based on difficulty level."""
         if difficulty not in self.basic_questions:
             difficulty = "beginner"
         
-        questions = self.basic_questions[difficulty]
-        question = random.choice(questions)
-        
-        return {
-            "question": question,
-            "difficulty": difficulty
-        }
+        return self.store.sample(1, difficulty=difficulty, user_id=user_id)[0].to_dict()
+    
+    def get_questions(
+        self,
+        difficulty: Optional[str] = None,
+        category: Optional[str] = None,
+        count: int = 5,
+        user_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get up to ``count`` distinct questions, optionally filtered by difficulty and category."""
+        generated = []
+        if self.pool is not None:
+            # Pools are kept per known difficulty, as in get_random_question
+            pool_difficulty = difficulty if difficulty in self.basic_questions else "beginner"
+            # Served questions join the store so they count towards the user's recent window
+            generated = [
+                self.store.add(text, pool_difficulty, (category,) if category else ())
+                for text in self.pool.take(pool_difficulty, category, count)
+            ]
+            if user_id is not None:
+                self.store.mark_asked(user_id, [question.id for question in generated])
+        questions = self.store.sample(
+            count - len(generated),
+            difficulty=difficulty,
+            tag=category,
+            user_id=user_id,
+            exclude=[question.id for question in generated]
+        )
+        return [dict(question.to_dict(), generated=True) for question in generated] + [question.to_dict() for question in questions]
     
-    def get_questions_by_category(self, category: str, count: int = 5) -> List[Dict[str, Any]]:
+    def get_questions_by_category(self, category: str, count: int = 5, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get multiple questions by category."""
-        questions = []
-        for difficulty in self.basic_questions:
-            for _ in range(count // 3 + (count % 3 if difficulty == "beginner" else 0)):
-                questions.append(self.get_random_question(difficulty))
-        
-        return questions[:count]
\ No newline at end of file
+        return self.get_questions(category=category, count=count, user_id=user_id)
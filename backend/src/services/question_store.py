@@ -0,0 +1,192 @@
+import random
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class Question(NamedTuple):
+    id: int
+    text: str
+    difficulty: str
+    tags: Tuple[str, ...]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "question": self.text, "difficulty": self.difficulty, "tags": list(self.tags)}
+
+class ShuffledCursor:
+    """Question ids of one index entry in random order, handed out front to back.
+
+    Every question is returned once before any repeats; after a full pass the
+    order is reshuffled in place, so each draw is O(1) amortized and nothing is
+    copied per request.
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.order: List[int] = []
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def add(self, question_id: int):
+        # Insert at a random spot among the questions not handed out yet in this pass
+        self.order.append(question_id)
+        swap = self.rng.randint(self.position, len(self.order) - 1)
+        self.order[swap], self.order[-1] = self.order[-1], self.order[swap]
+
+    def next(self) -> int:
+        if self.position >= len(self.order):
+            self.rng.shuffle(self.order)
+            self.position = 0
+        question_id = self.order[self.position]
+        self.position += 1
+        return question_id
+
+class RecentlyAsked:
+    """The last ``window`` questions asked to one user: a bitset over question ids for O(1) lookups plus their order."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.bits = bytearray()
+        self.order: Deque[int] = deque()
+
+    def __contains__(self, question_id: int) -> bool:
+        byte = question_id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (question_id & 7) & 1)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def add(self, question_id: int):
+        if question_id in self:
+            return
+        byte = question_id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (question_id & 7)
+        self.order.append(question_id)
+        if len(self.order) > self.window:
+            oldest = self.order.popleft()
+            self.bits[oldest >> 3] &= ~(1 << (oldest & 7)) & 0xFF
+
+class QuestionStore:
+    """Interview questions indexed by difficulty, tag and both.
+
+    Each index entry keeps a ShuffledCursor, so sampling ``count`` questions
+    without replacement is O(count) regardless of how many are loaded. Users
+    are not asked the questions of their last ``recent_window`` draws again
+    while others are left; the ``max_users`` most recent users are tracked.
+    """
+
+    def __init__(self, recent_window: int = 50, max_users: int = 10000, seed: Optional[int] = None):
+        self.recent_window = recent_window
+        self.max_users = max_users
+        self.rng = random.Random(seed)
+        self.questions: List[Question] = []
+        self.texts: Dict[str, int] = {}
+        # (difficulty or None, tag or None) -> cursor; (None, None) covers all questions
+        self.cursors: Dict[Tuple[Optional[str], Optional[str]], ShuffledCursor] = {}
+        self.recent: "OrderedDict[str, RecentlyAsked]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def __contains__(self, text: str) -> bool:
+        return _normalize(text) in self.texts
+
+    def add(self, text: str, difficulty: str, tags=()) -> Question:
+        """Add a question; adding the same text again returns the existing question."""
+        key = _normalize(text)
+        if key in self.texts:
+            return self.questions[self.texts[key]]
+
+        question = Question(len(self.questions), text, difficulty, tuple(tags))
+        self.questions.append(question)
+        self.texts[key] = question.id
+        for index_key in self._index_keys(question):
+            if index_key not in self.cursors:
+                self.cursors[index_key] = ShuffledCursor(self.rng)
+            self.cursors[index_key].add(question.id)
+        return question
+
+    @staticmethod
+    def _index_keys(question: Question):
+        yield None, None
+        yield question.difficulty, None
+        for tag in question.tags:
+            yield None, tag
+            yield question.difficulty, tag
+
+    def difficulties(self) -> List[str]:
+        return sorted({difficulty for difficulty, tag in self.cursors if difficulty and tag is None})
+
+    def tags(self) -> List[str]:
+        return sorted({tag for difficulty, tag in self.cursors if tag and difficulty is None})
+
+    def count(self, difficulty: Optional[str] = None, tag: Optional[str] = None) -> int:
+        cursor = self.cursors.get((difficulty, tag))
+        return len(cursor) if cursor else 0
+
+    def _recently_asked(self, user_id: str) -> RecentlyAsked:
+        recent = self.recent.get(user_id)
+        if recent is None:
+            recent = self.recent[user_id] = RecentlyAsked(self.recent_window)
+            if len(self.recent) > self.max_users:
+                self.recent.popitem(last=False)
+        else:
+            self.recent.move_to_end(user_id)
+        return recent
+
+    def sample(
+        self,
+        count: int,
+        difficulty: Optional[str] = None,
+        tag: Optional[str] = None,
+        user_id: Optional[str] = None,
+        exclude: Iterable[int] = ()
+    ) -> List[Question]:
+        """Up to ``count`` distinct questions matching the filters, avoiding the user's recent ones if possible.
+
+        Questions in ``exclude`` are never returned.
+        """
+        cursor = self.cursors.get((difficulty, tag))
+        if cursor is None:
+            return []
+        seen = set(exclude)
+        excluded = sum(1 for question_id in seen if (difficulty, tag) in self._index_keys(self.questions[question_id]))
+        count = min(count, len(cursor) - excluded)
+        recent = self._recently_asked(user_id) if user_id is not None else None
+
+        chosen: List[int] = []
+        # A recently asked or excluded question shows up at most once per pass,
+        # so this needs at most count + excluded + len(recent) draws
+        draws = min(len(cursor), count + excluded + (len(recent) if recent is not None else 0))
+        for _ in range(draws):
+            if len(chosen) == count:
+                break
+            question_id = cursor.next()
+            if question_id not in seen and (recent is None or question_id not in recent):
+                chosen.append(question_id)
+                seen.add(question_id)
+
+        # Too few questions left that the user hasn't seen lately: allow those too
+        for _ in range(2 * len(cursor)):
+            if len(chosen) == count:
+                break
+            question_id = cursor.next()
+            if question_id not in seen:
+                chosen.append(question_id)
+                seen.add(question_id)
+
+        if recent is not None:
+            for question_id in chosen:
+                recent.add(question_id)
+        return [self.questions[question_id] for question_id in chosen]
+
+    def mark_asked(self, user_id: str, question_ids: Iterable[int]):
+        """Record questions asked to the user outside ``sample``."""
+        recent = self._recently_asked(user_id)
+        for question_id in question_ids:
+            recent.add(question_id)
@@ -0,0 +1,237 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from pymongo.errors import BulkWriteError, PyMongoError
+
+class ResultBucket:
+    """Frame results of one session over a short time span, stored column-wise.
+
+    One document holds many frames as parallel arrays (time offset in ms,
+    score, eye contact, expression, posture, issues), so a session produces a
+    document every few seconds instead of one per frame.
+    """
+
+    def __init__(self, session_id: str, user_id: str, sequence: int, start: float):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.sequence = sequence
+        self.start = start
+        self.end = start
+        self.offsets: List[int] = []
+        self.scores: List[Optional[float]] = []
+        self.eye_contact: List[Optional[bool]] = []
+        self.expressions: List[Optional[str]] = []
+        self.postures: List[Optional[str]] = []
+        self.issues: List[List[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def add(self, result: Dict[str, Any], timestamp: float):
+        self.end = timestamp
+        self.offsets.append(int(round((timestamp - self.start) * 1000)))
+        self.scores.append(result["confidence_score"]["score"])
+        eye_contact = result.get("eye_contact")
+        self.eye_contact.append(eye_contact["looking_at_camera"] if eye_contact else None)
+        expression = result.get("facial_expression")
+        self.expressions.append(expression["dominant"] if expression else None)
+        posture = result.get("posture")
+        self.postures.append(posture["quality"] if posture else None)
+        self.issues.append(posture["issues"] if posture else [])
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            # Deterministic id, so a retried insert can't store a bucket twice
+            "_id": f"{self.session_id}:{self.sequence}",
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "start": datetime.utcfromtimestamp(self.start),
+            "end": datetime.utcfromtimestamp(self.end),
+            "frames": len(self),
+            "t": self.offsets,
+            "score": self.scores,
+            "eye_contact": self.eye_contact,
+            "expression": self.expressions,
+            "posture": self.postures,
+            "issues": self.issues
+        }
+
+class AnalysisResultWriter:
+    """Write-behind persistence of frame analysis results.
+
+    Results are appended to an open bucket per session. A bucket is closed once
+    it spans ``bucket_seconds``, holds ``max_bucket_frames`` frames or its
+    session ends, and closed buckets are written with ``insert_many`` once
+    ``batch_size`` of them are pending or every ``flush_interval`` seconds.
+
+    When the database falls behind and more than ``max_pending`` closed buckets
+    are waiting, ``add`` holds its caller for up to ``max_wait`` seconds, which
+    slows the session down, and after that drops the oldest buckets so memory
+    stays bounded while the database is unavailable. A bucket the database
+    rejects for any reason other than a duplicate key is retried
+    ``max_attempts`` times and then dropped.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: float = 30,
+        max_bucket_frames: int = 600,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        max_pending: int = 500,
+        max_wait: float = 0.5,
+        max_attempts: int = 3,
+        stop_timeout: float = 10.0
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.max_bucket_frames = max_bucket_frames
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.stop_timeout = stop_timeout
+        self.collection = None
+        self.buckets: Dict[str, ResultBucket] = {}
+        self.sequences: Dict[str, int] = {}
+        self.pending: Deque[Dict[str, Any]] = deque()
+        self.written = 0
+        self.dropped = 0
+        # Rejected write attempts per bucket id
+        self.attempts: Dict[str, int] = {}
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._room: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self, collection):
+        self.collection = collection
+        self._flush_requested = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Close all open buckets and write everything still pending."""
+        if self._task:
+            # The flag and the event make the loop finish its current flush and
+            # exit; cancelling it could lose a batch that is being inserted
+            self._stopping = True
+            self._flush_requested.set()
+            try:
+                await asyncio.wait_for(self._task, self.stop_timeout)
+            except asyncio.TimeoutError:
+                print(f"Result writer did not stop within {self.stop_timeout}s")
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for session_id in list(self.buckets):
+            self._close(session_id)
+        await self._flush()
+        if self.pending:
+            print(f"Could not persist {len(self.pending)} analysis result bucket(s) on shutdown")
+
+    async def add(self, session_id: str, user_id: str, result: Dict[str, Any], timestamp: Optional[float] = None):
+        now = time.time() if timestamp is None else timestamp
+        bucket = self.buckets.get(session_id)
+        if bucket is not None and now - bucket.start >= self.bucket_seconds:
+            self._close(session_id)
+            bucket = None
+        if bucket is None:
+            sequence = self.sequences.get(session_id, 0)
+            self.sequences[session_id] = sequence + 1
+            bucket = self.buckets[session_id] = ResultBucket(session_id, user_id, sequence, now)
+
+        bucket.add(result, now)
+        if len(bucket) >= self.max_bucket_frames:
+            self._close(session_id)
+
+        if len(self.pending) > self.max_pending and self._room is not None:
+            # Backpressure: wait for the writer to catch up, then shed the oldest buckets
+            self._room.clear()
+            self._flush_requested.set()
+            try:
+                await asyncio.wait_for(self._room.wait(), self.max_wait)
+            except asyncio.TimeoutError:
+                while len(self.pending) > self.max_pending:
+                    self.pending.popleft()
+                    self.dropped += 1
+
+    def end_session(self, session_id: str):
+        self._close(session_id)
+        self.sequences.pop(session_id, None)
+
+    def _close(self, session_id: str):
+        bucket = self.buckets.pop(session_id, None)
+        if bucket is not None and len(bucket):
+            self.pending.append(bucket.to_document())
+            if len(self.pending) >= self.batch_size and self._flush_requested is not None:
+                self._flush_requested.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            # Buckets of sessions that stopped sending frames are closed here
+            now = time.time()
+            for session_id, bucket in list(self.buckets.items()):
+                if now - bucket.start >= self.bucket_seconds:
+                    self._close(session_id)
+            await self._flush()
+
+    async def _flush(self):
+        while self.pending and self.collection is not None:
+            batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                rejected = []
+            except asyncio.CancelledError:
+                # Put the batch back so stop() can still write it
+                self.pending.extendleft(reversed(batch))
+                raise
+            except BulkWriteError as e:
+                # Duplicates were written by an earlier attempt
+                rejected = [error for error in e.details["writeErrors"] if error["code"] != 11000]
+            except PyMongoError as e:
+                print(f"Could not persist analysis results: {e}")
+                self.pending.extendleft(reversed(batch))
+                break
+            self.written += len(batch) - len(rejected)
+            failed = self._retryable(rejected, batch)
+            if failed:
+                self.pending.extendleft(reversed(failed))
+                break
+        if len(self.pending) <= self.max_pending and self._room is not None:
+            self._room.set()
+
+    def _retryable(self, errors: List[Dict[str, Any]], batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The rejected documents of a batch that have attempts left; the others are dropped."""
+        retry = []
+        for error in errors:
+            document = batch[error["index"]]
+            attempts = self.attempts.pop(document["_id"], 0) + 1
+            if attempts < self.max_attempts:
+                self.attempts[document["_id"]] = attempts
+                retry.append(document)
+            else:
+                self.dropped += 1
+                print(f"Dropped analysis result bucket {document['_id']} after {attempts} attempts: {error.get('errmsg')}")
+        rejected = {batch[error["index"]]["_id"] for error in errors}
+        for document in batch:
+            if document["_id"] not in rejected:
+                self.attempts.pop(document["_id"], None)
+        return retry
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "open_buckets": len(self.buckets),
+            "pending": len(self.pending),
+            "written": self.written,
+            "dropped": self.dropped
+        }
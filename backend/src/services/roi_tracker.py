@@ -0,0 +1,72 @@
+import numpy as np
+from typing import Optional, Tuple
+
+# (x0, y0, x1, y1) in normalized full-frame coordinates
+Box = Tuple[float, float, float, float]
+# (x offset, y offset, x scale, y scale) mapping crop-normalized to frame-normalized coordinates
+CropTransform = Tuple[float, float, float, float]
+
+FULL_FRAME: CropTransform = (0.0, 0.0, 1.0, 1.0)
+
+class RoiTracker:
+    """Tracks the face/upper-body region of one session so later frames can be cropped to it.
+
+    The region is the bounding box of the previous frame's landmarks, padded by
+    ``margin`` (relative to its larger side) and never smaller than ``min_size``
+    of the frame. It is only moved when the subject gets within ``hysteresis``
+    of its edges or shrinks well inside it, which keeps the crop stable for
+    MediaPipe's tracking between frames.
+    """
+
+    def __init__(self, margin: float = 0.3, min_size: float = 0.35, hysteresis: float = 0.1):
+        self.margin = margin
+        self.min_size = min_size
+        self.hysteresis = hysteresis
+        self.box: Optional[Box] = None
+
+    def crop(self, frame: np.ndarray) -> Tuple[np.ndarray, CropTransform]:
+        """Return a view of ``frame`` cropped to the tracked region and the transform back to the frame."""
+        if self.box is None:
+            return frame, FULL_FRAME
+
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = self.box
+        px0, py0 = int(x0 * width), int(y0 * height)
+        px1, py1 = max(px0 + 1, int(round(x1 * width))), max(py0 + 1, int(round(y1 * height)))
+        return frame[py0:py1, px0:px1], (px0 / width, py0 / height, (px1 - px0) / width, (py1 - py0) / height)
+
+    def update(self, points: Optional[np.ndarray]):
+        """Update the region from (N, 2) landmark points in normalized full-frame coordinates."""
+        if points is None or len(points) == 0:
+            # Subject lost: search the whole frame again
+            self.box = None
+            return
+
+        points = np.clip(points, 0.0, 1.0)
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+        half = max(max(x1 - x0, y1 - y0) * (0.5 + self.margin), self.min_size / 2)
+        if self.box is not None and self._fits(x0, y0, x1, y1, half):
+            return
+
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        self.box = (
+            float(max(0.0, cx - half)),
+            float(max(0.0, cy - half)),
+            float(min(1.0, cx + half)),
+            float(min(1.0, cy + half))
+        )
+
+    def _fits(self, x0: float, y0: float, x1: float, y1: float, half: float) -> bool:
+        bx0, by0, bx1, by1 = self.box
+        pad_x = (bx1 - bx0) * self.hysteresis
+        pad_y = (by1 - by0) * self.hysteresis
+        inside = (
+            (x0 >= bx0 + pad_x or bx0 <= 0.0)
+            and (y0 >= by0 + pad_y or by0 <= 0.0)
+            and (x1 <= bx1 - pad_x or bx1 >= 1.0)
+            and (y1 <= by1 - pad_y or by1 >= 1.0)
+        )
+        # Re-center once the region is much larger than the subject needs
+        not_oversized = max(bx1 - bx0, by1 - by0) <= 4 * half
+        return inside and not_oversized
@@ -0,0 +1,162 @@
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+class SessionAggregator:
+    """Streaming per-session summary of frame analysis results.
+
+    Every update is O(1) and memory is bounded: cumulative counters, exponential
+    moving averages (weight ``alpha`` for the newest frame) and a fixed-size
+    window of the most recent confidence scores with a running sum.
+
+    All times of a session are on one clock, chosen by its first frame: the
+    client's capture time when that frame carries one, the server's ``clock``
+    otherwise. Binary frames carry capture times and JSON frames may not, so
+    on a client-clock session a frame without one is placed by the server time
+    elapsed since the last capture time, and on a server-clock session capture
+    times are ignored.
+    """
+
+    def __init__(self, alpha: float = 0.2, window: int = 30, clock: Callable[[], float] = time.monotonic):
+        self.alpha = alpha
+        self.clock = clock
+        self.client_clock: Optional[bool] = None
+        # Client capture time minus server time at the last frame that had one
+        self.client_offset = 0.0
+        self.frames = 0
+        self.started_at: Optional[float] = None
+        self.last_at: Optional[float] = None
+
+        # Confidence score
+        self.score_ema: Optional[float] = None
+        self.score_total = 0.0
+        self.recent_scores: Deque[float] = deque(maxlen=window)
+        self.recent_total = 0.0
+
+        # Eye contact
+        self.eye_frames = 0
+        self.eye_contact_frames = 0
+        self.eye_contact_time = 0.0
+        self.streak_started_at: Optional[float] = None
+        self.longest_streak = 0.0
+
+        # Posture
+        self.posture_frames = 0
+        self.poor_posture_frames = 0
+        self.issue_rate_ema = 0.0
+        self.issue_counts: Dict[str, int] = {}
+
+        # Facial expression
+        self.expression_counts: Dict[str, int] = {}
+
+    def update(self, result: Dict[str, Any], timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """Fold one frame's analysis (``timestamp`` in seconds) into the session and return the summary.
+
+        Also fills in the eye-contact ``duration`` of ``result`` with the current streak.
+        """
+        now = self._session_time(timestamp)
+        if self.started_at is None:
+            self.started_at = now
+        elapsed = max(0.0, now - self.last_at) if self.last_at is not None else 0.0
+        self.last_at = now
+        self.frames += 1
+
+        score = result["confidence_score"]["score"]
+        self.score_ema = score if self.score_ema is None else self.score_ema + self.alpha * (score - self.score_ema)
+        self.score_total += score
+        if len(self.recent_scores) == self.recent_scores.maxlen:
+            self.recent_total -= self.recent_scores[0]
+        self.recent_scores.append(score)
+        self.recent_total += score
+
+        eye_contact = result.get("eye_contact")
+        if eye_contact:
+            self.eye_frames += 1
+            if eye_contact["looking_at_camera"]:
+                self.eye_contact_frames += 1
+                if self.streak_started_at is None:
+                    self.streak_started_at = now
+                else:
+                    self.eye_contact_time += elapsed
+                self.longest_streak = max(self.longest_streak, now - self.streak_started_at)
+            else:
+                self.streak_started_at = None
+            eye_contact["duration"] = round(self.current_streak, 2)
+        else:
+            self.streak_started_at = None
+
+        posture = result.get("posture")
+        if posture:
+            self.posture_frames += 1
+            issues = posture["issues"]
+            if posture["quality"] == "poor":
+                self.poor_posture_frames += 1
+            for issue in issues:
+                self.issue_counts[issue] = self.issue_counts.get(issue, 0) + 1
+            self.issue_rate_ema += self.alpha * ((1.0 if issues else 0.0) - self.issue_rate_ema)
+
+        expression = result.get("facial_expression")
+        if expression:
+            dominant = expression["dominant"]
+            self.expression_counts[dominant] = self.expression_counts.get(dominant, 0) + 1
+
+        return self.summary()
+
+    def _session_time(self, timestamp: Optional[float]) -> float:
+        received = self.clock()
+        if self.client_clock is None:
+            self.client_clock = timestamp is not None
+        if not self.client_clock:
+            return received
+        if timestamp is not None:
+            self.client_offset = timestamp - received
+            return timestamp
+        return received + self.client_offset
+
+    @property
+    def current_streak(self) -> float:
+        if self.streak_started_at is None or self.last_at is None:
+            return 0.0
+        return self.last_at - self.streak_started_at
+
+    def totals(self) -> Dict[str, Any]:
+        """Additive counters of the session, which can be summed across sessions."""
+        return {
+            "frames": self.frames,
+            "duration": round(self.last_at - self.started_at, 2) if self.frames else 0.0,
+            "score_total": self.score_total,
+            "eye_frames": self.eye_frames,
+            "eye_contact_frames": self.eye_contact_frames,
+            "eye_contact_time": round(self.eye_contact_time, 2),
+            "posture_frames": self.posture_frames,
+            "poor_posture_frames": self.poor_posture_frames,
+            "issue_counts": dict(self.issue_counts),
+            "expression_counts": dict(self.expression_counts)
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        expression_frames = sum(self.expression_counts.values())
+        return {
+            "frames": self.frames,
+            "duration": round(self.last_at - self.started_at, 2) if self.frames else 0.0,
+            "confidence": {
+                "smoothed": round(self.score_ema, 1) if self.score_ema is not None else None,
+                "recent_average": round(self.recent_total / len(self.recent_scores), 1) if self.recent_scores else None,
+                "average": round(self.score_total / self.frames, 1) if self.frames else None
+            },
+            "eye_contact": {
+                "ratio": round(self.eye_contact_frames / self.eye_frames, 3) if self.eye_frames else None,
+                "current_streak": round(self.current_streak, 2),
+                "longest_streak": round(self.longest_streak, 2),
+                "total_time": round(self.eye_contact_time, 2)
+            },
+            "posture": {
+                "poor_ratio": round(self.poor_posture_frames / self.posture_frames, 3) if self.posture_frames else None,
+                "issue_rate": round(self.issue_rate_ema, 3),
+                "issue_counts": dict(self.issue_counts)
+            },
+            "expressions": {
+                expression: round(count / expression_frames, 3)
+                for expression, count in self.expression_counts.items()
+            }
+        }
@@ -1,33 +1,259 @@
 from fastapi import WebSocket, WebSocketDisconnect
 import json
 import asyncio
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional, Set
+
+from .backplane import Backplane, InMemoryBackplane
+from .metrics import registry
+
+SERIALIZE_SECONDS = registry.histogram("websocket_serialize_seconds", "Time to serialize an outbound WebSocket message")
+SEND_SECONDS = registry.histogram("websocket_send_seconds", "Time to write a message to a WebSocket client")
+MESSAGES_DROPPED = registry.counter(
+    "websocket_messages_dropped_total", "Outbound messages dropped because a client's queue was full"
+)
+CONNECTIONS_OPENED = registry.counter("websocket_connections_opened_total", "WebSocket connections accepted")
+
+# What to do when a client's outbound queue is full
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect")
+
+# Backplane channels: every node listens on the broadcast channel, and on the
+# channels of the users connected to it and the rooms they are in
+BROADCAST_CHANNEL = "broadcast"
+
+def user_channel(user_id: str) -> str:
+    return f"user:{user_id}"
+
+def room_channel(room_id: str) -> str:
+    return f"room:{room_id}"
+
+def serialize(message: dict) -> str:
+    started = time.perf_counter()
+    text = json.dumps(message, separators=(",", ":"))
+    SERIALIZE_SECONDS.observe(time.perf_counter() - started)
+    return text
 
 class WebRTCConnection:
-    def __init__(self, websocket: WebSocket, user_id: str):
+    def __init__(self, websocket: WebSocket, user_id: str, queue_size: int = 64):
         self.websocket = websocket
         self.user_id = user_id
         self.is_active = True
+        self.dropped = 0
+        # Messages are queued already serialized and written by a single task,
+        # so a slow client never blocks the sender and sends never interleave
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer = asyncio.create_task(self._write())
+
+    def enqueue(self, text: str, policy: str = "drop_oldest") -> bool:
+        """Queue a serialized message; returns False if the client should be disconnected."""
+        if not self.is_active:
+            return True
+        if self.queue.full():
+            if policy == "disconnect":
+                return False
+            self.queue.get_nowait()
+            self.dropped += 1
+            MESSAGES_DROPPED.inc()
+        self.queue.put_nowait(text)
+        return True
+
+    async def _write(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                started = time.perf_counter()
+                await self.websocket.send_text(text)
+                SEND_SECONDS.observe(time.perf_counter() - started)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The socket is gone; the receive loop will see the disconnect
+            self.is_active = False
+
+    def close(self):
+        self.is_active = False
+        self.writer.cancel()
 
 class WebRTCService:
-    def __init__(self):
+    """Delivers messages to WebSocket clients connected to this node or, through the backplane, to any other node."""
+
+    def __init__(
+        self,
+        queue_size: int = 64,
+        slow_consumer_policy: str = "drop_oldest",
+        backplane: Optional[Backplane] = None
+    ):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.backplane = backplane or InMemoryBackplane()
         self.active_connections: Dict[str, WebRTCConnection] = {}
-    
+        # Members of each room connected to this node, and the room of each of
+        # them; membership across all nodes is kept by the backplane
+        self.rooms: Dict[str, Set[str]] = {}
+        self.user_rooms: Dict[str, str] = {}
+
+    @property
+    def node_id(self) -> str:
+        return self.backplane.node_id
+
+    async def start(self):
+        await self.backplane.start(self._on_backplane_message)
+        await self.backplane.subscribe(BROADCAST_CHANNEL)
+
+    async def stop(self):
+        for user_id in list(self.active_connections):
+            await self.disconnect(user_id)
+        await self.backplane.stop()
+
     async def connect(self, websocket: WebSocket, user_id: str):
         await websocket.accept()
-        self.active_connections[user_id] = WebRTCConnection(websocket, user_id)
-    
-    def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].is_active = False
-            del self.active_connections[user_id]
-    
+        # A reconnect replaces the previous connection of the same user
+        previous = self.active_connections.get(user_id)
+        self.active_connections[user_id] = WebRTCConnection(websocket, user_id, self.queue_size)
+        CONNECTIONS_OPENED.inc()
+        if previous:
+            previous.close()
+            # Close the old socket too, or its receive loop keeps feeding frames
+            # into the session. 4000: replaced by a newer connection
+            try:
+                await previous.websocket.close(code=4000)
+            except Exception:
+                pass
+
+        previous_node = await self.backplane.register(user_id)
+        if previous_node is not None and previous_node != self.node_id:
+            # Still connected on another node: that connection is closed there
+            await self._publish(user_channel(user_id), {"evict": True})
+        await self.backplane.subscribe(user_channel(user_id))
+
+    async def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None):
+        connection = self.active_connections.get(user_id)
+        # Ignore late disconnects from a connection that was already replaced
+        if not connection or (websocket is not None and connection.websocket is not websocket):
+            return
+        connection.close()
+        del self.active_connections[user_id]
+        await self.leave(user_id)
+        # The user may have reconnected to this node in the meantime
+        if user_id not in self.active_connections:
+            await self.backplane.unsubscribe(user_channel(user_id))
+            await self.backplane.unregister(user_id)
+
+    async def join(self, user_id: str, room_id: str) -> List[str]:
+        """Move a user into a room and return the peers already in it."""
+        if self.user_rooms.get(user_id) == room_id:
+            return await self.peers(user_id)
+        await self.leave(user_id)
+
+        peers = [member for member in await self.backplane.members(room_id) if member != user_id]
+        await self._publish_to_room(room_id, {"type": "peer_joined", "room": room_id, "user_id": user_id}, user_id)
+        members = self.rooms.setdefault(room_id, set())
+        first_local_member = not members
+        members.add(user_id)
+        self.user_rooms[user_id] = room_id
+        if first_local_member:
+            await self.backplane.subscribe(room_channel(room_id))
+        await self.backplane.add_member(room_id, user_id)
+        return peers
+
+    async def leave(self, user_id: str):
+        room_id = self.user_rooms.pop(user_id, None)
+        if room_id is None:
+            return
+        members = self.rooms[room_id]
+        members.discard(user_id)
+        if not members:
+            del self.rooms[room_id]
+            await self.backplane.unsubscribe(room_channel(room_id))
+        await self.backplane.remove_member(room_id, user_id)
+        await self._publish_to_room(room_id, {"type": "peer_left", "room": room_id, "user_id": user_id}, user_id)
+
+    async def peers(self, user_id: str) -> List[str]:
+        room_id = self.user_rooms.get(user_id)
+        if room_id is None:
+            return []
+        return [member for member in await self.backplane.members(room_id) if member != user_id]
+
+    def _deliver(self, connection: WebRTCConnection, text: str):
+        if not connection.enqueue(text, self.slow_consumer_policy):
+            # Slow consumer under the "disconnect" policy: drop it instead of buffering without bound
+            connection.close()
+            # 1013: try again later
+            asyncio.create_task(self._drop(connection, 1013))
+
+    async def _drop(self, connection: WebRTCConnection, code: int):
+        await self.disconnect(connection.user_id, connection.websocket)
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def _deliver_local(self, user_ids, text: str, exclude=()):
+        for user_id in list(user_ids):
+            connection = self.active_connections.get(user_id)
+            if connection and user_id not in exclude:
+                self._deliver(connection, text)
+
+    async def _publish(self, channel: str, envelope: dict):
+        await self.backplane.publish(channel, serialize({"origin": self.node_id, **envelope}))
+
+    async def _publish_to_room(self, room_id: str, message: dict, exclude: str):
+        # Local members get the message directly, other nodes through the room channel
+        text = serialize(message)
+        self._deliver_local(self.rooms.get(room_id, ()), text, (exclude,))
+        await self._publish(room_channel(room_id), {"exclude": [exclude], "data": text})
+
+    def _on_backplane_message(self, channel: str, payload: str):
+        envelope = json.loads(payload)
+        # Messages from this node were already delivered locally
+        if envelope["origin"] == self.node_id:
+            return
+        if channel == BROADCAST_CHANNEL:
+            self._deliver_local(self.active_connections, envelope["data"], envelope["exclude"])
+        elif channel.startswith("room:"):
+            self._deliver_local(self.rooms.get(channel[len("room:"):], ()), envelope["data"], envelope["exclude"])
+        elif channel.startswith("user:"):
+            connection = self.active_connections.get(channel[len("user:"):])
+            if connection is None:
+                return
+            if envelope.get("evict"):
+                # The user connected to another node. 4000: replaced by a newer connection
+                connection.close()
+                asyncio.create_task(self._drop(connection, 4000))
+            else:
+                self._deliver(connection, envelope["data"])
+
     async def send_message(self, user_id: str, message: dict):
-        if user_id in self.active_connections:
-            await self.active_connections[user_id].websocket.send_json(message)
+        connection = self.active_connections.get(user_id)
+        if connection:
+            self._deliver(connection, serialize(message))
+        else:
+            await self._publish(user_channel(user_id), {"data": serialize(message)})
+
+    async def send_to_room(self, sender_id: str, message: dict, target: Optional[str] = None) -> bool:
+        """Deliver a message from ``sender_id`` to its room peers, or only to ``target`` if given.
+        
+        Returns False if the sender is not in a room or the target is not one of its peers.
+        """
+        room_id = self.user_rooms.get(sender_id)
+        if room_id is None:
+            return False
+        if target is None:
+            await self._publish_to_room(room_id, message, sender_id)
+            return True
+        if target == sender_id:
+            return False
+        if target not in self.rooms[room_id] and target not in await self.backplane.members(room_id):
+            return False
+        await self.send_message(target, message)
+        return True
     
     async def broadcast(self, message: dict, exclude: List[str] = None):
         exclude = exclude or []
-        for user_id, connection in self.active_connections.items():
-            if user_id not in exclude:
-                await connection.websocket.send_json(message)
\ No newline at end of file
+        # Serialize once for all recipients and iterate over a snapshot, since
+        # delivering may disconnect slow consumers
+        text = serialize(message)
+        self._deliver_local(self.active_connections, text, exclude)
+        await self._publish(BROADCAST_CHANNEL, {"exclude": exclude, "data": text})
@@ -0,0 +1,39 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.services.analysis_engine import AnalysisEngine, AnalysisWorker
+
+class PlainWorker(AnalysisWorker):
+    """A worker process without the MediaPipe initializer."""
+
+    created = 0
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        PlainWorker.created += 1
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+def test_broken_pool_is_replaced_once():
+    async def scenario():
+        worker = PlainWorker(0, queue_size=4, options={})
+        try:
+            assert await worker.run(abs, -1) == 1
+            # The first call kills the process; every call in flight sees the broken pool
+            results = await asyncio.gather(*(worker.run(os._exit, 1) for _ in range(3)), return_exceptions=True)
+            assert all(isinstance(result, BrokenProcessPool) for result in results)
+            assert PlainWorker.created == 2
+            assert await worker.run(abs, -2) == 2
+        finally:
+            worker.shutdown()
+
+    asyncio.run(asyncio.wait_for(scenario(), 60))
+
+def test_pinned_sessions_are_spread_round_robin():
+    engine = AnalysisEngine(workers=3)
+    assert [engine.pin_session(f"video-{index}") for index in range(4)] == [0, 1, 2, 0]
+    asyncio.run(engine.end_session("video-1"))
+    # The worker that freed up is the least busy one
+    assert engine.pin_session("video-4") == 1
+    assert engine.pin_session("video-5") == 2
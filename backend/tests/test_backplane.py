@@ -0,0 +1,183 @@
+import asyncio
+import json
+
+import pytest
+
+from src.services import backplane as backplane_module
+from src.services.backplane import Backplane, BackplaneHub, InMemoryBackplane, LocalBackplane
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+        self.received = asyncio.Event()
+
+    def __call__(self, channel, data):
+        self.messages.append((channel, data))
+        self.received.set()
+
+    async def wait_for(self, count):
+        while len(self.messages) < count:
+            self.received.clear()
+            await self.received.wait()
+        return self.messages
+
+async def settle(node: Backplane):
+    # A request is answered after everything the node sent before it was applied
+    await node.members("settle")
+
+async def round_trip(first: Backplane, second: Backplane):
+    first_inbox, second_inbox = Inbox(), Inbox()
+    await first.start(first_inbox)
+    await second.start(second_inbox)
+    try:
+        await first.subscribe("room:a")
+        await second.subscribe("room:a")
+        await second.subscribe("user:bob")
+        await settle(second)
+
+        await first.publish("room:a", "hello")
+        await first.publish("user:bob", "direct")
+        # Publishers receive their own messages too
+        assert await first_inbox.wait_for(1) == [("room:a", "hello")]
+        assert await second_inbox.wait_for(2) == [("room:a", "hello"), ("user:bob", "direct")]
+
+        assert await first.register("bob") is None
+        assert await second.register("bob") == first.node_id
+        assert await first.locate("bob") == second.node_id
+
+        await first.add_member("room:a", "alice")
+        await second.add_member("room:a", "bob")
+        await settle(second)
+        assert await first.members("room:a") == ["alice", "bob"]
+
+        await second.unsubscribe("room:a")
+        await settle(second)
+        await first.publish("room:a", "again")
+        await first.publish("user:bob", "after")
+        await second_inbox.wait_for(3)
+        assert second_inbox.messages[-1] == ("user:bob", "after")
+    finally:
+        await second.stop()
+        await first.stop()
+
+def test_backplane_is_abstract():
+    with pytest.raises(TypeError):
+        Backplane()
+
+def test_in_memory_round_trip():
+    hub = BackplaneHub()
+    run(round_trip(InMemoryBackplane(hub, "node-1"), InMemoryBackplane(hub, "node-2")))
+
+def test_unix_socket_round_trip(tmp_path):
+    path = str(tmp_path / "hub.sock")
+    run(round_trip(LocalBackplane(path, "node-1"), LocalBackplane(path, "node-2")))
+
+def test_stopped_node_leaves_no_presence(tmp_path):
+    path = str(tmp_path / "hub.sock")
+
+    async def scenario():
+        host, other = LocalBackplane(path, "host"), LocalBackplane(path, "other")
+        await host.start(Inbox())
+        await other.start(Inbox())
+        await other.register("carol")
+        await other.add_member("room:b", "carol")
+        await other.stop()
+        await asyncio.sleep(0.1)
+        try:
+            assert await host.locate("carol") is None
+            assert await host.members("room:b") == []
+        finally:
+            await host.stop()
+
+    run(scenario())
+
+def oversized_scenario(path, monkeypatch, limit_hub):
+    async def scenario():
+        first, second = LocalBackplane(path, "node-1"), LocalBackplane(path, "node-2")
+        inbox = Inbox()
+        # The first node hosts the hub; the limit applies to whatever connects after it is set
+        if limit_hub:
+            monkeypatch.setattr(backplane_module, "MAX_MESSAGE_SIZE", 1024)
+        await first.start(Inbox())
+        monkeypatch.setattr(backplane_module, "MAX_MESSAGE_SIZE", 1024)
+        await second.start(inbox)
+        try:
+            await second.subscribe("room:a")
+            await settle(second)
+            await first.publish("room:a", "x" * 4096)
+            await first.publish("room:a", "small")
+            assert await inbox.wait_for(1) == [("room:a", "small")]
+            # Both the hub and the node keep serving requests
+            assert await second.members("room:a") == []
+        finally:
+            await second.stop()
+            await first.stop()
+
+    return scenario()
+
+def test_hub_drops_oversized_messages(tmp_path, monkeypatch):
+    run(oversized_scenario(str(tmp_path / "hub.sock"), monkeypatch, limit_hub=True))
+
+def test_node_drops_oversized_messages(tmp_path, monkeypatch):
+    run(oversized_scenario(str(tmp_path / "hub.sock"), monkeypatch, limit_hub=False))
+
+def test_hub_ignores_malformed_lines(tmp_path):
+    path = str(tmp_path / "hub.sock")
+
+    async def scenario():
+        node = LocalBackplane(path, "node-1")
+        inbox = Inbox()
+        await node.start(inbox)
+        try:
+            await node.subscribe("room:a")
+            await settle(node)
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b"not json\n[1, 2]\n" + json.dumps({"op": "publish", "bogus": 1}).encode() + b"\n")
+            writer.write(json.dumps({"op": "publish", "channel": "room:a", "data": "ok"}).encode() + b"\n")
+            await writer.drain()
+            assert await inbox.wait_for(1) == [("room:a", "ok")]
+            writer.close()
+        finally:
+            await node.stop()
+
+    run(scenario())
+
+def test_requests_wait_for_a_reconnect(tmp_path, monkeypatch):
+    monkeypatch.setattr(backplane_module, "RECONNECT_DELAY", 0.2)
+    path = str(tmp_path / "hub.sock")
+
+    async def scenario():
+        host, node = LocalBackplane(path, "host"), LocalBackplane(path, "node")
+        await host.start(Inbox())
+        await node.start(Inbox())
+        await node.register("dave")
+        # The hub goes away with its host; the node takes over after RECONNECT_DELAY
+        await host.stop()
+        await asyncio.sleep(0.05)
+        assert not node.connected.is_set()
+        try:
+            assert await node.locate("dave") == "node"
+            assert node.hub_server is not None
+        finally:
+            await node.stop()
+
+    run(scenario())
+
+def test_requests_time_out_without_a_hub(tmp_path, monkeypatch):
+    monkeypatch.setattr(backplane_module, "REQUEST_TIMEOUT", 0.2)
+    path = str(tmp_path / "hub.sock")
+
+    async def scenario():
+        node = LocalBackplane(path, "node")
+        await node.start(Inbox())
+        try:
+            node.connected.clear()
+            with pytest.raises(ConnectionError):
+                await node.locate("erin")
+        finally:
+            await node.stop()
+
+    run(scenario())
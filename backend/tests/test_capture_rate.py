@@ -0,0 +1,52 @@
+from src.services.capture_rate import RESOLUTIONS, CaptureRateController
+
+def test_speeds_up_to_max_when_idle():
+    controller = CaptureRateController(min_fps=0.5, max_fps=10.0)
+    controller.announce()
+    for second in range(20):
+        config = controller.observe(0.02, 0, now=second) or controller.sent
+    assert config["fps"] == 10.0
+    assert (config["width"], config["height"]) == RESOLUTIONS[0]
+
+def test_backs_off_when_frames_are_dropped():
+    controller = CaptureRateController(min_fps=0.5, max_fps=10.0, initial_fps=8.0)
+    controller.announce()
+    controller.observe(0.05, 0, now=0)
+    config = controller.observe(0.05, 3, now=1)
+    assert config["fps"] < 8.0
+
+def test_backs_off_when_worker_queue_is_full():
+    controller = CaptureRateController(min_fps=0.5, max_fps=10.0, initial_fps=8.0)
+    controller.announce()
+    config = controller.observe(0.05, 0, queue_depth=4, queue_size=4, now=0)
+    assert config["fps"] < 8.0
+
+def test_tracks_latency_under_load():
+    controller = CaptureRateController(min_fps=0.5, max_fps=10.0, utilization=0.8)
+    controller.announce()
+    for second in range(30):
+        controller.observe(0.4, 0, now=second)
+    assert controller.fps == 2.0
+
+def test_shrinks_frames_when_min_rate_is_unaffordable():
+    controller = CaptureRateController(min_fps=0.5, max_fps=10.0, resolution_cooldown=3.0)
+    controller.announce()
+    config = None
+    for second in range(0, 20, 4):
+        config = controller.observe(5.0, 0, now=second) or config
+    assert config["fps"] == 0.5
+    assert (config["width"], config["height"]) != RESOLUTIONS[0]
+
+def test_reused_frames_do_not_inflate_capacity():
+    controller = CaptureRateController(min_fps=0.5, max_fps=10.0, utilization=0.8)
+    controller.announce()
+    for second in range(30):
+        controller.observe(0.4, 0, now=second)
+        controller.observe(0.001, 0, now=second, inferred=False)
+    assert controller.fps == 2.0
+
+def test_holds_rate_until_a_frame_is_inferred():
+    controller = CaptureRateController(min_fps=0.5, max_fps=10.0, initial_fps=1.0)
+    controller.announce()
+    assert controller.observe(0.001, 0, now=0, inferred=False) is None
+    assert controller.fps == 1.0
@@ -0,0 +1,85 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from src.services import analysis_engine
+from src.services.frame_gate import ChangeGate
+
+def still_frame(seed=0):
+    rng = np.random.RandomState(seed)
+    frame = np.full((360, 640, 3), 90, dtype=np.uint8)
+    # A "subject" with some texture in the middle of the frame
+    frame[80:300, 220:420] = rng.randint(60, 200, (220, 200, 3))
+    return frame
+
+def moving_frames(count):
+    frames = []
+    for index in range(count):
+        frame = np.full((360, 640, 3), 90, dtype=np.uint8)
+        x = 40 + 60 * index
+        frame[100:260, x:x + 120] = 230
+        frames.append(frame)
+    return frames
+
+def run_gate(gate, frames):
+    decisions = []
+    for index, frame in enumerate(frames):
+        reused = gate.reuse(frame)
+        decisions.append(reused is not None)
+        if reused is None:
+            gate.record({"frame": index})
+    return decisions
+
+def test_identical_frames_are_skipped():
+    gate = ChangeGate(threshold=4.0, max_reuse=100)
+    frame = still_frame()
+    assert run_gate(gate, [frame] * 10) == [False] + [True] * 9
+    assert gate.skip_ratio == pytest.approx(0.9)
+
+def test_reused_result_is_the_last_analyzed_one():
+    gate = ChangeGate(threshold=4.0)
+    frame = still_frame()
+    run_gate(gate, [frame])
+    assert gate.reuse(frame) == {"frame": 0}
+
+def test_sensor_noise_is_skipped():
+    rng = np.random.RandomState(1)
+    base = still_frame().astype(np.int16)
+    frames = [np.clip(base + rng.normal(0, 3, base.shape), 0, 255).astype(np.uint8) for _ in range(10)]
+    gate = ChangeGate(threshold=4.0, max_reuse=100)
+    assert run_gate(gate, frames) == [False] + [True] * 9
+
+def test_movement_is_analyzed():
+    gate = ChangeGate(threshold=4.0)
+    assert run_gate(gate, moving_frames(8)) == [False] * 8
+    assert gate.skip_ratio == 0.0
+
+def test_max_reuse_forces_analysis():
+    gate = ChangeGate(threshold=4.0, max_reuse=3)
+    assert run_gate(gate, [still_frame()] * 9) == [False, True, True, True] * 2 + [False]
+
+def test_threshold_zero_never_skips():
+    gate = ChangeGate(threshold=0.0)
+    assert run_gate(gate, [still_frame()] * 5) == [False] * 5
+
+def test_threshold_zero_disables_the_gate_in_workers(monkeypatch):
+    monkeypatch.setattr(analysis_engine, "_options", {"change_threshold": 0.0})
+    assert analysis_engine.WorkerSession().gate is None
+    monkeypatch.setattr(analysis_engine, "_options", {"change_threshold": 4.0})
+    assert analysis_engine.WorkerSession().gate is not None
+
+def test_recorded_sequence(tmp_path):
+    from src.services.batch_analysis import read_frames
+
+    # Still for 10 frames, then the subject moves for 5, recorded with JPEG artifacts
+    frames = [still_frame()] * 10 + moving_frames(5)
+    path = str(tmp_path / "recording.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 15, (640, 360))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+    gate = ChangeGate(threshold=4.0, max_reuse=100)
+    decisions = run_gate(gate, [frame for _, _, frame in read_frames(path)])
+    assert decisions == [False] + [True] * 9 + [False] * 5
@@ -0,0 +1,47 @@
+from src.services.graph_pool import GraphPool
+
+class FakeGraphs:
+    def __init__(self):
+        self.cleared = 0
+        self.closed = False
+
+    def clear(self):
+        self.cleared += 1
+
+    def close(self):
+        self.closed = True
+
+def test_sessions_keep_their_graphs():
+    pool = GraphPool(FakeGraphs, max_size=2)
+    first = pool.acquire("a")
+    second = pool.acquire("b")
+    assert first is not second
+    assert pool.acquire("a") is first
+    assert pool.acquire("b") is second
+
+def test_sessions_beyond_max_size_share_instead_of_evicting():
+    pool = GraphPool(FakeGraphs, max_size=2)
+    first, second = pool.acquire("a"), pool.acquire("b")
+    for _ in range(5):
+        assert pool.acquire("c") is None
+        assert pool.acquire("a") is first
+        assert pool.acquire("b") is second
+    assert first.cleared == second.cleared == 0
+    assert pool.stats()["overflowed"] == 5
+
+def test_overflowing_session_gets_a_released_set():
+    pool = GraphPool(FakeGraphs, max_size=1)
+    first = pool.acquire("a")
+    assert pool.acquire("b") is None
+    pool.release("a")
+    assert first.cleared == 1
+    assert pool.acquire("b") is first
+    assert pool.stats()["reused"] == 1
+
+def test_idle_sets_are_released_and_closed_down_to_min_size():
+    pool = GraphPool(FakeGraphs, max_size=3, idle_timeout=10, min_size=1)
+    sets = [pool.acquire(session) for session in ("a", "b", "c")]
+    pool.evict_idle(now=1e9)
+    assert len(pool.leases) == 0
+    assert len(pool) == 1
+    assert sum(graphs.closed for graphs in sets) == 2
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+landmark_pb2 = pytest.importorskip("mediapipe.framework.formats.landmark_pb2")
+
+from src.services import landmark_features as features
+
+def make_landmarks(count=33, seed=0):
+    rng = np.random.default_rng(seed)
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility, presence in rng.random((count, 5), dtype=np.float32):
+        landmarks.landmark.add(x=x, y=y, z=z - 0.5, visibility=visibility, presence=presence)
+    return landmarks
+
+def test_fast_path_matches_attribute_access():
+    landmarks = make_landmarks()
+    assert features._serialized_fields(landmarks, 3) is not None
+    np.testing.assert_array_equal(features.landmarks_to_array(landmarks), features._attribute_coordinates(landmarks))
+    np.testing.assert_array_equal(features.visibility_to_array(landmarks), features._attribute_visibility(landmarks))
+
+def test_fast_path_matches_face_mesh_sized_list():
+    landmarks = make_landmarks(count=478, seed=1)
+    np.testing.assert_array_equal(features.landmarks_to_array(landmarks), features._attribute_coordinates(landmarks))
+
+def test_falls_back_when_a_field_is_missing():
+    landmarks = make_landmarks(count=4)
+    # Without visibility/presence this record is shorter than the others
+    landmarks.landmark[2].ClearField("visibility")
+    landmarks.landmark[2].ClearField("presence")
+    assert features._serialized_fields(landmarks, 4) is None
+    np.testing.assert_array_equal(features.visibility_to_array(landmarks), features._attribute_visibility(landmarks))
+    np.testing.assert_array_equal(features.landmarks_to_array(landmarks), features._attribute_coordinates(landmarks))
+
+def test_falls_back_when_fields_are_missing_everywhere():
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x in (0.1, 0.2, 0.3):
+        landmarks.landmark.add(x=x, y=0.5)
+    assert features._serialized_fields(landmarks, 3) is None
+    np.testing.assert_array_equal(
+        features.landmarks_to_array(landmarks),
+        np.array([[0.1, 0.5, 0.0], [0.2, 0.5, 0.0], [0.3, 0.5, 0.0]], dtype=np.float32)
+    )
+
+def test_empty_list():
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    assert features.landmarks_to_array(landmarks).shape == (0, 3)
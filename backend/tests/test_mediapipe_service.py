@@ -0,0 +1,47 @@
+import base64
+
+import pytest
+
+pytest.importorskip("mediapipe")
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from src.services.mediapipe_service import INFERENCE_MODES, GraphSet, MediaPipeService
+
+def active_graphs(graphs: GraphSet):
+    return {name for name in ("face_mesh", "pose", "holistic") if getattr(graphs, name) is not None}
+
+@pytest.mark.parametrize("mode, expected", [
+    ("holistic-only", {"holistic"}),
+    ("face+pose", {"face_mesh", "pose"}),
+    ("full", {"face_mesh", "pose", "holistic"})
+])
+def test_mode_selects_graphs(mode, expected):
+    graphs = GraphSet(mode)
+    try:
+        assert active_graphs(graphs) == expected
+    finally:
+        graphs.close()
+
+def test_every_mode_is_covered():
+    assert set(INFERENCE_MODES) == {"holistic-only", "face+pose", "full"}
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        MediaPipeService(inference_mode="everything")
+
+def test_analysis_in_any_mode_returns_the_same_fields():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    keys = set()
+    for mode in INFERENCE_MODES:
+        service = MediaPipeService(inference_mode=mode)
+        keys.add(frozenset(service.analyze_image(frame)))
+        service.graphs.close()
+    assert len(keys) == 1
+
+def test_annotation_does_not_change_the_inference_graphs():
+    service = MediaPipeService(inference_mode="face+pose")
+    ok, encoded = cv2.imencode(".jpg", np.zeros((240, 320, 3), dtype=np.uint8))
+    service.annotate_image("data:image/jpeg;base64," + base64.b64encode(encoded.tobytes()).decode())
+    assert active_graphs(service.graphs) == {"face_mesh", "pose"}
+    service.graphs.close()
@@ -0,0 +1,134 @@
+import asyncio
+
+from src.services import question_generator
+from src.services.question_generator import QuestionGenerator, QuestionPool, TemplateQuestionGenerator
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+class CountingGenerator(QuestionGenerator):
+    """Numbers its questions; ``repeat`` makes every batch start over from question 0."""
+
+    def __init__(self, repeat=False):
+        self.repeat = repeat
+        self.next = 0
+        self.calls = []
+
+    async def generate(self, difficulty, category, count):
+        self.calls.append((difficulty, category, count))
+        if self.repeat:
+            self.next = 0
+        texts = [f"{difficulty} question {self.next + offset}?" for offset in range(count)]
+        self.next += count
+        return texts
+
+class FakeTime:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+async def wait_until(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+def test_template_generator_is_deterministic():
+    first = run(TemplateQuestionGenerator().generate("advanced", "leadership", 3))
+    assert first == run(TemplateQuestionGenerator().generate("advanced", "leadership", 3))
+    assert len(set(first)) == 3
+
+def test_start_fills_pools_to_target():
+    async def scenario():
+        pool = QuestionPool(CountingGenerator(), low_water=2, target=5)
+        await pool.start([("beginner", None), ("advanced", None)])
+        try:
+            assert pool.stats()["pooled"] == 10
+            assert pool.take("beginner", None, 3) == [f"beginner question {n}?" for n in range(3)]
+        finally:
+            await pool.stop()
+    run(scenario())
+
+def test_refills_below_low_water():
+    async def scenario():
+        generator = CountingGenerator()
+        pool = QuestionPool(generator, low_water=3, target=6)
+        await pool.start([("beginner", None)])
+        try:
+            pool.take("beginner", None, 3)
+            # Still at low water: no refill
+            await asyncio.sleep(0.05)
+            assert len(generator.calls) == 1
+            pool.take("beginner", None, 1)
+            await wait_until(lambda: len(pool.pools[("beginner", None)]) == 6)
+            assert generator.calls == [("beginner", None, 6), ("beginner", None, 4)]
+        finally:
+            await pool.stop()
+    run(scenario())
+
+def test_take_never_waits_for_the_generator():
+    async def scenario():
+        pool = QuestionPool(CountingGenerator(), low_water=2, target=4)
+        await pool.start([("beginner", None)])
+        try:
+            # A new key starts empty and is filled in the background
+            assert pool.take("beginner", "teamwork", 2) == []
+            await wait_until(lambda: len(pool.pools[("beginner", "teamwork")]) == 4)
+            assert len(pool.take("beginner", "teamwork", 2)) == 2
+        finally:
+            await pool.stop()
+    run(scenario())
+
+def test_drops_duplicates_of_pooled_served_and_existing_questions():
+    async def scenario():
+        pool = QuestionPool(
+            CountingGenerator(repeat=True),
+            low_water=3,
+            target=4,
+            exists=lambda text: text == "beginner question 3?"
+        )
+        await pool.start([("beginner", None)])
+        try:
+            assert pool.stats() == {"pooled": 3, "generated": 3, "duplicates": 1, "expired": 0}
+            served = pool.take("beginner", None, 2)
+            assert served == ["beginner question 0?", "beginner question 1?"]
+            # Refilling regenerates questions 0-2: two were served, one is still pooled
+            await pool._refill()
+            assert pool.duplicates == 4
+            assert pool.take("beginner", None, 10) == ["beginner question 2?"]
+        finally:
+            await pool.stop()
+    run(scenario())
+
+def test_expired_questions_are_not_served(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(question_generator, "time", clock)
+
+    async def scenario():
+        pool = QuestionPool(CountingGenerator(), low_water=2, target=3, ttl=60)
+        await pool.start([("beginner", None)])
+        try:
+            clock.now += 61
+            assert pool.take("beginner", None, 2) == []
+            assert pool.expired == 3
+            await wait_until(lambda: len(pool.pools[("beginner", None)]) == 3)
+            assert pool.take("beginner", None, 1) == ["beginner question 3?"]
+        finally:
+            await pool.stop()
+    run(scenario())
+
+def test_refill_evicts_expired_questions(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(question_generator, "time", clock)
+
+    async def scenario():
+        pool = QuestionPool(CountingGenerator(), low_water=2, target=3, ttl=60)
+        await pool.start([("beginner", None)])
+        try:
+            clock.now += 61
+            await pool._refill()
+            assert pool.expired == 3
+            assert pool.take("beginner", None, 3) == [f"beginner question {n}?" for n in range(3, 6)]
+        finally:
+            await pool.stop()
+    run(scenario())
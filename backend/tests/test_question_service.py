@@ -0,0 +1,56 @@
+import asyncio
+
+from src.services.question_generator import TemplateQuestionGenerator
+from src.services.question_service import QuestionService
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+def pooled_service(**kwargs):
+    return QuestionService(generator=TemplateQuestionGenerator(), pool_low_water=2, pool_target=4, **kwargs)
+
+def test_without_a_generator_questions_come_from_the_store():
+    service = QuestionService()
+    questions = service.get_questions("advanced", count=3)
+    assert len(questions) == 3
+    assert all(question["difficulty"] == "advanced" and question["id"] is not None for question in questions)
+
+def test_pooled_questions_come_first_and_are_labelled():
+    async def scenario():
+        service = pooled_service()
+        await service.start()
+        try:
+            questions = service.get_questions("intermediate", count=6)
+        finally:
+            await service.stop()
+        assert [question.get("generated", False) for question in questions] == [True] * 4 + [False] * 2
+        assert all(question["difficulty"] == "intermediate" and question["id"] is not None for question in questions)
+        assert len({question["question"] for question in questions}) == 6
+    run(scenario())
+
+def test_missing_difficulty_takes_from_a_known_pool():
+    async def scenario():
+        service = pooled_service()
+        await service.start()
+        try:
+            questions = service.get_questions(count=3)
+            assert all(question["difficulty"] in service.basic_questions for question in questions)
+            assert all(difficulty in service.basic_questions for difficulty, category in service.pool.pools)
+        finally:
+            await service.stop()
+    run(scenario())
+
+def test_pooled_questions_count_towards_the_recent_window():
+    async def scenario():
+        service = pooled_service(recent_window=50)
+        await service.start()
+        try:
+            first = service.get_questions("beginner", count=4, user_id="alice")
+            assert all(question.get("generated") for question in first)
+            # Drain the pool so the next draw comes from the store, which now holds the served questions too
+            service.pool.take("beginner", None, 100)
+            second = service.get_questions("beginner", count=5, user_id="alice")
+        finally:
+            await service.stop()
+        assert not {question["id"] for question in first} & {question["id"] for question in second}
+    run(scenario())
@@ -0,0 +1,80 @@
+import random
+
+from src.services.question_store import QuestionStore, RecentlyAsked, ShuffledCursor
+
+def make_store(size=20, **kwargs):
+    store = QuestionStore(seed=7, **kwargs)
+    for number in range(size):
+        difficulty = "easy" if number % 2 else "hard"
+        store.add(f"Question {number}?", difficulty, tags=("tag-a",) if number < 5 else ())
+    return store
+
+def test_cursor_hands_out_every_id_once_per_pass():
+    cursor = ShuffledCursor(random.Random(3))
+    for question_id in range(10):
+        cursor.add(question_id)
+    for _ in range(3):
+        assert sorted(cursor.next() for _ in range(10)) == list(range(10))
+
+def test_cursor_add_mid_pass_still_covers_the_pass():
+    cursor = ShuffledCursor(random.Random(3))
+    for question_id in range(6):
+        cursor.add(question_id)
+    first = [cursor.next() for _ in range(3)]
+    cursor.add(6)
+    rest = [cursor.next() for _ in range(4)]
+    assert sorted(first + rest) == list(range(7))
+
+def test_recently_asked_forgets_the_oldest():
+    recent = RecentlyAsked(window=3)
+    for question_id in [1, 9, 17, 9, 25]:
+        recent.add(question_id)
+    assert len(recent) == 3
+    assert 1 not in recent
+    assert all(question_id in recent for question_id in (9, 17, 25))
+    assert 2 not in recent and 1000 not in recent
+
+def test_no_repeats_within_a_pass():
+    store = make_store()
+    asked = []
+    for _ in range(4):
+        asked.extend(question.id for question in store.sample(5))
+    assert sorted(asked) == list(range(20))
+
+def test_sample_respects_filters():
+    store = make_store()
+    assert {question.difficulty for question in store.sample(10, difficulty="easy")} == {"easy"}
+    tagged = store.sample(10, tag="tag-a")
+    assert len(tagged) == 5 and all("tag-a" in question.tags for question in tagged)
+    assert store.sample(3, difficulty="missing") == []
+
+def test_user_is_not_asked_recent_questions_again():
+    store = make_store(recent_window=15)
+    first = {question.id for question in store.sample(10, user_id="alice")}
+    # Another user drawing moves the shared cursor without affecting alice's window
+    store.sample(7, user_id="bob")
+    second = {question.id for question in store.sample(10, user_id="alice")}
+    assert len(first) == len(second) == 10
+    # Of alice's last 15 draws, only the 5 oldest may come back
+    assert len(first & second) <= 5
+    third = {question.id for question in store.sample(5, user_id="alice")}
+    assert not third & second
+
+def test_falls_back_to_recent_questions_when_too_few_are_unseen():
+    store = make_store(recent_window=50)
+    first = {question.id for question in store.sample(8, difficulty="easy", user_id="alice")}
+    second = store.sample(5, difficulty="easy", user_id="alice")
+    second_ids = {question.id for question in second}
+    # Only 10 easy questions: the 2 unseen ones come first, then recent ones fill up
+    assert len(second) == len(second_ids) == 5
+    assert {question.id for question in store.questions if question.difficulty == "easy"} - first <= second_ids
+
+def test_count_is_capped_by_the_filter_size():
+    store = make_store()
+    assert len(store.sample(50, tag="tag-a", user_id="alice")) == 5
+
+def test_max_users_evicts_the_least_recent_user():
+    store = make_store(max_users=2)
+    for user_id in ("alice", "bob", "carol"):
+        store.sample(1, user_id=user_id)
+    assert list(store.recent) == ["bob", "carol"]
@@ -0,0 +1,137 @@
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from src.config.memory_db import MemoryDatabase
+from src.services.result_writer import AnalysisResultWriter
+
+RESULT = {
+    "confidence_score": {"score": 7.5},
+    "eye_contact": {"looking_at_camera": True},
+    "facial_expression": {"dominant": "neutral"},
+    "posture": {"quality": "good", "issues": []}
+}
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+class SlowCollection:
+    """Delays every insert, so stop() runs while a batch is in flight."""
+
+    def __init__(self, collection, delay: float):
+        self.collection = collection
+        self.delay = delay
+        self.inserting = asyncio.Event()
+
+    async def insert_many(self, documents, ordered=True):
+        self.inserting.set()
+        await asyncio.sleep(self.delay)
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+class RejectingCollection:
+    """Rejects one bucket id with a non-duplicate write error."""
+
+    def __init__(self, collection, rejected_id: str):
+        self.collection = collection
+        self.rejected_id = rejected_id
+        self.calls = 0
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls += 1
+        accepted = [document for document in documents if document["_id"] != self.rejected_id]
+        await self.collection.insert_many(accepted, ordered=ordered)
+        errors = [
+            {"index": index, "code": 121, "errmsg": "Document failed validation"}
+            for index, document in enumerate(documents) if document["_id"] == self.rejected_id
+        ]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(accepted)})
+
+def test_buckets_by_time_span_and_frame_count():
+    async def scenario():
+        collection = MemoryDatabase().analysis_results
+        writer = AnalysisResultWriter(bucket_seconds=10, max_bucket_frames=3, flush_interval=60)
+        await writer.start(collection)
+        # Frames 0-2 fill a bucket, 3-4 start another that the time span closes at 14s
+        for timestamp in (0, 1, 2, 3, 4, 14):
+            await writer.add("s1", "u1", RESULT, timestamp)
+        await writer.add("s2", "u2", RESULT, 5)
+        await writer.stop()
+
+        documents = sorted(collection.documents.values(), key=lambda document: document["_id"])
+        assert [(document["_id"], document["frames"]) for document in documents] == [
+            ("s1:0", 3), ("s1:1", 2), ("s1:2", 1), ("s2:0", 1)
+        ]
+        assert documents[1]["t"] == [0, 1000]
+        assert documents[0]["score"] == [7.5, 7.5, 7.5]
+        assert writer.stats() == {"open_buckets": 0, "pending": 0, "written": 4, "dropped": 0}
+
+    run(scenario())
+
+def test_stop_drains_a_batch_in_flight():
+    async def scenario():
+        collection = MemoryDatabase().analysis_results
+        slow = SlowCollection(collection, delay=0.2)
+        writer = AnalysisResultWriter(batch_size=4, flush_interval=60)
+        await writer.start(slow)
+        for session in range(6):
+            await writer.add(f"s{session}", "u1", RESULT, 0)
+            writer.end_session(f"s{session}")
+        # The first batch of 4 is being inserted when stop() is called
+        await slow.inserting.wait()
+        await writer.stop()
+        assert len(collection.documents) == 6
+        assert writer.stats()["pending"] == 0
+
+    run(scenario())
+
+def test_stop_puts_back_a_batch_cut_off_by_the_timeout():
+    async def scenario():
+        collection = MemoryDatabase().analysis_results
+        slow = SlowCollection(collection, delay=0.3)
+        writer = AnalysisResultWriter(flush_interval=60, stop_timeout=0.1)
+        await writer.start(slow)
+        await writer.add("s1", "u1", RESULT, 0)
+        writer.end_session("s1")
+        writer._flush_requested.set()
+        await slow.inserting.wait()
+        await writer.stop()
+        # The cancelled insert was retried by the final flush
+        assert list(collection.documents) == ["s1:0"]
+
+    run(scenario())
+
+def test_duplicates_count_as_written():
+    async def scenario():
+        collection = MemoryDatabase().analysis_results
+        # An earlier attempt already stored this bucket
+        await collection.insert_one({"_id": "s1:0", "frames": 1})
+        writer = AnalysisResultWriter(flush_interval=60)
+        await writer.start(collection)
+        for session in ("s1", "s2"):
+            await writer.add(session, "u1", RESULT, 0)
+            writer.end_session(session)
+        await writer.stop()
+        assert sorted(collection.documents) == ["s1:0", "s2:0"]
+        assert writer.stats() == {"open_buckets": 0, "pending": 0, "written": 2, "dropped": 0}
+
+    run(scenario())
+
+def test_rejected_bucket_is_dropped_after_max_attempts():
+    async def scenario():
+        collection = MemoryDatabase().analysis_results
+        rejecting = RejectingCollection(collection, "bad:0")
+        writer = AnalysisResultWriter(flush_interval=60, max_attempts=3)
+        await writer.start(rejecting)
+        for session in ("bad", "good"):
+            await writer.add(session, "u1", RESULT, 0)
+            writer.end_session(session)
+        for _ in range(3):
+            await writer._flush()
+        assert list(collection.documents) == ["good:0"]
+        assert writer.stats() == {"open_buckets": 0, "pending": 0, "written": 1, "dropped": 1}
+        assert rejecting.calls == 3
+        assert writer.attempts == {}
+        await writer.stop()
+
+    run(scenario())
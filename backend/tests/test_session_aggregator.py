@@ -0,0 +1,100 @@
+import pytest
+
+from src.services.analytics_service import format_rollup
+from src.services.session_aggregator import SessionAggregator
+
+def frame(score, looking=True, quality="good", issues=(), expression="neutral"):
+    return {
+        "confidence_score": {"score": score},
+        "eye_contact": {"looking_at_camera": looking},
+        "posture": {"quality": quality, "issues": list(issues)},
+        "facial_expression": {"dominant": expression}
+    }
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_score_ema_and_averages():
+    aggregator = SessionAggregator(alpha=0.5, window=3)
+    for second, score in enumerate([4.0, 8.0, 6.0]):
+        summary = aggregator.update(frame(score), float(second))
+    # 4 -> 6 -> 6
+    assert summary["confidence"] == {"smoothed": 6.0, "recent_average": 6.0, "average": 6.0}
+
+def test_recent_window_is_a_ring_buffer():
+    aggregator = SessionAggregator(window=3)
+    for second, score in enumerate([1.0, 2.0, 3.0, 4.0, 5.0]):
+        summary = aggregator.update(frame(score), float(second))
+    assert summary["confidence"]["recent_average"] == 4.0
+    assert summary["confidence"]["average"] == 3.0
+    assert aggregator.recent_total == pytest.approx(12.0)
+
+def test_eye_contact_streaks():
+    aggregator = SessionAggregator()
+    for second, looking in enumerate([True, True, True, False, True, True]):
+        summary = aggregator.update(frame(7.0, looking=looking), float(second))
+    assert summary["eye_contact"] == {"ratio": 0.833, "current_streak": 1.0, "longest_streak": 2.0, "total_time": 3.0}
+
+def test_streak_duration_is_written_into_the_result():
+    aggregator = SessionAggregator()
+    aggregator.update(frame(7.0), 0.0)
+    result = frame(7.0)
+    aggregator.update(result, 1.5)
+    assert result["eye_contact"]["duration"] == 1.5
+
+def test_posture_and_expressions():
+    aggregator = SessionAggregator(alpha=0.5)
+    aggregator.update(frame(5.0, quality="poor", issues=["leaning"], expression="concerned"), 0.0)
+    summary = aggregator.update(frame(5.0, expression="happy"), 1.0)
+    assert summary["posture"] == {"poor_ratio": 0.5, "issue_rate": 0.25, "issue_counts": {"leaning": 1}}
+    assert summary["expressions"] == {"concerned": 0.5, "happy": 0.5}
+
+def test_totals_add_up_across_sessions():
+    first, second = SessionAggregator(), SessionAggregator()
+    for index in range(4):
+        first.update(frame(6.0, looking=index < 2, quality="poor", issues=["leaning"]), float(index))
+    for index in range(2):
+        second.update(frame(9.0, expression="happy"), float(index))
+
+    totals = {}
+    for session in (first.totals(), second.totals()):
+        for key, value in session.items():
+            if isinstance(value, dict):
+                merged = totals.setdefault(key, {})
+                for name, count in value.items():
+                    merged[name] = merged.get(name, 0) + count
+            else:
+                totals[key] = totals.get(key, 0) + value
+
+    rollup = format_rollup(totals)
+    assert rollup["frames"] == 6
+    assert rollup["duration"] == 4.0
+    assert rollup["average_confidence"] == 7.0
+    assert rollup["eye_contact_ratio"] == round(4 / 6, 3)
+    assert rollup["poor_posture_ratio"] == round(4 / 6, 3)
+    assert rollup["posture_issue_counts"] == {"leaning": 4}
+    assert rollup["expressions"] == {"neutral": round(4 / 6, 3), "happy": round(2 / 6, 3)}
+
+def test_client_clock_session_places_untimed_frames_on_the_client_clock():
+    clock = FakeClock(1000.0)
+    aggregator = SessionAggregator(clock=clock)
+    # Client capture times are unrelated to the server's monotonic clock
+    aggregator.update(frame(7.0), 5.0)
+    clock.now += 1.0
+    aggregator.update(frame(7.0), 6.0)
+    clock.now += 0.5
+    summary = aggregator.update(frame(7.0))
+    assert summary["duration"] == 1.5
+    assert summary["eye_contact"]["current_streak"] == 1.5
+
+def test_server_clock_session_ignores_client_times():
+    clock = FakeClock(1000.0)
+    aggregator = SessionAggregator(clock=clock)
+    aggregator.update(frame(7.0))
+    clock.now += 2.0
+    summary = aggregator.update(frame(7.0), 123456.0)
+    assert summary["duration"] == 2.0
@@ -2,6 +2,15 @@ import React, { useState, useRef, useEffect } from 'react';
 import Webcam from 'react-webcam';
 import { Box, Button, Typography, Paper, Grid, CircularProgress } from '@mui/material';
 
+// Capture settings negotiated with the backend over the WebSocket
+interface CaptureConfig {
+  fps: number;
+  width: number;
+  height: number;
+}
+
+const DEFAULT_CAPTURE_CONFIG: CaptureConfig = { fps: 1, width: 1280, height: 720 };
+
 const InterviewPractice: React.FC = () => {
   const webcamRef = useRef<Webcam>(null);
   const [isSessionActive, setIsSessionActive] = useState(false);
@@ -13,6 +22,9 @@ const InterviewPractice: React.FC = () => {
 
   // WebSocket connection for real-time communication
   const socketRef = useRef<WebSocket | null>(null);
+  const captureConfigRef = useRef<CaptureConfig>(DEFAULT_CAPTURE_CONFIG);
+  const sessionActiveRef = useRef(false);
+  const captureTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
 
   useEffect(() => {
     // Fetch a random question when component mounts
@@ -30,6 +42,12 @@ const InterviewPractice: React.FC = () => {
       const data = JSON.parse(event.data);
       console.log('Received data:', data);
       
+      if (data.type === 'capture_config') {
+        // The server adapts our frame rate and size to its current load
+        captureConfigRef.current = { fps: data.fps, width: data.width, height: data.height };
+        return;
+      }
+      
       if (data.feedback) {
         setFeedback(data.feedback);
       }
@@ -40,6 +58,10 @@ const InterviewPractice: React.FC = () => {
     };
     
     return () => {
+      sessionActiveRef.current = false;
+      if (captureTimerRef.current) {
+        clearTimeout(captureTimerRef.current);
+      }
       if (socketRef.current) {
         socketRef.current.close();
       }
@@ -68,6 +90,7 @@ const InterviewPractice: React.FC = () => {
           clearInterval(timer);
           setShowCountdown(false);
           setIsSessionActive(true);
+          sessionActiveRef.current = true;
           captureFrames();
           return 3;
         }
@@ -78,27 +101,29 @@ const InterviewPractice: React.FC = () => {
 
   const stopSession = () => {
     setIsSessionActive(false);
+    sessionActiveRef.current = false;
+    if (captureTimerRef.current) {
+      clearTimeout(captureTimerRef.current);
+      captureTimerRef.current = null;
+    }
     setFeedback(null);
   };
 
   const captureFrames = () => {
-    if (!isSessionActive) return;
+    if (!sessionActiveRef.current || !webcamRef.current) return;
     
-    const captureInterval = setInterval(() => {
-      if (!isSessionActive || !webcamRef.current) {
-        clearInterval(captureInterval);
-        return;
-      }
-      
-      const imageSrc = webcamRef.current.getScreenshot();
-      if (imageSrc && socketRef.current) {
-        // Send frame to backend for processing
-        socketRef.current.send(JSON.stringify({
-          type: 'frame',
-          data: imageSrc
-        }));
-      }
-    }, 1000); // Capture every second
+    const { fps, width, height } = captureConfigRef.current;
+    const imageSrc = webcamRef.current.getScreenshot({ width, height });
+    if (imageSrc && socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
+      // Send frame to backend for processing
+      socketRef.current.send(JSON.stringify({
+        type: 'frame',
+        data: imageSrc
+      }));
+    }
+    
+    // Re-read the negotiated rate on every tick so server updates apply immediately
+    captureTimerRef.current = setTimeout(captureFrames, 1000 / fps);
   };
 
   const nextQuestion = () => {